@@ -5,45 +5,88 @@ import os
 import argparse
 import pathlib
 import time
+import math
+import datetime
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 from types import FrameType
-from spot_world.spot import Spot
+from spot_world.spot import Spot, rpc_stats
+from spot_world.spot.aio import AsyncSpot
 from spot_world.spot.estop import EstopStatus
 from spot_world.spot.lease import LeaseError, LeaseStatus
 from spot_world.spot.power import PowerStatus
-from spot_world.spot.autowalk import Mission
-from spot_world.spot.graph_nav import Map
+from spot_world.spot.workspace import MapWorkspace, MapWorkspaceError
+from spot_world.spot.scheduler import MissionScheduler, SchedulerError
+from spot_world.spot.charging import ChargeManager
+from spot_world.spot.fleet import Fleet, FleetError
+from spot_world.spot.timing import PhaseTimer, no_phase
+from spot_world.spot.telemetry import TelemetryRecorder, TelemetryLog, TelemetryError
 
 logger = logging.getLogger(__name__)
 
 
 class App(cmd2.Cmd):
 
-    def __init__(self, spot: Spot, autowalk_path: pathlib.Path, initialize_robot=False):
+    def __init__(self, spot: Spot, autowalk_path: pathlib.Path, initialize_robot=False, status_refresh=None,
+            workspace: MapWorkspace = None, fleet: Fleet = None, timer: PhaseTimer = None):
+        phase = timer.phase if timer is not None else no_phase
         # setup cmd2 app
-        cmd2.Cmd.__init__(self, include_py=True)
-        self._cleanup_features()
+        with phase('console'):
+            cmd2.Cmd.__init__(self, include_py=True)
+            self._cleanup_features()
         # autowalk_path is validated in the run() factory method
         self.autowalk_path = autowalk_path
-        # attach the robot
+        # attach the robot, and the other robots of the fleet when there are any
         self.spot = spot
-        # load the map
-        self.map = Map.from_filesystem(autowalk_path)
-        # upload map to the robot
-        self.spot.graph_nav.clear()
-        self.spot.graph_nav.upload_map(self.map)
-        # optionally initialize the robot
-        if initialize_robot:
-            self._initialize_robot()
+        self.fleet = fleet
+        # hostname -> originating dock of the other robots of the fleet
+        self._fleet_dock_ids = {}
+        # the other autowalks which can be switched to, by default those beside this one
+        if workspace is None:
+            workspace = MapWorkspace.from_directory(autowalk_path.parent)
+        self.workspace = workspace
+        map_name = self.workspace.add(autowalk_path)
+        # load the map from its packed cache, snapshots are parsed as they are used
+        self.map = self.workspace.get(map_name)
+        self.workspace.pin(map_name)
+        with self.spot.rpc_stats.command('startup'):
+            # the upload doesn't need the lease, so the robot is initialized alongside it
+            initialized = None
+            with ThreadPoolExecutor(max_workers=1, thread_name_prefix='startup') as executor:
+                if initialize_robot:
+                    def _initialize():
+                        with phase('initialize'):
+                            self._initialize_robot()
+                    initialized = rpc_stats.submit(executor, _initialize)
+                # upload map to the robot, skipping what the robot already has
+                with phase('map upload'):
+                    upload_report = self.spot.graph_nav.upload_map(self.map, incremental=True)
+                self.poutput(str(upload_report))
+                if initialized is not None:
+                    initialized.result()
         # dock_id to be set when undocking
         self.dock_id = None
+        # created when the first job is scheduled
+        self.scheduler = None
+        # created by telemetry start
+        self.telemetry = None
+        # created once the originating dock is known
+        self._charger = None
         # export these for use in the python shell
         self.py_locals = {
             'spot': self.spot,
+            'aspot': AsyncSpot(self.spot),
             'map': self.map,
+            'fleet': self.fleet,
         }
+        # when status_refresh is set the prompt renders from the robot state
+        # the robot state facade polls in the background every status_refresh seconds
+        self._status_refresh = status_refresh
         # setup custom prompt
-        self._set_prompt()
+        self._set_prompt(refresh=True)
+        if status_refresh:
+            self.spot.robot_state.subscribe(self._on_status_change, fields=self._prompt_state_fields)
+            self.spot.robot_state.start(rate_hz=1.0 / status_refresh)
 
     def _cleanup_features(self):
         # remove unused features from the cmd2 base application
@@ -54,13 +97,21 @@ class App(cmd2.Cmd):
         delattr(cmd2.Cmd, 'do_run_pyscript')
         self.hidden_commands += [ 'alias', 'history', 'macro', 'set' ]
 
-    def _initialize_robot(self):
+    def _initialize_robot(self, spot=None):
+        spot = spot or self.spot
         # setup estop
-        self.spot.estop.setup()
+        spot.estop.setup()
         # acquire lease
-        self.spot.lease.take()
+        spot.lease.take()
         # power on motors
-        self.spot.power.on()
+        spot.power.on()
+
+    @staticmethod
+    def _shutdown_robot(spot):
+        spot.robot_command.sit()
+        spot.power.off()
+        spot.estop.shutdown()
+        spot.lease.release()
 
     _motor_status_color = {
         PowerStatus.OFF: cmd2.ansi.Fg.WHITE,
@@ -87,24 +138,51 @@ class App(cmd2.Cmd):
         else:
             return cmd2.ansi.Fg.RED
 
-    def _set_prompt(self):
+    def _build_prompt(self, robot_state):
+        # all indicators come from the one robot state, the lease status is local
         # new line before prompt
         p = '\n'
         # lease indicator
         p += cmd2.ansi.style("LEASE", fg=self._lease_status_color[self.spot.lease.status])
         p += ' '
         # estop indicator
-        p += cmd2.ansi.style(f"ESTOP", fg=self._estop_status_color[self.spot.estop.status])
+        estop_status = self.spot.estop.status_from(robot_state)
+        p += cmd2.ansi.style(f"ESTOP", fg=self._estop_status_color[estop_status])
         p += ' '
         # motor power indicator
-        p += cmd2.ansi.style(f"MOTOR", fg=self._motor_status_color[self.spot.power.status])
+        power_status = self.spot.power.status_from(robot_state)
+        p += cmd2.ansi.style(f"MOTOR", fg=self._motor_status_color[power_status])
         p += ' '
         # battery indicator
-        battery_level = self.spot.power.battery
+        battery_level = self.spot.power.battery_from(robot_state)
         p += cmd2.ansi.style(f"{battery_level}%", fg=self._battery_status_color(battery_level))
         p += ' # '
+        return p
+
+    # robot state fields the prompt indicators are built from
+    _prompt_state_fields = ['power_state', 'battery_states', 'estop_states']
+
+    def _set_prompt(self, refresh=False):
+        # in background mode render from the polled state, otherwise one rpc per prompt. a state
+        # older than a few polls means the poller is failing, so query the robot and let it show
+        max_age = 0
+        if self._status_refresh and not refresh:
+            max_age = 3 * self._status_refresh
+        robot_state = self.spot.robot_state.get(max_age=max_age)
         # assign string to prompt
-        self.prompt = p
+        self.prompt = self._build_prompt(robot_state)
+
+    def _on_status_change(self, robot_state, changed_fields):
+        # called from the robot state poller thread when the prompt indicators change
+        prompt = self._build_prompt(robot_state)
+        # redraw the prompt while waiting on input, skipped while a command is running
+        if prompt != self.prompt and self.terminal_lock.acquire(blocking=False):
+            try:
+                self.async_update_prompt(prompt)
+            except RuntimeError:
+                pass
+            finally:
+                self.terminal_lock.release()
 
     def postcmd(self, stop, line):
         self._set_prompt()
@@ -113,11 +191,18 @@ class App(cmd2.Cmd):
     def _exit(self):
         ''' exit the application '''
         # respond to 'exit' or 'quit'
+        self.spot.robot_state.stop()
+        if self.telemetry is not None:
+            # writes out what was sampled up to now
+            self.telemetry.stop()
+        if self.scheduler is not None:
+            # a running mission can't be waited on, the robot is sat down below
+            self.scheduler.close(wait=False)
+        if self.fleet is not None:
+            # the other robots are shutdown together, the results are only of interest on failure
+            self.fleet.run(self._shutdown_robot, self._fleet_hostnames(include_self=False))
         try:
-            self.spot.robot_command.sit()
-            self.spot.power.off()
-            self.spot.estop.shutdown()
-            self.spot.lease.release()
+            self._shutdown_robot(self.spot)
         except Exception:
             pass
         # Return True to stop the command loop
@@ -155,7 +240,7 @@ class App(cmd2.Cmd):
             # wait for robot status to update for the prompt
             time.sleep(2)
             # update the prompt to ensure the estop status is reflected
-            self._set_prompt()
+            self._set_prompt(refresh=True)
         return super().sigint_handler(signum, _)
 
     def do_status(self, args):
@@ -163,6 +248,110 @@ class App(cmd2.Cmd):
         state = self.spot.robot_state.get()
         self.poutput(state)
 
+    @property
+    def charger(self):
+        # plans returns to the originating dock, None until the dock is known
+        if self.dock_id is None:
+            return None
+        if self._charger is None or self._charger.dock_id != self.dock_id or self._charger.map is not self.map:
+            if self._charger is not None:
+                self._charger.close()
+            self._charger = ChargeManager(self.spot, self.map, self.dock_id)
+        return self._charger
+
+    def do_battery(self, args):
+        ''' show the battery and when the robot has to return to the dock '''
+        self.poutput(f"battery {self.spot.power.battery}%")
+        charger = self.charger
+        if charger is None:
+            self.poutput('no dock_id stored to return to')
+            return
+        try:
+            distance = charger.distance_to_dock()
+            self.poutput(f"drain {charger.drain_rate * 60:.2f}% per minute")
+            self.poutput(f"{distance:.1f}m from dock {self.dock_id}, {charger.return_cost():.1f}% to return")
+            self.poutput(f"{charger.seconds_until_return() / 60:.0f} minutes until the robot has to return")
+        except Exception as e:
+            self.poutput(str(e))
+
+    def onecmd(self, statement, *args, **kwargs):
+        # attribute the rpcs made by a command to the command and its subcommand, i.e. 'robot undock'
+        if not isinstance(statement, cmd2.Statement):
+            statement = self.statement_parser.parse(statement)
+        if not statement.command:
+            return super().onecmd(statement, *args, **kwargs)
+        command = ' '.join([statement.command] + statement.arg_list[:1])
+        with self.spot.rpc_stats.command(command):
+            return super().onecmd(statement, *args, **kwargs)
+
+    _stats_parser = cmd2.Cmd2ArgumentParser()
+    _stats_subparser = _stats_parser.add_subparsers(title='subcommands', help='stats subcommands help')
+
+    def stats_show(self, args):
+        ''' print rpcs by command, slowest commands first '''
+        commands = self.spot.rpc_stats.commands
+        if args.command:
+            command = ' '.join(args.command)
+            commands = {command: commands[command]} if command in commands else {}
+        for command, command_stats in sorted(commands.items(), key=lambda c: c[1].seconds, reverse=True):
+            self.poutput(
+                f"{command}  {command_stats.runs} runs  {command_stats.seconds:.2f}s  "
+                f"{command_stats.rpc_count} rpcs"
+            )
+            methods = sorted(command_stats.methods.items(), key=lambda m: m[1].latency_sum, reverse=True)
+            for method, method_stats in methods:
+                self.poutput(
+                    f"  {method_stats.count:6d} {method.rsplit('/', 1)[-1]:<32} "
+                    f"mean {method_stats.latency_mean * 1000:8.1f}ms  "
+                    f"p95 {method_stats.latency_quantile(0.95) * 1000:8.1f}ms  "
+                    f"max {method_stats.latency_max * 1000:8.1f}ms  "
+                    f"sent {method_stats.request_bytes}B  received {method_stats.response_bytes}B"
+                    + (f"  {method_stats.errors} errors" if method_stats.errors else '')
+                )
+
+    _stats_show_parser = _stats_subparser.add_parser('show', help='show rpcs made by each command')
+    _stats_show_parser.add_argument('command', nargs='*', type=str, help='only show this command, i.e. missions execute')
+    _stats_show_parser.set_defaults(func=stats_show)
+
+    def stats_export(self, args):
+        ''' write the stats as json or prometheus text '''
+        if args.format == 'json':
+            output = self.spot.rpc_stats.to_json()
+        else:
+            output = self.spot.rpc_stats.to_prometheus()
+        if args.path:
+            pathlib.Path(args.path).write_text(output)
+        else:
+            self.poutput(output)
+
+    _stats_export_parser = _stats_subparser.add_parser('export', help='export stats as json or prometheus text')
+    _stats_export_parser.add_argument('format', choices=['json', 'prometheus'], help='export format')
+    _stats_export_parser.add_argument('path', nargs='?', type=str, help='file to write, prints when omitted')
+    _stats_export_parser.set_defaults(func=stats_export)
+
+    def stats_reset(self, args):
+        ''' clear the recorded stats '''
+        self.spot.rpc_stats.reset()
+
+    _stats_reset_parser = _stats_subparser.add_parser('reset', help='clear recorded stats')
+    _stats_reset_parser.set_defaults(func=stats_reset)
+
+    def stats_clients(self, args):
+        ''' print how long each sdk client took to come up '''
+        self.poutput(self.spot.clients.report())
+
+    _stats_clients_parser = _stats_subparser.add_parser('clients', help='show how long each client took to connect')
+    _stats_clients_parser.set_defaults(func=stats_clients)
+
+    @cmd2.with_argparser(_stats_parser)
+    def do_stats(self, args):
+        ''' rpc counts, latency and bytes by console command '''
+        func = getattr(args, 'func', None)
+        if func is not None:
+            func(self, args)
+        else:
+            self.do_help('stats')
+
     _lease_parser = cmd2.Cmd2ArgumentParser()
     _lease_action_choices = ['acquire', 'take', 'release']
     _lease_parser.add_argument('command', choices=_lease_action_choices, help='manage lease for robot')
@@ -199,6 +388,8 @@ class App(cmd2.Cmd):
     @cmd2.with_argparser(_robot_parser)
     def do_robot(self, args):
         ''' command the robot '''
+        if args.command in ('stand', 'sit', 'undock', 'dock', 'return') and self._scheduler_busy():
+            return
         if args.command == 'stand':
             self.spot.robot_command.stand()
         elif args.command == 'sit':
@@ -219,9 +410,7 @@ class App(cmd2.Cmd):
             self.spot.docking.dock(docks[0])
         elif args.command == 'return':
             if self.dock_id:
-                waypoint_id = self.map.get_waypoint_id_by_fiducial(self.dock_id)
-                self.spot.graph_nav.navigate_to_waypoint(waypoint_id)
-                self.spot.docking.dock(self.dock_id)
+                self.spot.docking.return_to_dock(self.map, self.dock_id)
             else:
                 self.poutput("no dock_id stored to return to")
         elif args.command == 'localize':
@@ -236,19 +425,28 @@ class App(cmd2.Cmd):
     def fiducials_list(self, args):
         ''' list available fiducials on loaded map '''
         fiducials = self.map.get_fiducials()
+        # resolve all of the fiducials in one call, to flag those which can't be navigated to
+        waypoint_ids = self.map.get_waypoint_ids_by_fiducials(fiducials)
         for f in fiducials:
-            self.poutput(f"{f}")
-        self.map.get_waypoint_id_by_fiducial(fiducials[0])
+            if waypoint_ids[f] is None:
+                self.poutput(f"{f} (no waypoint to goto)")
+            else:
+                self.poutput(f"{f}")
 
     _fiducials_list_parser = _fiducials_subparser.add_parser('list', help='list fiducials on the loaded map')
     _fiducials_list_parser.set_defaults(func=fiducials_list)
 
     def fiducials_goto(self, args):
         ''' goto a fiducial '''
+        if self._scheduler_busy():
+            return
         waypoint_id = self.map.get_waypoint_id_by_fiducial(args.fiducial)
         if not waypoint_id:
             self.poutput(f"could not find position for fiducial {args.fiducial}")
-        self.spot.graph_nav.navigate_to_waypoint(waypoint_id)
+            return
+        result = self.spot.graph_nav.navigate_to_waypoint(waypoint_id)
+        if not result:
+            self.poutput(str(result))
 
     _fiducials_goto_parser = _fiducials_subparser.add_parser('goto', help='move to a fiducial')
     _fiducials_goto_parser.add_argument('fiducial', type=int, help='number of fidcuial to goto')
@@ -263,21 +461,96 @@ class App(cmd2.Cmd):
         else:
             self.do_help('fiducials')
 
+    _maps_parser = cmd2.Cmd2ArgumentParser()
+    _maps_subparser = _maps_parser.add_subparsers(title='subcommands', help='maps subcommands help')
+
+    def maps_list(self, args):
+        ''' list the autowalk maps in the workspace '''
+        for name in self.workspace.names:
+            flags = []
+            if name == self.workspace.pinned:
+                flags.append('in use')
+            elif self.workspace.is_loaded(name):
+                flags.append('loaded')
+            self.poutput(f"{name} ({', '.join(flags)})" if flags else name)
+
+    _maps_list_parser = _maps_subparser.add_parser('list', help='list available maps')
+    _maps_list_parser.set_defaults(func=maps_list)
+
+    def maps_use(self, args):
+        ''' switch the map on the robot, and the missions, to another autowalk '''
+        name = ' '.join(args.name)
+        if self.scheduler is not None and self.scheduler.running:
+            self.poutput('stop the scheduler before switching maps')
+            return
+        if name == self.workspace.pinned:
+            self.poutput(f"already using {name}")
+            return
+        try:
+            map = self.workspace.get(name)
+        except MapWorkspaceError as e:
+            self.poutput(str(e))
+            return
+        try:
+            upload_report = self.spot.graph_nav.upload_map(map, incremental=True)
+        except Exception as e:
+            self.poutput(f"unable to upload {name}: {e}")
+            return
+        self.poutput(str(upload_report))
+        # queued jobs are for missions of the previous map
+        if self.scheduler is not None:
+            self.scheduler.close()
+            self.scheduler = None
+        self.workspace.pin(name)
+        self.map = map
+        self.autowalk_path = self.workspace.path(name)
+        self.py_locals['map'] = map
+        # the originating dock is on the previous map
+        self.dock_id = None
+        self.poutput(f"using {name}, localize the robot on the map before moving")
+
+    _maps_use_parser = _maps_subparser.add_parser('use', help='upload another map to the robot and use its missions')
+    _maps_use_parser.add_argument('name', nargs='+', type=str, help='name of map to use')
+    _maps_use_parser.set_defaults(func=maps_use)
+
+    @cmd2.with_argparser(_maps_parser)
+    def do_maps(self, args):
+        ''' manage autowalk maps '''
+        func = getattr(args, 'func', None)
+        if func is not None:
+            func(self, args)
+        else:
+            self.do_help('maps')
+
     _missions_parser = cmd2.Cmd2ArgumentParser()
     _missions_subparser = _missions_parser.add_subparsers(title='subcommands', help='missions subcommands help')
 
+    @property
+    def missions(self):
+        # the catalog follows the autowalk path when switching maps
+        return self.spot.autowalk.catalog(self.autowalk_path)
+
     def missions_list(self, args):
-        missions_path = self.autowalk_path / 'missions'
-        for mission in missions_path.glob('*.walk'):
-            # exclude the .walk extension from the listings
-            self.poutput(mission.stem.replace('.walk', ''))
+        for name in self.missions.names:
+            try:
+                info = self.missions.info(name, self.map)
+            except Exception as e:
+                self.poutput(f"{name} ({e})")
+                continue
+            path_length = info['path_length']
+            path_length = 'unreachable' if math.isinf(path_length) else f"{path_length:.1f}m"
+            self.poutput(
+                f"{name} ({info['elements']} elements, {len(set(info['target_waypoints']))} waypoints, {path_length})"
+            )
 
     _missions_list_parser = _missions_subparser.add_parser('list', help='list available missions')
     _missions_list_parser.set_defaults(func=missions_list)
 
     def missions_execute(self, args):
+        if self._scheduler_busy():
+            return
         try:
-            mission = Mission.from_filesystem(self.autowalk_path, f"{' '.join(args.name)}.walk")
+            mission = self.missions.get(' '.join(args.name))
             mission.skip_docking()  # when running missions via spot console we skip docking by default
             self.spot.autowalk.upload_mission(mission)
             # when the robot is docked when the mission is run
@@ -287,22 +560,28 @@ class App(cmd2.Cmd):
                 self.dock_id = dock_id
                 self.spot.docking.undock()
                 self.spot.graph_nav.localize_to_fiducial()
-            self.spot.mission.run()
+            self.spot.mission.run(on_node_status=self._print_mission_progress)
             # if the robot was docked when the mission was started, return to the dock
             if dock_id:
-                waypoint_id = self.map.get_waypoint_id_by_fiducial(dock_id)
-                self.spot.graph_nav.navigate_to_waypoint(waypoint_id)
-                self.spot.docking.dock(dock_id)
+                self.spot.docking.return_to_dock(self.map, dock_id)
         except Exception as e:
             self.poutput(str(e))
 
+    def _print_mission_progress(self, node_status_change):
+        # show the named mission nodes as they finish
+        if node_status_change.name and node_status_change.finished:
+            self.poutput(str(node_status_change))
+
     _missions_execute_parser = _missions_subparser.add_parser('execute', help='load and run a mission')
     _missions_execute_parser.add_argument('name', nargs='+', type=str, help='name of mission to execute')
     _missions_execute_parser.set_defaults(func=missions_execute)
 
     def missions_loop(self, args):
+        if self._scheduler_busy():
+            return
+        name = ' '.join(args.name)
         try:
-            mission = Mission.from_filesystem(self.autowalk_path, f"{' '.join(args.name)}.walk")
+            mission = self.missions.get(name)
             mission.skip_docking()  # when running missions via spot console we skip docking
             self.spot.autowalk.upload_mission(mission)
             # when the robot is docked when the loop starts
@@ -314,10 +593,33 @@ class App(cmd2.Cmd):
                 self.spot.graph_nav.localize_to_fiducial()
             # run the mission on a loop
             # the only exit here is engaging the estop then manually assuming control
+            # w/ a known dock the loop breaks to charge when the battery won't last another run
+            restart = False
             while True:
-                self.spot.mission.run()
-                # reload mission to run again
-                self.spot.autowalk.upload_mission(mission)
+                run_started = time.perf_counter()
+                self.spot.mission.run(restart=restart)
+                run_seconds = time.perf_counter() - run_started
+                target_waypoint_ids = mission.target_waypoint_ids
+                end_waypoint_id = target_waypoint_ids[-1] if target_waypoint_ids else None
+                charger = self.charger
+                if charger is not None and charger.needs_charge(run_seconds, end_waypoint_id):
+                    self.poutput(f"battery at {charger.battery}%, returning to dock {self.dock_id} to charge")
+                    charger.charge()
+                    self.poutput(f"charged to {charger.battery}%, resuming loop")
+                    charger.resume()
+                # the mission only has to be uploaded again when its file or the map changed
+                mission = self.missions.get(name)
+                mission.skip_docking()
+                started = time.perf_counter()
+                uploaded = self.spot.autowalk.upload_mission(mission, reuse=True)
+                elapsed = time.perf_counter() - started
+                if uploaded:
+                    self.poutput(f"mission changed, uploaded in {elapsed:.2f}s")
+                else:
+                    saved = self.spot.autowalk.last_upload_seconds - elapsed
+                    self.poutput(f"restarting loaded mission, saved {saved:.2f}s")
+                # restart the loaded mission rather than play it, play would resume the finished mission
+                restart = not uploaded
         except Exception as e:
             self.poutput(str(e))
 
@@ -334,6 +636,341 @@ class App(cmd2.Cmd):
         else:
             self.do_help('missions')
 
+    _schedule_parser = cmd2.Cmd2ArgumentParser()
+    _schedule_subparser = _schedule_parser.add_subparsers(title='subcommands', help='schedule subcommands help')
+
+    @staticmethod
+    def _schedule_window(value):
+        # daily time window as HH:MM-HH:MM
+        try:
+            start, end = value.split('-')
+            return (datetime.time.fromisoformat(start), datetime.time.fromisoformat(end))
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"window must be HH:MM-HH:MM, not {value}")
+
+    def _scheduler_busy(self):
+        # the scheduler drives the robot from its own thread, commands which also do are refused
+        if self.scheduler is not None and self.scheduler.running:
+            self.poutput('the scheduler is running missions, stop it first with schedule stop')
+            return True
+        return False
+
+    def _get_scheduler(self):
+        if self.scheduler is None:
+            self.scheduler = MissionScheduler(self.spot, self.missions, self.map, charger=self.charger)
+            self.scheduler.subscribe(self._print_job_progress)
+        return self.scheduler
+
+    def _print_job_progress(self, job, message):
+        # called from the scheduler thread, print above the prompt while waiting on input
+        text = f"job {job.id} {message}" if job is not None else message
+        if self.terminal_lock.acquire(blocking=False):
+            try:
+                self.async_alert(text)
+            except RuntimeError:
+                self.poutput(text)
+            finally:
+                self.terminal_lock.release()
+        else:
+            self.poutput(text)
+
+    def schedule_add(self, args):
+        scheduler = self._get_scheduler()
+        try:
+            job = scheduler.submit(' '.join(args.name), priority=args.priority, window=args.window,
+                min_battery=args.min_battery)
+        except SchedulerError as e:
+            self.poutput(str(e))
+            return
+        self.poutput(f"queued {job}")
+
+    _schedule_add_parser = _schedule_subparser.add_parser('add', help='queue a mission')
+    _schedule_add_parser.add_argument('name', nargs='+', type=str, help='name of mission to queue')
+    _schedule_add_parser.add_argument('--priority', type=int, default=0, help='higher priority missions run first')
+    _schedule_add_parser.add_argument('--window', type=_schedule_window,
+        help='daily time window the mission may start in, HH:MM-HH:MM')
+    _schedule_add_parser.add_argument('--min-battery', type=int, help='battery percentage required to start')
+    _schedule_add_parser.set_defaults(func=schedule_add)
+
+    def schedule_list(self, args):
+        if self.scheduler is None:
+            return
+        for job in self.scheduler.jobs:
+            if args.all or not job.done:
+                self.poutput(str(job))
+
+    _schedule_list_parser = _schedule_subparser.add_parser('list', help='list queued and running missions')
+    _schedule_list_parser.add_argument('--all', action='store_true', help='include finished missions')
+    _schedule_list_parser.set_defaults(func=schedule_list)
+
+    def schedule_cancel(self, args):
+        try:
+            job = self._get_scheduler().cancel(args.job)
+        except SchedulerError as e:
+            self.poutput(str(e))
+            return
+        self.poutput(f"cancelled {job}")
+
+    _schedule_cancel_parser = _schedule_subparser.add_parser('cancel', help='cancel a queued mission')
+    _schedule_cancel_parser.add_argument('job', type=int, help='id of the job to cancel')
+    _schedule_cancel_parser.set_defaults(func=schedule_cancel)
+
+    def schedule_start(self, args):
+        scheduler = self._get_scheduler()
+        # charging between jobs needs the originating dock, or the dock the robot is on
+        if self.dock_id is None:
+            self.dock_id = self.spot.docking.get_dock_id()
+        scheduler.charger = scheduler.charger or self.charger
+        if scheduler.charger is not None:
+            scheduler.charger.reserve = args.reserve
+            scheduler.charger.resume_at = args.resume_at
+        try:
+            scheduler.start()
+        except SchedulerError as e:
+            self.poutput(str(e))
+            return
+        self.poutput('scheduler started, the console remains available while missions run')
+
+    _schedule_start_parser = _schedule_subparser.add_parser('start', help='run queued missions in the background')
+    _schedule_start_parser.add_argument('--reserve', type=int, default=10,
+        help='battery percentage to keep on top of what the next mission and the walk back to the dock need')
+    _schedule_start_parser.add_argument('--resume-at', type=int, default=90,
+        help='battery percentage to charge to before continuing')
+    _schedule_start_parser.set_defaults(func=schedule_start)
+
+    def schedule_stop(self, args):
+        if self.scheduler is None or not self.scheduler.running:
+            self.poutput('scheduler is not running')
+            return
+        self.poutput('stopping once the current mission finishes')
+        self.scheduler.stop(wait=False)
+
+    _schedule_stop_parser = _schedule_subparser.add_parser('stop', help='stop after the current mission')
+    _schedule_stop_parser.set_defaults(func=schedule_stop)
+
+    def schedule_stats(self, args):
+        if self.scheduler is None:
+            self.poutput('nothing scheduled')
+            return
+        stats = self.scheduler.stats()
+        jobs = ', '.join(f"{count} {status.lower()}" for status, count in stats['jobs'].items() if count)
+        self.poutput(f"{'running' if stats['running'] else 'stopped'}, {jobs or 'no jobs'}")
+        self.poutput(f"{stats['missions_per_hour']:.1f} missions per hour over {stats['elapsed_seconds']:.0f}s")
+        if stats['mean_mission_seconds'] is not None:
+            self.poutput(f"{stats['mean_mission_seconds']:.1f}s per mission, {stats['charging_seconds']:.0f}s charging")
+
+    _schedule_stats_parser = _schedule_subparser.add_parser('stats', help='show scheduler throughput')
+    _schedule_stats_parser.set_defaults(func=schedule_stats)
+
+    @cmd2.with_argparser(_schedule_parser)
+    def do_schedule(self, args):
+        ''' queue missions to run in the background '''
+        func = getattr(args, 'func', None)
+        if func is not None:
+            func(self, args)
+        else:
+            self.do_help('schedule')
+
+    _telemetry_parser = cmd2.Cmd2ArgumentParser()
+    _telemetry_subparser = _telemetry_parser.add_subparsers(title='subcommands', help='telemetry subcommands help')
+
+    def telemetry_start(self, args):
+        if self.telemetry is not None and self.telemetry.running:
+            self.poutput(f"already recording to {self.telemetry.path}")
+            return
+        path = pathlib.Path(args.path) if args.path else \
+            pathlib.Path('telemetry') / f"{self.spot.name}-{datetime.datetime.now():%Y%m%d-%H%M%S}.tlog"
+        self.telemetry = TelemetryRecorder(self.spot, path, rate_hz=args.rate)
+        try:
+            self.telemetry.start()
+        except (OSError, TelemetryError) as e:
+            self.poutput(f"unable to record to {path}: {e}")
+            return
+        self.poutput(f"recording to {path} at {args.rate:g}hz")
+
+    _telemetry_start_parser = _telemetry_subparser.add_parser('start', help='record robot telemetry in the background')
+    _telemetry_start_parser.add_argument('path', nargs='?', type=str,
+        help='log to record to, appended to when it exists, defaults to ./telemetry/<robot>-<time>.tlog')
+    _telemetry_start_parser.add_argument('--rate', type=float, default=10.0, help='samples per second')
+    _telemetry_start_parser.set_defaults(func=telemetry_start)
+
+    def telemetry_stop(self, args):
+        if self.telemetry is None or not self.telemetry.running:
+            self.poutput('not recording')
+            return
+        self.telemetry.stop()
+        self.poutput(f"recorded to {self.telemetry.path}")
+
+    _telemetry_stop_parser = _telemetry_subparser.add_parser('stop', help='stop recording')
+    _telemetry_stop_parser.set_defaults(func=telemetry_stop)
+
+    def telemetry_status(self, args):
+        if self.telemetry is None:
+            self.poutput('not recording')
+            return
+        stats = self.telemetry.stats()
+        self.poutput(f"{'recording' if stats['running'] else 'stopped'} {stats['path']}")
+        self.poutput(f"{stats['ticks']} samples at {stats['rate_hz']:.1f}hz over {stats['elapsed_seconds']:.0f}s, "
+            f"{stats['late_ticks']} late, {stats['dropped']} dropped")
+        for channel, count in stats['samples'].items():
+            errors = stats['errors'][channel]
+            self.poutput(f"  {channel:<16} {count}" + (f"  {errors} errors" if errors else ''))
+        if stats['compression_ratio'] is not None:
+            self.poutput(f"{stats['bytes_written']} bytes written, {stats['compression_ratio']:.1f}x compressed")
+
+    _telemetry_status_parser = _telemetry_subparser.add_parser('status', help='show the recording rate and totals')
+    _telemetry_status_parser.set_defaults(func=telemetry_status)
+
+    def telemetry_info(self, args):
+        try:
+            log = TelemetryLog(' '.join(args.path))
+        except TelemetryError as e:
+            self.poutput(str(e))
+            return
+        with log:
+            if len(log) == 0:
+                self.poutput('no records')
+                return
+            self.poutput(f"{datetime.datetime.fromtimestamp(log.start_time):%Y-%m-%d %H:%M:%S} "
+                f"for {log.duration:.1f}s, {len(log)} records in {len(log.chunks)} chunks, {log.size} bytes")
+            # start and end are seconds into the recording, only the chunks in between are read
+            start = log.start_time + args.start if args.start is not None else None
+            end = log.start_time + args.end if args.end is not None else None
+            for channel, count in sorted(log.channel_counts(start, end).items()):
+                self.poutput(f"  {channel:<16} {count}")
+
+    _telemetry_info_parser = _telemetry_subparser.add_parser('info', help='summarize a recorded log')
+    _telemetry_info_parser.add_argument('path', nargs='+', type=str, help='log to summarize')
+    _telemetry_info_parser.add_argument('--start', type=float, help='count records from this many seconds in')
+    _telemetry_info_parser.add_argument('--end', type=float, help='count records up to this many seconds in')
+    _telemetry_info_parser.set_defaults(func=telemetry_info)
+
+    @cmd2.with_argparser(_telemetry_parser)
+    def do_telemetry(self, args):
+        ''' record robot state, localization and mission state to a log '''
+        func = getattr(args, 'func', None)
+        if func is not None:
+            func(self, args)
+        else:
+            self.do_help('telemetry')
+
+    _fleet_parser = cmd2.Cmd2ArgumentParser()
+    _fleet_subparser = _fleet_parser.add_subparsers(title='subcommands', help='fleet subcommands help')
+
+    def _fleet_hostnames(self, include_self=True):
+        return [
+            hostname for hostname in self.fleet.hostnames
+            if include_self or hostname != self.spot.hostname
+        ]
+
+    def _print_fleet_results(self, results, describe=str):
+        for hostname, result in results.items():
+            if result:
+                self.poutput(f"{hostname} {describe(result.value)} ({result.seconds:.1f}s)")
+            else:
+                self.poutput(f"{hostname} failed: {result.error}")
+
+    def fleet_status(self, args):
+        ''' power, battery and estop of every robot, fetched all at once '''
+        def _describe(robot_state):
+            return ' '.join([
+                f"motors {self.spot.power.status_from(robot_state).lower()}",
+                f"estop {self.spot.estop.status_from(robot_state).lower()}",
+                f"{self.spot.power.battery_from(robot_state)}%",
+            ])
+        self._print_fleet_results(self.fleet.robot_states(), _describe)
+
+    _fleet_status_parser = _fleet_subparser.add_parser('status', help='show the status of every robot')
+    _fleet_status_parser.set_defaults(func=fleet_status)
+
+    def fleet_connect(self, args):
+        ''' reconnect to robots which failed to connect or were dropped '''
+        for hostname, result in self.fleet.connect().items():
+            self.poutput(f"{hostname} connected" if result else f"{hostname} failed: {result.error}")
+
+    _fleet_connect_parser = _fleet_subparser.add_parser('connect', help='connect to robots which aren\'t connected')
+    _fleet_connect_parser.set_defaults(func=fleet_connect)
+
+    def fleet_initialize(self, args):
+        self._print_fleet_results(self.fleet.run(self._initialize_robot), lambda value: 'initialized')
+
+    _fleet_initialize_parser = _fleet_subparser.add_parser('initialize',
+        help='setup estop, take lease and power on every robot')
+    _fleet_initialize_parser.set_defaults(func=fleet_initialize)
+
+    def _fleet_dock_id(self, spot):
+        if spot is self.spot:
+            return self.dock_id
+        return self._fleet_dock_ids.get(spot.hostname)
+
+    def _fleet_execute(self, spot, mission_name):
+        # each robot gets its own copy of the mission, and the map when it doesn't have it yet
+        mission = self.missions.get(mission_name)
+        mission.skip_docking()
+        spot.graph_nav.upload_map(self.map, incremental=True)
+        spot.autowalk.upload_mission(mission)
+        dock_id = spot.docking.get_dock_id()
+        if dock_id:
+            if spot is self.spot:
+                self.dock_id = dock_id
+            else:
+                self._fleet_dock_ids[spot.hostname] = dock_id
+            spot.docking.undock()
+            spot.graph_nav.localize_to_fiducial()
+        status = spot.mission.run()
+        # robots which started on a dock return to it, as w/ missions execute
+        if dock_id:
+            spot.docking.return_to_dock(self.map, dock_id)
+        return status
+
+    def fleet_missions_execute(self, args):
+        name = ' '.join(args.name)
+        if name not in self.missions.names:
+            self.poutput(f"mission not found {name}")
+            return
+        results = self.fleet.run(lambda spot: self._fleet_execute(spot, name))
+        self._print_fleet_results(results, lambda status: f"mission {status.lower()}")
+
+    _fleet_missions_parser = _fleet_subparser.add_parser('missions', help='run missions on every robot')
+    _fleet_missions_subparser = _fleet_missions_parser.add_subparsers(title='subcommands',
+        help='fleet missions subcommands help')
+    _fleet_missions_execute_parser = _fleet_missions_subparser.add_parser('execute',
+        help='load and run a mission on every robot at once')
+    _fleet_missions_execute_parser.add_argument('name', nargs='+', type=str, help='name of mission to execute')
+    _fleet_missions_execute_parser.set_defaults(func=fleet_missions_execute)
+
+    def _fleet_dock(self, spot):
+        if spot.docking.is_docked():
+            return f"already docked at {spot.docking.get_dock_id()}"
+        dock_id = self._fleet_dock_id(spot)
+        if dock_id:
+            spot.docking.return_to_dock(self.map, dock_id)
+            return f"returned to dock {dock_id}"
+        docks = spot.world_object.get_visible_docks()
+        if len(docks) == 0:
+            raise FleetError('no originating or visible dock')
+        spot.docking.dock(docks[0])
+        return f"docked at {docks[0]}"
+
+    def fleet_dock(self, args):
+        self._print_fleet_results(self.fleet.run(self._fleet_dock))
+
+    _fleet_dock_parser = _fleet_subparser.add_parser('dock',
+        help='return every robot to its originating dock, or dock at a visible dock')
+    _fleet_dock_parser.set_defaults(func=fleet_dock)
+
+    @cmd2.with_argparser(_fleet_parser)
+    def do_fleet(self, args):
+        ''' command every robot of the fleet at once '''
+        if self.fleet is None:
+            self.poutput('no fleet, start with --fleet to add robots')
+            return
+        func = getattr(args, 'func', None)
+        if func is not None:
+            func(self, args)
+        else:
+            self.do_help('fleet')
+
     @classmethod
     def run(cls):
 
@@ -362,10 +999,22 @@ class App(cmd2.Cmd):
             nargs='+',
             required=True,
         )
+        parser.add_argument('--workspace',
+            help='directory of autowalks to switch between, defaults to the directory of --autowalk',
+            nargs='+',
+        )
         parser.add_argument('--initialize',
             help='enable initialize robot on startup',
             action='store_true',
         )
+        parser.add_argument('--fleet',
+            help='hostnames of other robots to command w/ the fleet command, using the same credentials',
+            nargs='+',
+        )
+        parser.add_argument('--status-refresh',
+            help='refresh the prompt status in the background every N seconds',
+            type=float,
+        )
         args = parser.parse_args(sys.argv[1:])
 
         # overwrite env values with cli args
@@ -384,12 +1033,51 @@ class App(cmd2.Cmd):
             print(f"{autowalk_path} does not exist")
             sys.exit(1)
 
-        # connect to robot
-        spot = Spot.connect(hostname, username, password)
+        workspace_path = autowalk_path.parent
+        if args.workspace:
+            workspace_path = pathlib.Path(' '.join(args.workspace)).resolve()
+            if not workspace_path.is_dir():
+                print(f"{workspace_path} is not a directory")
+                sys.exit(1)
+
+        timer = PhaseTimer()
+
+        # connect to robot, w/ a fleet connect to all of the robots at once
+        def _connect():
+            if not args.fleet:
+                return Spot.connect(hostname, username, password, timer=timer), None
+            with timer.phase('sdk'):
+                fleet = Fleet()
+            for fleet_hostname in [hostname] + [h for h in args.fleet if h != hostname]:
+                fleet.add(fleet_hostname, username, password)
+            with timer.phase('fleet connect'):
+                results = fleet.connect()
+            for result in results.values():
+                if not result:
+                    print(f"unable to connect to {result.hostname}: {result.error}")
+            return fleet.spots.get(hostname), fleet
+
+        # the sdk import, authentication and time sync run on a thread while the map is parsed here
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix='connect') as executor:
+            connecting = executor.submit(_connect)
+            with timer.phase('map'):
+                workspace = MapWorkspace.from_directory(workspace_path)
+                workspace.get(workspace.add(autowalk_path)).prepare()
+            spot, fleet = connecting.result()
+        if spot is None:
+            print(f"{hostname} is not connected")
+            sys.exit(1)
 
         # clear startup arguments so they aren't passed into cmd2 app
         sys.argv = sys.argv[:1]
 
         # start app
-        app = cls(spot, autowalk_path, initialize_robot=args.initialize)
+        app = cls(spot, autowalk_path,
+            initialize_robot=args.initialize,
+            status_refresh=args.status_refresh,
+            workspace=workspace,
+            fleet=fleet,
+            timer=timer,
+        )
+        app.poutput(timer.report())
         sys.exit(app.cmdloop())
@@ -0,0 +1 @@
+from .robot import FakeRobot
@@ -0,0 +1,160 @@
+import logging
+import sys
+import argparse
+import pathlib
+import statistics
+import time
+from bosdyn.api.autowalk import walks_pb2
+from spot_world.fake.robot import FakeRobot
+from spot_world.spot.autowalk import Mission
+from spot_world.spot.graph_nav import Map
+
+logger = logging.getLogger(__name__)
+
+
+class BenchmarkResult:
+
+    def __init__(self, name, durations, rpc_counts):
+        self.name = name
+        # seconds for each repetition
+        self.durations = durations
+        # rpcs made by one repetition, by method name
+        self.rpc_counts = rpc_counts
+
+    @property
+    def rpc_total(self):
+        return sum(self.rpc_counts.values())
+
+    def __str__(self):
+        return (
+            f"{self.name:<24} best {min(self.durations):8.3f}s  "
+            f"mean {statistics.mean(self.durations):8.3f}s  {self.rpc_total:6d} rpcs"
+        )
+
+
+class Benchmark:
+    ''' times the spot facades against a FakeRobot, with latency seconds added to every rpc '''
+
+    def __init__(self, autowalk_path: pathlib.Path, latency=0.005, repeat=3,
+            speed=10.0, mission_elements=5, element_seconds=0.1):
+        self.autowalk_path = autowalk_path
+        self.repeat = repeat
+        self.speed = speed
+        self.mission_elements = mission_elements
+        self.fake_robot = FakeRobot(latency=latency)
+        self.fake_robot.graph_nav.speed = speed
+        self.fake_robot.mission.element_seconds = element_seconds
+        self.spot = None
+        self.map = None
+
+    def _measure(self, name, case, setup=None):
+        durations = []
+        for _ in range(self.repeat):
+            if setup is not None:
+                setup()
+            self.fake_robot.reset_rpc_counts()
+            started = time.perf_counter()
+            case()
+            durations.append(time.perf_counter() - started)
+        # rpc counts are those of the last repetition
+        return BenchmarkResult(name, durations, dict(self.fake_robot.rpc_counts))
+
+    def _mission(self):
+        walk = walks_pb2.Walk()
+        for i in range(self.mission_elements):
+            walk.elements.add(name=f"element-{i}")
+        return Mission(walk)
+
+    def _prompt_refresh(self):
+        # the console prompt reads power, battery and estop from one robot state
+        robot_state = self.spot.robot_state.get()
+        self.spot.power.status_from(robot_state)
+        self.spot.power.battery_from(robot_state)
+        self.spot.estop.status_from(robot_state)
+
+    def _navigate(self):
+        # navigate to the far end of the map and back to the first waypoint
+        far_waypoint_id = self.map.graph.waypoints[-1].id
+        for waypoint_id in (far_waypoint_id, self.map.first_waypoint.id):
+            result = self.spot.graph_nav.navigate_to_waypoint(waypoint_id, timeout=60, expected_speed=self.speed)
+            if not result:
+                logger.warning(f"benchmark navigation failed: {result}")
+
+    def _run_mission(self):
+        self.spot.autowalk.upload_mission(self._mission())
+        self.spot.mission.run()
+
+    def _rerun_mission(self):
+        # as in missions loop, the loaded mission is restarted instead of uploaded again
+        uploaded = self.spot.autowalk.upload_mission(self._mission(), reuse=True)
+        self.spot.mission.run(restart=not uploaded)
+
+    def run(self):
+        results = []
+        with self.fake_robot:
+            started = time.perf_counter()
+            self.spot = self.fake_robot.connect()
+            results.append(BenchmarkResult('connect', [time.perf_counter() - started],
+                dict(self.fake_robot.rpc_counts)))
+            results.append(self._measure('map load (eager)',
+                lambda: Map.from_filesystem(self.autowalk_path)))
+            results.append(self._measure('map load (lazy)',
+                lambda: Map.from_filesystem(self.autowalk_path, lazy=True)))
+            results.append(self._measure('map load (cached)',
+                lambda: Map.from_filesystem(self.autowalk_path, lazy=True, cache=True)))
+            self.map = Map.from_filesystem(self.autowalk_path, lazy=True)
+            results.append(self._measure('map upload (full)',
+                lambda: self.spot.graph_nav.upload_map(self.map),
+                setup=self.spot.graph_nav.clear))
+            results.append(self._measure('map upload (unchanged)',
+                lambda: self.spot.graph_nav.upload_map(self.map, incremental=True)))
+            results.append(self._measure('map download',
+                self.spot.graph_nav.download_map))
+            results.append(self._measure('prompt refresh', self._prompt_refresh))
+            self.spot.lease.take()
+            self.spot.graph_nav.localize_to_fiducial()
+            results.append(self._measure('navigate round trip', self._navigate))
+            results.append(self._measure('mission run', self._run_mission))
+            results.append(self._measure('mission rerun (restart)', self._rerun_mission))
+            self.spot.lease.release()
+        return results
+
+    @classmethod
+    def main(cls):
+        parser = argparse.ArgumentParser(description='benchmark spot-world against an in process fake robot')
+        parser.add_argument('--autowalk',
+            help='directory containing autowalk to benchmark with',
+            nargs='+',
+            required=True,
+        )
+        parser.add_argument('--latency',
+            help='seconds of latency added to every rpc',
+            type=float,
+            default=0.005,
+        )
+        parser.add_argument('--repeat',
+            help='repetitions of each benchmark',
+            type=int,
+            default=3,
+        )
+        parser.add_argument('--rpcs',
+            help='print rpc counts by method for each benchmark',
+            action='store_true',
+        )
+        args = parser.parse_args(sys.argv[1:])
+
+        autowalk_path = pathlib.Path(' '.join(args.autowalk)).resolve()
+        if not autowalk_path.exists():
+            print(f"{autowalk_path} does not exist")
+            sys.exit(1)
+
+        benchmark = cls(autowalk_path, latency=args.latency, repeat=args.repeat)
+        for result in benchmark.run():
+            print(result)
+            if args.rpcs:
+                for method, count in sorted(result.rpc_counts.items()):
+                    print(f"    {count:6d}  {method}")
+
+
+if __name__ == '__main__':
+    Benchmark.main()
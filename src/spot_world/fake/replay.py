@@ -0,0 +1,270 @@
+import logging
+import sys
+import argparse
+import pathlib
+import bisect
+import time
+from bosdyn.api.mission import mission_pb2
+from spot_world.fake.robot import FakeRobot
+from spot_world.spot.graph_nav import NavigationControl
+from spot_world.spot.telemetry import TelemetryLog, TelemetryChannel
+
+logger = logging.getLogger(__name__)
+
+
+class ReplayError(Exception):
+    pass
+
+
+class Replay:
+    ''' a recorded session served by a FakeRobot in place of its simulation, at speed times real time
+
+    the recording time starts at start (by default the start of the log) when the replay is started,
+    and advances speed recorded seconds per second. each request gets the latest response recorded at
+    or before the recording time, or the first one recorded before there is one. the same log and
+    speed always serve the same responses at the same recording time
+    '''
+
+    def __init__(self, log: TelemetryLog, start=None, end=None, speed=1.0):
+        self.speed = speed
+        # channel -> timestamps, and the records at them. records before start are kept, so a
+        # replay from the middle of a session is served what the robot had last reported
+        self._timestamps = {}
+        self._records = {}
+        for record in log.read(None, end):
+            self._timestamps.setdefault(record.channel, []).append(record.timestamp)
+            self._records.setdefault(record.channel, []).append(record)
+        if not self._records:
+            raise ReplayError(f"no records to replay in {log.path}")
+        self.start_time = start if start is not None else log.start_time
+        self.end_time = end if end is not None else log.end_time
+        # (channel, index) -> parsed message, parsed on first use
+        self._messages = {}
+        # the recorded mission history, in the order it was recorded and by ascending tick, as
+        # (timestamp, mission id, NodeStatesAtTick). each recorded state only has the ticks since the last
+        self._history_timestamps = []
+        self._history = []
+        for index, timestamp in enumerate(self._timestamps.get(TelemetryChannel.MISSION_STATE, [])):
+            state = self._message(TelemetryChannel.MISSION_STATE, index)
+            for node_states_at_tick in sorted(state.history, key=lambda h: h.tick_counter):
+                self._history_timestamps.append(timestamp)
+                self._history.append((timestamp, state.mission_id, node_states_at_tick))
+        self._started = None
+
+    def start(self):
+        self._started = time.monotonic()
+        return self
+
+    @property
+    def started(self):
+        return self._started is not None
+
+    def now(self):
+        ''' the recording time being replayed '''
+        if self._started is None:
+            return self.start_time
+        return self.start_time + (time.monotonic() - self._started) * self.speed
+
+    @property
+    def finished(self):
+        return self.now() >= self.end_time
+
+    def has(self, channel):
+        return channel in self._records
+
+    def _message(self, channel, index):
+        key = (channel, index)
+        message = self._messages.get(key)
+        if message is None:
+            message = self._messages[key] = self._records[channel][index].parse()
+        return message
+
+    def _index_at(self, channel, timestamp):
+        return max(0, bisect.bisect_right(self._timestamps[channel], timestamp) - 1)
+
+    def message(self, channel, timestamp=None):
+        ''' the message recorded on channel at or before timestamp (by default now), shared so don't modify it '''
+        if not self.has(channel):
+            raise ReplayError(f"nothing recorded on {channel}")
+        timestamp = self.now() if timestamp is None else timestamp
+        return self._message(channel, self._index_at(channel, timestamp))
+
+    def first_time(self, channel, predicate=None, after=None):
+        ''' timestamp of the first message on channel (after after) which predicate accepts, None when none do '''
+        timestamps = self._timestamps.get(channel, [])
+        index = bisect.bisect_left(timestamps, after) if after is not None else 0
+        for index in range(index, len(timestamps)):
+            if predicate is None or predicate(self._message(channel, index)):
+                return timestamps[index]
+        return None
+
+    def mission_state(self, lower_tick_bound=0, upper_tick_bound=None):
+        ''' the recorded mission state now, w/ the history recorded up to now within the tick bounds '''
+        latest = self.message(TelemetryChannel.MISSION_STATE)
+        state = mission_pb2.State()
+        state.CopyFrom(latest)
+        del state.history[:]
+        # ticks only increase within a mission, so walk back until before the lower bound
+        history = []
+        index = bisect.bisect_right(self._history_timestamps, self.now()) - 1
+        while index >= 0:
+            _, mission_id, node_states_at_tick = self._history[index]
+            if mission_id != state.mission_id or node_states_at_tick.tick_counter < lower_tick_bound:
+                break
+            if upper_tick_bound is None or node_states_at_tick.tick_counter <= upper_tick_bound:
+                history.append(node_states_at_tick)
+            index -= 1
+        # newest first, as the robot returns it
+        state.history.extend(history)
+        return state
+
+
+class ReplayResult:
+
+    def __init__(self, name, speed, outcome, wall_seconds, recording_seconds, detected_after, rpc_counts):
+        self.name = name
+        self.speed = speed
+        self.outcome = outcome
+        self.wall_seconds = wall_seconds
+        # recording seconds replayed before the control loop returned
+        self.recording_seconds = recording_seconds
+        # recording seconds between the recorded outcome and the control loop returning w/ it
+        self.detected_after = detected_after
+        self.rpc_counts = rpc_counts
+
+    @property
+    def rpc_total(self):
+        return sum(self.rpc_counts.values())
+
+    def __str__(self):
+        detected = f"{self.detected_after:6.2f}s" if self.detected_after is not None else '     n/a'
+        return (
+            f"{self.name:<10} {self.speed:6g}x  {self.outcome:<10} {self.recording_seconds:8.2f}s replayed "
+            f"in {self.wall_seconds:7.3f}s  detected after {detected}  {self.rpc_total:5d} rpcs"
+        )
+
+
+class ReplayRunner:
+    ''' runs the facade control loops against a FakeRobot replaying a telemetry log
+
+    navigation replays the recorded navigation feedback from its first response, and the mission
+    replays the recorded mission state from when it was first running. each run reports how long
+    after the recorded outcome the control loop noticed it, in recorded seconds, which is how the
+    polling behaves when the robot's state changes speed times faster than it was recorded
+    '''
+
+    def __init__(self, log_path: pathlib.Path, latency=0.0):
+        self.log = TelemetryLog(log_path)
+        self.fake_robot = FakeRobot(latency=latency)
+        self.spot = None
+
+    @staticmethod
+    def _navigation_done(feedback):
+        return feedback.status in NavigationControl.status_by_feedback
+
+    @staticmethod
+    def _mission_running(state):
+        return state.status == mission_pb2.State.STATUS_RUNNING
+
+    @staticmethod
+    def _mission_done(state):
+        return state.status not in (mission_pb2.State.STATUS_NONE, mission_pb2.State.STATUS_RUNNING)
+
+    def _replay(self, name, speed, channel, started, done, loop):
+        replay = Replay(self.log, start=self._start_time(channel, started), speed=speed)
+        done_time = replay.first_time(channel, done, after=replay.start_time)
+        self.fake_robot.reset_rpc_counts()
+        self.fake_robot.replay = replay.start()
+        wall_started = time.perf_counter()
+        try:
+            outcome = loop(replay)
+        finally:
+            returned = replay.now()
+            self.fake_robot.replay = None
+        return ReplayResult(name, speed, str(outcome), time.perf_counter() - wall_started,
+            returned - replay.start_time, returned - done_time if done_time is not None else None,
+            dict(self.fake_robot.rpc_counts))
+
+    def _start_time(self, channel, predicate):
+        # bypass Replay to find where in the log to start from
+        for record in self.log.read(channels=[channel]):
+            if predicate is None or predicate(record.parse()):
+                return record.timestamp
+        raise ReplayError(f"nothing to replay on {channel} in {self.log.path}")
+
+    def navigate(self, speed=1.0):
+        def _navigate(replay):
+            # the destination doesn't matter, the feedback is the recorded feedback
+            timeout = (replay.end_time - replay.start_time) / speed + 10
+            return self.spot.graph_nav.navigate_to_waypoint('replay', timeout=timeout).status
+        return self._replay('navigate', speed, TelemetryChannel.NAVIGATION_FEEDBACK, None,
+            self._navigation_done, _navigate)
+
+    def mission(self, speed=1.0):
+        def _mission(replay):
+            return self.spot.mission.run()
+        return self._replay('mission', speed, TelemetryChannel.MISSION_STATE, self._mission_running,
+            self._mission_done, _mission)
+
+    def run(self, speeds=(1.0,), loops=('navigate', 'mission')):
+        results = []
+        with self.fake_robot:
+            self.spot = self.fake_robot.connect()
+            self.spot.lease.take()
+            try:
+                for loop in loops:
+                    for speed in speeds:
+                        try:
+                            results.append(getattr(self, loop)(speed))
+                        except ReplayError as e:
+                            logger.warning(f"unable to replay {loop}: {e}")
+                            break
+            finally:
+                self.spot.lease.release()
+        return results
+
+    @classmethod
+    def main(cls):
+        parser = argparse.ArgumentParser(description='replay a telemetry log through the facades against a fake robot')
+        parser.add_argument('log',
+            help='telemetry log to replay',
+            nargs='+',
+        )
+        parser.add_argument('--speed',
+            help='recorded seconds replayed per second, one run per speed',
+            type=float,
+            nargs='+',
+            default=[1.0, 10.0, 100.0],
+        )
+        parser.add_argument('--loop',
+            help='control loops to replay',
+            choices=['navigate', 'mission'],
+            nargs='+',
+            default=['navigate', 'mission'],
+        )
+        parser.add_argument('--latency',
+            help='seconds of latency added to every rpc',
+            type=float,
+            default=0.0,
+        )
+        parser.add_argument('--rpcs',
+            help='print rpc counts by method for each run',
+            action='store_true',
+        )
+        args = parser.parse_args(sys.argv[1:])
+
+        log_path = pathlib.Path(' '.join(args.log)).resolve()
+        if not log_path.exists():
+            print(f"{log_path} does not exist")
+            sys.exit(1)
+
+        runner = cls(log_path, latency=args.latency)
+        for result in runner.run(speeds=args.speed, loops=args.loop):
+            print(result)
+            if args.rpcs:
+                for method, count in sorted(result.rpc_counts.items()):
+                    print(f"    {count:6d}  {method}")
+
+
+if __name__ == '__main__':
+    ReplayRunner.main()
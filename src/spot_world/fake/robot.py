@@ -0,0 +1,733 @@
+import logging
+import collections
+import itertools
+import threading
+import time
+import grpc
+from concurrent.futures import ThreadPoolExecutor
+from google.protobuf import timestamp_pb2
+from bosdyn.api import (
+    auth_pb2, auth_service_pb2_grpc,
+    directory_pb2, directory_service_pb2_grpc,
+    estop_pb2, estop_service_pb2_grpc,
+    header_pb2,
+    lease_pb2, lease_service_pb2_grpc,
+    power_pb2, power_service_pb2_grpc,
+    robot_id_pb2, robot_id_service_pb2_grpc,
+    robot_state_pb2, robot_state_service_pb2_grpc,
+    time_sync_pb2, time_sync_service_pb2_grpc,
+    world_object_pb2, world_object_service_pb2_grpc,
+)
+from bosdyn.api.autowalk import autowalk_pb2, autowalk_service_pb2_grpc
+from bosdyn.api.docking import docking_pb2, docking_service_pb2_grpc
+from bosdyn.api.graph_nav import graph_nav_pb2, graph_nav_service_pb2_grpc, map_pb2
+from bosdyn.api.mission import mission_pb2, mission_service_pb2_grpc, util_pb2
+from bosdyn.client import data_chunk
+from bosdyn.client.robot import Robot
+from bosdyn.client.robot_state import RobotStateClient
+from bosdyn.client.time_sync import TimeSyncClient
+from bosdyn.client.power import PowerClient
+from bosdyn.client.world_object import WorldObjectClient
+from bosdyn.client.graph_nav import GraphNavClient
+from bosdyn.client.autowalk import AutowalkClient
+from bosdyn.client.docking import DockingClient
+from bosdyn.client.lease import LeaseClient
+from bosdyn.client.estop import EstopClient
+from bosdyn.mission.client import MissionClient
+from spot_world.spot import Spot
+from spot_world.spot.routing import Router
+from spot_world.spot.telemetry import TelemetryChannel
+
+logger = logging.getLogger(__name__)
+
+
+def _timestamp(seconds=None):
+    timestamp = timestamp_pb2.Timestamp()
+    if seconds is None:
+        timestamp.GetCurrentTime()
+    else:
+        timestamp.FromNanoseconds(int(seconds * 1e9))
+    return timestamp
+
+
+def _header(request, response):
+    # every response carries the request header and an ok error code
+    response.header.request_header.CopyFrom(request.header)
+    response.header.request_received_timestamp.CopyFrom(_timestamp())
+    response.header.response_timestamp.CopyFrom(_timestamp())
+    response.header.error.code = header_pb2.CommonError.CODE_OK
+    return response
+
+
+def _chunks(message, chunk_size=1024 * 1024):
+    return list(data_chunk.chunk_message(message, chunk_size))
+
+
+class _RpcInterceptor(grpc.ServerInterceptor):
+    ''' counts every rpc by method and holds it for the fake robot's injected latency '''
+
+    def __init__(self, fake_robot):
+        self._fake_robot = fake_robot
+
+    def intercept_service(self, continuation, handler_call_details):
+        handler = continuation(handler_call_details)
+        if handler is None:
+            return None
+        method = handler_call_details.method
+        fake_robot = self._fake_robot
+
+        def _wrap(behavior):
+            def _behavior(request, context):
+                fake_robot._record_rpc(method)
+                if fake_robot.latency:
+                    time.sleep(fake_robot.latency)
+                return behavior(request, context)
+            return _behavior
+
+        if handler.unary_unary:
+            return grpc.unary_unary_rpc_method_handler(_wrap(handler.unary_unary),
+                handler.request_deserializer, handler.response_serializer)
+        if handler.unary_stream:
+            return grpc.unary_stream_rpc_method_handler(_wrap(handler.unary_stream),
+                handler.request_deserializer, handler.response_serializer)
+        if handler.stream_unary:
+            return grpc.stream_unary_rpc_method_handler(_wrap(handler.stream_unary),
+                handler.request_deserializer, handler.response_serializer)
+        return grpc.stream_stream_rpc_method_handler(_wrap(handler.stream_stream),
+            handler.request_deserializer, handler.response_serializer)
+
+
+class _InsecureRobot(Robot):
+    ''' sdk robot which reaches every service over one plaintext channel to the fake robot '''
+
+    def ensure_secure_channel(self, authority, options=[]):
+        if authority not in self.channels_by_authority:
+            # all authorities share the same server, so they share the same channel
+            channel = self.channels_by_authority.get(None)
+            if channel is None:
+                channel = grpc.insecure_channel(f"{self.address}:{self._secure_channel_port}", options=options)
+                self.channels_by_authority[None] = channel
+            self.channels_by_authority[authority] = channel
+        return self.channels_by_authority[authority]
+
+
+class FakeDirectoryServicer(directory_service_pb2_grpc.DirectoryServiceServicer):
+
+    # (service name, service type) of the services the fake robot provides
+    services = [
+        (client.default_service_name, client.service_type) for client in [
+            TimeSyncClient, RobotStateClient, PowerClient, WorldObjectClient, GraphNavClient,
+            MissionClient, AutowalkClient, DockingClient, LeaseClient, EstopClient,
+        ]
+    ]
+
+    def _entries(self):
+        return [
+            directory_pb2.ServiceEntry(name=name, type=service_type, authority='fake.spot.robot')
+            for name, service_type in self.services
+        ]
+
+    def ListServiceEntries(self, request, context):
+        return _header(request, directory_pb2.ListServiceEntriesResponse(service_entries=self._entries()))
+
+    def GetServiceEntry(self, request, context):
+        response = directory_pb2.GetServiceEntryResponse()
+        for entry in self._entries():
+            if entry.name == request.service_name:
+                response.service_entry.CopyFrom(entry)
+                response.status = directory_pb2.GetServiceEntryResponse.STATUS_OK
+                return _header(request, response)
+        response.status = directory_pb2.GetServiceEntryResponse.STATUS_NONEXISTENT_SERVICE
+        return _header(request, response)
+
+
+class FakeAuthServicer(auth_service_pb2_grpc.AuthServiceServicer):
+
+    def GetAuthToken(self, request, context):
+        return _header(request, auth_pb2.GetAuthTokenResponse(
+            status=auth_pb2.GetAuthTokenResponse.STATUS_OK, token='fake-token'))
+
+
+class FakeRobotIdServicer(robot_id_service_pb2_grpc.RobotIdServiceServicer):
+
+    def GetRobotId(self, request, context):
+        response = robot_id_pb2.RobotIdResponse()
+        response.robot_id.serial_number = 'fake-spot'
+        response.robot_id.nickname = 'fake-spot'
+        return _header(request, response)
+
+
+class FakeTimeSyncServicer(time_sync_service_pb2_grpc.TimeSyncServiceServicer):
+
+    def TimeSyncUpdate(self, request, context):
+        # the fake robot shares the local clock, so the skew is always zero
+        response = time_sync_pb2.TimeSyncUpdateResponse(clock_identifier='fake-clock')
+        response.state.status = time_sync_pb2.TimeSyncState.STATUS_OK
+        response.state.best_estimate.clock_skew.FromNanoseconds(0)
+        response.state.best_estimate.round_trip_time.FromNanoseconds(0)
+        return _header(request, response)
+
+
+class FakeRobotStateServicer(robot_state_service_pb2_grpc.RobotStateServiceServicer):
+
+    def __init__(self, fake_robot):
+        self._fake_robot = fake_robot
+
+    def GetRobotState(self, request, context):
+        fake_robot = self._fake_robot
+        response = robot_state_pb2.RobotStateResponse()
+        replay = fake_robot.replay
+        if replay is not None and replay.has(TelemetryChannel.ROBOT_STATE):
+            response.robot_state.CopyFrom(replay.message(TelemetryChannel.ROBOT_STATE))
+            return _header(request, response)
+        robot_state = response.robot_state
+        fake_robot._update_battery()
+        robot_state.power_state.motor_power_state = robot_state_pb2.PowerState.STATE_ON \
+            if fake_robot.motor_power_on else robot_state_pb2.PowerState.STATE_OFF
+        robot_state.battery_states.add().charge_percentage.value = fake_robot.battery
+        estop_state = robot_state.estop_states.add(name='fake-estop', type=robot_state_pb2.EStopState.TYPE_SOFTWARE)
+        estop_state.state = robot_state_pb2.EStopState.STATE_NOT_ESTOPPED \
+            if fake_robot.estop.stop_level == estop_pb2.ESTOP_LEVEL_NONE else robot_state_pb2.EStopState.STATE_ESTOPPED
+        transforms = robot_state.kinematic_state.transforms_snapshot.child_to_parent_edge_map
+        transforms['body'].parent_frame_name = ''
+        transforms['odom'].parent_frame_name = 'body'
+        transforms['odom'].parent_tform_child.rotation.w = 1.0
+        return _header(request, response)
+
+
+class FakePowerServicer(power_service_pb2_grpc.PowerServiceServicer):
+
+    def __init__(self, fake_robot):
+        self._fake_robot = fake_robot
+        self._command_ids = itertools.count(1)
+
+    def PowerCommand(self, request, context):
+        # power changes take effect immediately
+        self._fake_robot.motor_power_on = request.request == power_pb2.PowerCommandRequest.REQUEST_ON_MOTORS
+        return _header(request, power_pb2.PowerCommandResponse(
+            status=power_pb2.STATUS_SUCCESS, power_command_id=next(self._command_ids)))
+
+    def PowerCommandFeedback(self, request, context):
+        return _header(request, power_pb2.PowerCommandFeedbackResponse(status=power_pb2.STATUS_SUCCESS))
+
+
+class FakeWorldObjectServicer(world_object_service_pb2_grpc.WorldObjectServiceServicer):
+
+    def __init__(self, fake_robot):
+        self._fake_robot = fake_robot
+
+    def ListWorldObjects(self, request, context):
+        response = world_object_pb2.ListWorldObjectResponse()
+        # the dock fiducial is visible while docked
+        dock_id = self._fake_robot.docking.dock_id
+        if dock_id is not None:
+            world_object = response.world_objects.add(id=1, name=f"world_obj_apriltag_{dock_id}")
+            world_object.apriltag_properties.tag_id = dock_id
+        return _header(request, response)
+
+
+class FakeGraphNavServicer(graph_nav_service_pb2_grpc.GraphNavServiceServicer):
+    ''' holds an uploaded map and moves along it at speed meters per second when navigating '''
+
+    def __init__(self, fake_robot, speed=1.0):
+        self._fake_robot = fake_robot
+        self.speed = speed
+        self._lock = threading.Lock()
+        self.graph = map_pb2.Graph()
+        self._router = None
+        # snapshot id -> serialized snapshot
+        self.waypoint_snapshots = {}
+        self.edge_snapshots = {}
+        self.waypoint_id = None
+        self._command_ids = itertools.count(1)
+        # command id -> (destination waypoint id, route length, start time, end time)
+        self._commands = {}
+
+    def ClearGraph(self, request, context):
+        with self._lock:
+            self.graph = map_pb2.Graph()
+            self._router = None
+            self.waypoint_snapshots.clear()
+            self.edge_snapshots.clear()
+        return _header(request, graph_nav_pb2.ClearGraphResponse(status=graph_nav_pb2.ClearGraphResponse.STATUS_OK))
+
+    def UploadGraph(self, request, context):
+        with self._lock:
+            # as on the robot, the uploaded graph is added to the graph already there, waypoints
+            # and edges already there are replaced but nothing is removed
+            waypoint_indexes = {w.id: i for i, w in enumerate(self.graph.waypoints)}
+            for waypoint in request.graph.waypoints:
+                if waypoint.id in waypoint_indexes:
+                    self.graph.waypoints[waypoint_indexes[waypoint.id]].CopyFrom(waypoint)
+                else:
+                    self.graph.waypoints.add().CopyFrom(waypoint)
+            edge_indexes = {(e.id.from_waypoint, e.id.to_waypoint): i for i, e in enumerate(self.graph.edges)}
+            for edge in request.graph.edges:
+                edge_index = edge_indexes.get((edge.id.from_waypoint, edge.id.to_waypoint))
+                if edge_index is not None:
+                    self.graph.edges[edge_index].CopyFrom(edge)
+                else:
+                    self.graph.edges.add().CopyFrom(edge)
+            self.graph.anchoring.CopyFrom(request.graph.anchoring)
+            self._router = None
+            response = graph_nav_pb2.UploadGraphResponse(status=graph_nav_pb2.UploadGraphResponse.STATUS_OK)
+            response.unknown_waypoint_snapshot_ids.extend(sorted(set(
+                w.snapshot_id for w in request.graph.waypoints
+                if w.snapshot_id and w.snapshot_id not in self.waypoint_snapshots
+            )))
+            response.unknown_edge_snapshot_ids.extend(sorted(set(
+                e.snapshot_id for e in request.graph.edges
+                if e.snapshot_id and e.snapshot_id not in self.edge_snapshots
+            )))
+        return _header(request, response)
+
+    def DownloadGraph(self, request, context):
+        response = graph_nav_pb2.DownloadGraphResponse()
+        with self._lock:
+            response.graph.CopyFrom(self.graph)
+        return _header(request, response)
+
+    def _upload_snapshot(self, request_iterator, snapshot_class, snapshots, response):
+        requests = list(request_iterator)
+        serialized = data_chunk.serialized_from_messages(requests)
+        snapshot = snapshot_class()
+        snapshot.ParseFromString(serialized)
+        with self._lock:
+            snapshots[snapshot.id] = serialized
+        return _header(requests[0], response)
+
+    def UploadWaypointSnapshot(self, request_iterator, context):
+        return self._upload_snapshot(request_iterator, map_pb2.WaypointSnapshot, self.waypoint_snapshots,
+            graph_nav_pb2.UploadWaypointSnapshotResponse())
+
+    def UploadEdgeSnapshot(self, request_iterator, context):
+        return self._upload_snapshot(request_iterator, map_pb2.EdgeSnapshot, self.edge_snapshots,
+            graph_nav_pb2.UploadEdgeSnapshotResponse())
+
+    def DownloadWaypointSnapshot(self, request, context):
+        serialized = self.waypoint_snapshots.get(request.waypoint_snapshot_id)
+        if serialized is None:
+            yield _header(request, graph_nav_pb2.DownloadWaypointSnapshotResponse(
+                status=graph_nav_pb2.DownloadWaypointSnapshotResponse.STATUS_SNAPSHOT_DOES_NOT_EXIST))
+            return
+        for chunk in data_chunk.chunk_serialized(serialized, 1024 * 1024):
+            yield _header(request, graph_nav_pb2.DownloadWaypointSnapshotResponse(
+                status=graph_nav_pb2.DownloadWaypointSnapshotResponse.STATUS_OK,
+                waypoint_snapshot_id=request.waypoint_snapshot_id, chunk=chunk))
+
+    def DownloadEdgeSnapshot(self, request, context):
+        serialized = self.edge_snapshots.get(request.edge_snapshot_id)
+        if serialized is None:
+            yield _header(request, graph_nav_pb2.DownloadEdgeSnapshotResponse(
+                status=graph_nav_pb2.DownloadEdgeSnapshotResponse.STATUS_SNAPSHOT_DOES_NOT_EXIST))
+            return
+        for chunk in data_chunk.chunk_serialized(serialized, 1024 * 1024):
+            yield _header(request, graph_nav_pb2.DownloadEdgeSnapshotResponse(
+                status=graph_nav_pb2.DownloadEdgeSnapshotResponse.STATUS_OK,
+                edge_snapshot_id=request.edge_snapshot_id, chunk=chunk))
+
+    def SetLocalization(self, request, context):
+        with self._lock:
+            self.waypoint_id = request.initial_guess.waypoint_id or None
+            if self.waypoint_id is None and len(self.graph.waypoints) > 0:
+                self.waypoint_id = self.graph.waypoints[0].id
+        response = graph_nav_pb2.SetLocalizationResponse(status=graph_nav_pb2.SetLocalizationResponse.STATUS_OK)
+        response.localization.waypoint_id = self.waypoint_id or ''
+        return _header(request, response)
+
+    def GetLocalizationState(self, request, context):
+        response = graph_nav_pb2.GetLocalizationStateResponse()
+        replay = self._fake_robot.replay
+        if replay is not None and replay.has(TelemetryChannel.LOCALIZATION):
+            response.CopyFrom(replay.message(TelemetryChannel.LOCALIZATION))
+            return _header(request, response)
+        response.localization.waypoint_id = self.waypoint_id or ''
+        return _header(request, response)
+
+    def NavigateTo(self, request, context):
+        now = time.time()
+        response = graph_nav_pb2.NavigateToResponse()
+        if self._fake_robot.replay is not None:
+            # the route is whatever was recorded, any destination is accepted
+            response.status = graph_nav_pb2.NavigateToResponse.STATUS_OK
+            response.command_id = request.command_id or next(self._command_ids)
+            return _header(request, response)
+        with self._lock:
+            if self._router is None:
+                self._router = Router.from_graph(self.graph)
+            if request.command_id in self._commands:
+                # extend an existing command, the route is unchanged
+                command_id = request.command_id
+                destination, length, started, _ = self._commands[command_id]
+            else:
+                destination = request.destination_waypoint_id
+                start = self.waypoint_id or destination
+                path = self._router.shortest_path(start, destination)
+                if not path:
+                    response.status = graph_nav_pb2.NavigateToResponse.STATUS_NO_PATH
+                    return _header(request, response)
+                command_id = next(self._command_ids)
+                length, started = self._router.path_length(path), now
+            end_time = request.end_time.ToNanoseconds() / 1e9
+            self._commands[command_id] = (destination, length, started, end_time)
+        response.status = graph_nav_pb2.NavigateToResponse.STATUS_OK
+        response.command_id = command_id
+        return _header(request, response)
+
+    def NavigationFeedback(self, request, context):
+        now = time.time()
+        response = graph_nav_pb2.NavigationFeedbackResponse(command_id=request.command_id)
+        replay = self._fake_robot.replay
+        if replay is not None and replay.has(TelemetryChannel.NAVIGATION_FEEDBACK):
+            response.CopyFrom(replay.message(TelemetryChannel.NAVIGATION_FEEDBACK))
+            response.command_id = request.command_id
+            return _header(request, response)
+        with self._lock:
+            command = self._commands.get(request.command_id)
+            if command is None:
+                response.status = graph_nav_pb2.NavigationFeedbackResponse.STATUS_UNKNOWN
+                return _header(request, response)
+            destination, length, started, end_time = command
+            remaining = max(0.0, length - (now - started) * self.speed)
+            if remaining == 0.0:
+                self.waypoint_id = destination
+                response.status = graph_nav_pb2.NavigationFeedbackResponse.STATUS_REACHED_GOAL
+            elif now > end_time:
+                response.status = graph_nav_pb2.NavigationFeedbackResponse.STATUS_COMMAND_TIMED_OUT
+            else:
+                response.status = graph_nav_pb2.NavigationFeedbackResponse.STATUS_FOLLOWING_ROUTE
+            response.remaining_route_length = remaining
+        return _header(request, response)
+
+
+class FakeMissionServicer(mission_service_pb2_grpc.MissionServiceServicer):
+    ''' plays a loaded autowalk as one node per element, each taking element_seconds '''
+
+    def __init__(self, fake_robot, element_seconds=1.0, tick_seconds=0.1):
+        self._fake_robot = fake_robot
+        self.element_seconds = element_seconds
+        self.tick_seconds = tick_seconds
+        self._lock = threading.Lock()
+        self.load([])
+
+    def load(self, element_names):
+        with self._lock:
+            self.mission_id = getattr(self, 'mission_id', 0) + 1
+            self.element_names = list(element_names)
+            # seconds of play so far, only advances while before the pause time
+            self._played = 0.0
+            self._updated = None
+            self._pause_time = 0.0
+
+    def _advance(self, now):
+        if self._updated is not None:
+            self._played += max(0.0, min(now, self._pause_time) - self._updated)
+        self._updated = now
+
+    @property
+    def _duration(self):
+        return len(self.element_names) * self.element_seconds
+
+    def PlayMission(self, request, context):
+        now = time.time()
+        with self._lock:
+            self._advance(now)
+            self._pause_time = request.pause_time.ToNanoseconds() / 1e9
+        return _header(request, mission_pb2.PlayMissionResponse(status=mission_pb2.PlayMissionResponse.STATUS_OK))
+
+    def RestartMission(self, request, context):
+        now = time.time()
+        with self._lock:
+            if not self.element_names:
+                return _header(request, mission_pb2.RestartMissionResponse(
+                    status=mission_pb2.RestartMissionResponse.STATUS_NO_MISSION))
+            self._played = 0.0
+            self._updated = now
+            self._pause_time = request.pause_time.ToNanoseconds() / 1e9
+        return _header(request, mission_pb2.RestartMissionResponse(
+            status=mission_pb2.RestartMissionResponse.STATUS_OK))
+
+    def GetInfo(self, request, context):
+        response = mission_pb2.GetInfoResponse()
+        response.mission_info.id = self.mission_id
+        response.mission_info.root.id = 1
+        response.mission_info.root.name = 'root'
+        for i, name in enumerate(self.element_names):
+            response.mission_info.root.children.add(id=i + 2, name=name)
+        return _header(request, response)
+
+    def GetInfoAsChunks(self, request, context):
+        for chunk in _chunks(self.GetInfo(request, context)):
+            yield chunk
+
+    def _node_results(self, played):
+        # node id -> result at the given seconds of play
+        results = {}
+        for i in range(len(self.element_names)):
+            if played >= (i + 1) * self.element_seconds:
+                results[i + 2] = util_pb2.RESULT_SUCCESS
+            elif played >= i * self.element_seconds:
+                results[i + 2] = util_pb2.RESULT_RUNNING
+        results[1] = util_pb2.RESULT_SUCCESS if played >= self._duration else util_pb2.RESULT_RUNNING
+        return results
+
+    def GetState(self, request, context):
+        now = time.time()
+        response = mission_pb2.GetStateResponse()
+        replay = self._fake_robot.replay
+        if replay is not None and replay.has(TelemetryChannel.MISSION_STATE):
+            upper = request.history_upper_tick_bound.value if request.HasField('history_upper_tick_bound') else None
+            response.state.CopyFrom(replay.mission_state(request.history_lower_tick_bound, upper))
+            return _header(request, response)
+        state = response.state
+        with self._lock:
+            state.mission_id = self.mission_id
+            if self._updated is None:
+                state.status = mission_pb2.State.STATUS_NONE
+                return _header(request, response)
+            self._advance(now)
+            played = min(self._played, self._duration)
+            tick = int(played / self.tick_seconds)
+            state.tick_counter = tick
+            if played >= self._duration:
+                state.status = mission_pb2.State.STATUS_SUCCESS
+            elif now > self._pause_time:
+                state.status = mission_pb2.State.STATUS_PAUSED
+            else:
+                state.status = mission_pb2.State.STATUS_RUNNING
+            # history only has the ticks where a node changed, within the requested bounds
+            lower = request.history_lower_tick_bound
+            upper = request.history_upper_tick_bound.value if request.HasField('history_upper_tick_bound') else tick
+            change_ticks = {0, tick}
+            for i in range(len(self.element_names) + 1):
+                change_ticks.add(int(i * self.element_seconds / self.tick_seconds))
+            for history_tick in sorted((t for t in change_ticks if lower <= t <= min(upper, tick)), reverse=True):
+                node_states_at_tick = state.history.add(tick_counter=history_tick)
+                for node_id, result in self._node_results(history_tick * self.tick_seconds).items():
+                    node_states_at_tick.node_states.add(id=node_id, result=result)
+        return _header(request, response)
+
+
+class FakeAutowalkServicer(autowalk_service_pb2_grpc.AutowalkServiceServicer):
+
+    def __init__(self, fake_robot):
+        self._fake_robot = fake_robot
+
+    def LoadAutowalk(self, request_iterator, context):
+        request = autowalk_pb2.LoadAutowalkRequest()
+        data_chunk.parse_from_chunks(request_iterator, request)
+        element_names = [element.name for element in request.walk.elements]
+        self._fake_robot.mission.load(element_names)
+        response = _header(request, autowalk_pb2.LoadAutowalkResponse(
+            status=autowalk_pb2.LoadAutowalkResponse.STATUS_OK, mission_id=self._fake_robot.mission.mission_id))
+        for chunk in _chunks(response):
+            yield chunk
+
+
+class FakeDockingServicer(docking_service_pb2_grpc.DockingServiceServicer):
+
+    def __init__(self, fake_robot, dock_id=520):
+        self._fake_robot = fake_robot
+        # None when undocked
+        self.dock_id = dock_id
+        self._command_ids = itertools.count(1)
+        # command id -> feedback status
+        self._commands = {}
+
+    def GetDockingState(self, request, context):
+        response = docking_pb2.GetDockingStateResponse()
+        if self.dock_id is not None:
+            response.dock_state.status = docking_pb2.DockState.DOCK_STATUS_DOCKED
+            response.dock_state.dock_id = self.dock_id
+        else:
+            response.dock_state.status = docking_pb2.DockState.DOCK_STATUS_UNDOCKED
+        return _header(request, response)
+
+    def DockingCommand(self, request, context):
+        command_id = next(self._command_ids)
+        if request.prep_pose_behavior == docking_pb2.PREP_POSE_UNDOCK:
+            self.dock_id = None
+            self._commands[command_id] = docking_pb2.DockingCommandFeedbackResponse.STATUS_AT_PREP_POSE
+        else:
+            self.dock_id = request.docking_station_id
+            self._commands[command_id] = docking_pb2.DockingCommandFeedbackResponse.STATUS_DOCKED
+        return _header(request, docking_pb2.DockingCommandResponse(
+            status=docking_pb2.DockingCommandResponse.STATUS_OK, docking_command_id=command_id))
+
+    def DockingCommandFeedback(self, request, context):
+        return _header(request, docking_pb2.DockingCommandFeedbackResponse(
+            status=self._commands.get(request.docking_command_id,
+                docking_pb2.DockingCommandFeedbackResponse.STATUS_UNKNOWN)))
+
+
+class FakeLeaseServicer(lease_service_pb2_grpc.LeaseServiceServicer):
+
+    def __init__(self, fake_robot):
+        self._fake_robot = fake_robot
+        self._sequence = itertools.count(1)
+
+    def _lease(self, resource):
+        return lease_pb2.Lease(resource=resource or 'body', epoch='fake-epoch', sequence=[next(self._sequence)])
+
+    def AcquireLease(self, request, context):
+        response = lease_pb2.AcquireLeaseResponse(status=lease_pb2.AcquireLeaseResponse.STATUS_OK,
+            lease=self._lease(request.resource))
+        return _header(request, response)
+
+    def TakeLease(self, request, context):
+        response = lease_pb2.TakeLeaseResponse(status=lease_pb2.TakeLeaseResponse.STATUS_OK,
+            lease=self._lease(request.resource))
+        return _header(request, response)
+
+    def ReturnLease(self, request, context):
+        return _header(request, lease_pb2.ReturnLeaseResponse(status=lease_pb2.ReturnLeaseResponse.STATUS_OK))
+
+    def RetainLease(self, request, context):
+        response = lease_pb2.RetainLeaseResponse()
+        response.lease_use_result.status = lease_pb2.LeaseUseResult.STATUS_OK
+        return _header(request, response)
+
+    def ListLeases(self, request, context):
+        return _header(request, lease_pb2.ListLeasesResponse())
+
+
+class FakeEstopServicer(estop_service_pb2_grpc.EstopServiceServicer):
+
+    def __init__(self, fake_robot):
+        self._fake_robot = fake_robot
+        self.config = estop_pb2.EstopConfig(unique_id='fake-config-0')
+        self.stop_level = estop_pb2.ESTOP_LEVEL_NONE
+        self._unique_ids = itertools.count(1)
+
+    def GetEstopConfig(self, request, context):
+        return _header(request, estop_pb2.GetEstopConfigResponse(active_config=self.config))
+
+    def SetEstopConfig(self, request, context):
+        self.config = estop_pb2.EstopConfig()
+        self.config.CopyFrom(request.config)
+        self.config.unique_id = f"fake-config-{next(self._unique_ids)}"
+        for endpoint in self.config.endpoints:
+            endpoint.unique_id = f"fake-endpoint-{next(self._unique_ids)}"
+        return _header(request, estop_pb2.SetEstopConfigResponse(
+            status=estop_pb2.SetEstopConfigResponse.STATUS_SUCCESS, active_config=self.config))
+
+    def RegisterEstopEndpoint(self, request, context):
+        return _header(request, estop_pb2.RegisterEstopEndpointResponse(
+            status=estop_pb2.RegisterEstopEndpointResponse.STATUS_SUCCESS, new_endpoint=request.new_endpoint))
+
+    def DeregisterEstopEndpoint(self, request, context):
+        return _header(request, estop_pb2.DeregisterEstopEndpointResponse(
+            status=estop_pb2.DeregisterEstopEndpointResponse.STATUS_SUCCESS))
+
+    def EstopCheckIn(self, request, context):
+        self.stop_level = request.stop_level
+        return _header(request, estop_pb2.EstopCheckInResponse(
+            status=estop_pb2.EstopCheckInResponse.STATUS_OK, challenge=request.challenge + 1))
+
+    def GetEstopSystemStatus(self, request, context):
+        response = estop_pb2.GetEstopSystemStatusResponse()
+        response.status.stop_level = self.stop_level
+        return _header(request, response)
+
+
+class FakeRobot:
+    ''' in process grpc servicers standing in for a spot robot
+
+    every rpc is counted in rpc_counts (by full method name) and held for latency seconds.
+    while replay is set to a started Replay, robot state, localization, navigation feedback and
+    mission state are served from it instead of simulated
+    '''
+
+    address = '127.0.0.1'
+
+    def __init__(self, latency=0.0, max_workers=32):
+        self.latency = latency
+        self.replay = None
+        self.rpc_counts = collections.Counter()
+        self._rpc_counts_lock = threading.Lock()
+        # robot state which isn't owned by one of the services
+        self.motor_power_on = False
+        self.battery = 100.0
+        # battery percent per second gained while docked and lost while undocked
+        self.charge_rate = 0.0
+        self.drain_rate = 0.0
+        self._battery_updated = time.monotonic()
+        self._battery_lock = threading.Lock()
+        self.server = grpc.server(ThreadPoolExecutor(max_workers=max_workers),
+            interceptors=[_RpcInterceptor(self)])
+        self.robot_state = FakeRobotStateServicer(self)
+        self.power = FakePowerServicer(self)
+        self.world_object = FakeWorldObjectServicer(self)
+        self.graph_nav = FakeGraphNavServicer(self)
+        self.mission = FakeMissionServicer(self)
+        self.autowalk = FakeAutowalkServicer(self)
+        self.docking = FakeDockingServicer(self)
+        self.lease = FakeLeaseServicer(self)
+        self.estop = FakeEstopServicer(self)
+        directory_service_pb2_grpc.add_DirectoryServiceServicer_to_server(FakeDirectoryServicer(), self.server)
+        auth_service_pb2_grpc.add_AuthServiceServicer_to_server(FakeAuthServicer(), self.server)
+        robot_id_service_pb2_grpc.add_RobotIdServiceServicer_to_server(FakeRobotIdServicer(), self.server)
+        time_sync_service_pb2_grpc.add_TimeSyncServiceServicer_to_server(FakeTimeSyncServicer(), self.server)
+        robot_state_service_pb2_grpc.add_RobotStateServiceServicer_to_server(self.robot_state, self.server)
+        power_service_pb2_grpc.add_PowerServiceServicer_to_server(self.power, self.server)
+        world_object_service_pb2_grpc.add_WorldObjectServiceServicer_to_server(self.world_object, self.server)
+        graph_nav_service_pb2_grpc.add_GraphNavServiceServicer_to_server(self.graph_nav, self.server)
+        mission_service_pb2_grpc.add_MissionServiceServicer_to_server(self.mission, self.server)
+        autowalk_service_pb2_grpc.add_AutowalkServiceServicer_to_server(self.autowalk, self.server)
+        docking_service_pb2_grpc.add_DockingServiceServicer_to_server(self.docking, self.server)
+        lease_service_pb2_grpc.add_LeaseServiceServicer_to_server(self.lease, self.server)
+        estop_service_pb2_grpc.add_EstopServiceServicer_to_server(self.estop, self.server)
+        self.port = self.server.add_insecure_port(f"{self.address}:0")
+
+    def _update_battery(self):
+        now = time.monotonic()
+        with self._battery_lock:
+            elapsed = now - self._battery_updated
+            self._battery_updated = now
+            rate = self.charge_rate if self.docking.dock_id is not None else -self.drain_rate
+            self.battery = min(100.0, max(0.0, self.battery + rate * elapsed))
+
+    def _record_rpc(self, method):
+        with self._rpc_counts_lock:
+            self.rpc_counts[method] += 1
+
+    def reset_rpc_counts(self):
+        with self._rpc_counts_lock:
+            self.rpc_counts.clear()
+
+    @property
+    def rpc_total(self):
+        return sum(self.rpc_counts.values())
+
+    def start(self):
+        self.server.start()
+        return self
+
+    def stop(self):
+        self.server.stop(grace=None)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    @property
+    def hostname(self):
+        # the port tells fake robots apart, so several can share one sdk
+        return f"{self.address}:{self.port}"
+
+    def create_robot(self, sdk):
+        ''' registers an sdk robot for this fake robot w/ sdk, so sdk.create_robot(hostname) returns it '''
+        robot = _InsecureRobot(name=self.hostname)
+        robot.address = self.address
+        robot.update_from(sdk)
+        robot.update_secure_channel_port(self.port)
+        sdk.robots[self.hostname] = robot
+        return robot
+
+    def connect(self, username='user', password='password', sdk=None):
+        ''' returns a Spot connected to this fake robot '''
+        sdk = sdk or Spot.create_sdk()
+        self.create_robot(sdk)
+        return Spot.connect(self.hostname, username, password, sdk=sdk)
@@ -0,0 +1,254 @@
+import logging
+import asyncio
+from bosdyn.api import world_object_pb2
+from bosdyn.api.graph_nav import nav_pb2
+from spot_world.spot.spot import Spot
+from spot_world.spot.graph_nav import NavigationControl, NavigationStatus
+from spot_world.spot.mission import MissionStatus, MissionProgress
+
+logger = logging.getLogger(__name__)
+
+
+def wrap_future(sdk_future):
+    ''' returns an asyncio future for the future returned by an sdk *_async call '''
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+
+    def _set_result(result):
+        if not future.done():
+            future.set_result(result)
+
+    def _set_exception(exception):
+        if not future.done():
+            future.set_exception(exception)
+
+    def _done(done_future):
+        # runs on a grpc thread, hand the outcome back to the event loop
+        try:
+            result = done_future.result()
+        except Exception as e:
+            loop.call_soon_threadsafe(_set_exception, e)
+        else:
+            loop.call_soon_threadsafe(_set_result, result)
+
+    sdk_future.add_done_callback(_done)
+    return future
+
+
+class AsyncRobotStateFacade:
+
+    def __init__(self, spot: Spot):
+        self._spot = spot
+
+    async def get(self, max_age=0):
+        robot_state = self._spot.robot_state
+        if max_age:
+            # read the cache once, a second check could find it expired and query w/ a blocking rpc
+            state = robot_state.cached(max_age)
+            if state is not None:
+                return state
+        state = await wrap_future(robot_state.client.get_robot_state_async())
+        # share the state w/ the blocking facades and any subscribers
+        return robot_state.update(state)
+
+
+class AsyncPowerFacade:
+
+    def __init__(self, spot: Spot, robot_state: AsyncRobotStateFacade):
+        self._spot = spot
+        self._robot_state = robot_state
+
+    async def status(self):
+        robot_state = await self._robot_state.get(max_age=self._spot.robot_state.shared_max_age)
+        return self._spot.power.status_from(robot_state)
+
+    async def battery(self):
+        robot_state = await self._robot_state.get(max_age=self._spot.robot_state.shared_max_age)
+        return self._spot.power.battery_from(robot_state)
+
+    # power on/off are blocking helpers in the sdk, run them off the event loop
+
+    async def on(self):
+        await asyncio.to_thread(self._spot.power.on)
+
+    async def off(self):
+        await asyncio.to_thread(self._spot.power.off)
+
+
+class AsyncEstopFacade:
+
+    def __init__(self, spot: Spot, robot_state: AsyncRobotStateFacade):
+        self._spot = spot
+        self._robot_state = robot_state
+
+    async def status(self):
+        robot_state = await self._robot_state.get(max_age=self._spot.robot_state.shared_max_age)
+        return self._spot.estop.status_from(robot_state)
+
+
+class AsyncDockingFacade:
+
+    def __init__(self, spot: Spot):
+        self._spot = spot
+
+    # docking uses the blocking helpers from the sdk, run them off the event loop
+
+    async def get_dock_id(self):
+        return await asyncio.to_thread(self._spot.docking.get_dock_id)
+
+    async def undock(self):
+        await asyncio.to_thread(self._spot.docking.undock)
+
+    async def dock(self, dock_id):
+        await asyncio.to_thread(self._spot.docking.dock, dock_id)
+
+
+class AsyncWorldObjectFacade:
+
+    def __init__(self, spot: Spot):
+        self._spot = spot
+
+    async def get_visible_fiducials(self):
+        request_fiducials = [world_object_pb2.WORLD_OBJECT_APRILTAG]
+        response = await wrap_future(
+            self._spot.world_object.client.list_world_objects_async(object_type=request_fiducials))
+        return response.world_objects
+
+    async def get_visible_docks(self):
+        fiducial_objects = await self.get_visible_fiducials()
+        # docks have fiducials with ids 500 and up
+        return [
+            int(f.apriltag_properties.tag_id) for f in fiducial_objects
+            if int(f.apriltag_properties.tag_id) >= 500
+        ]
+
+
+class AsyncGraphNavFacade:
+
+    def __init__(self, spot: Spot, robot_state: AsyncRobotStateFacade):
+        self._spot = spot
+        self._robot_state = robot_state
+
+    @property
+    def client(self):
+        return self._spot.graph_nav.client
+
+    # map transfers already run concurrently, run them off the event loop
+
+    async def upload_map(self, map, incremental=False, progress=None):
+        return await asyncio.to_thread(self._spot.graph_nav.upload_map, map, incremental, progress)
+
+    async def download_map(self, progress=None):
+        return await asyncio.to_thread(self._spot.graph_nav.download_map, progress)
+
+    async def localize_to_fiducial(self):
+        from bosdyn.client.frame_helpers import get_odom_tform_body
+        robot_state = await self._robot_state.get()
+        current_odom_tform_body = get_odom_tform_body(robot_state.kinematic_state.transforms_snapshot)
+        localization = nav_pb2.Localization()
+        await wrap_future(self.client.set_localization_async(
+            initial_guess_localization=localization,
+            ko_tform_body=current_odom_tform_body.to_proto(),
+        ))
+
+    async def navigate_to_waypoint(self, waypoint_id, timeout=None, command_duration=10.0,
+            min_poll_interval=0.2, max_poll_interval=2.0, expected_speed=0.5):
+        ''' awaitable version of GraphNavFacade.navigate_to_waypoint, returns a NavigationResult '''
+        from bosdyn.client.exceptions import ResponseError
+        control = NavigationControl(self._spot.graph_nav, waypoint_id, timeout, command_duration,
+            min_poll_interval, max_poll_interval, expected_speed)
+        while not control.timed_out():
+            if control.command_due():
+                try:
+                    command_id = await wrap_future(self.client.navigate_to_async(waypoint_id, command_duration,
+                        leases=[self._spot.lease.current],
+                        command_id=control.command_id,
+                    ))
+                except ResponseError as e:
+                    return control.command_failed(e)
+                control.command_sent(command_id)
+            feedback = await wrap_future(self.client.navigation_feedback_async(control.command_id))
+            result = control.on_feedback(feedback)
+            if result is not None:
+                return result
+            await asyncio.sleep(control.poll_interval())
+        return control.result(NavigationStatus.TIMEOUT)
+
+
+class AsyncMissionFacade:
+
+    def __init__(self, spot: Spot):
+        self._spot = spot
+        self._last_status = MissionStatus.NONE
+
+    @property
+    def client(self):
+        return self._spot.mission.client
+
+    @property
+    def status(self):
+        return self._last_status
+
+    async def play(self, mission_timeout=30, disable_directed_exploration=True, poll_interval=0.5, replay_margin=10,
+            restart=False):
+        ''' async iterator version of MissionFacade.play, yields a NodeStatusChange per node result change '''
+        mission = self._spot.mission
+        progress = MissionProgress(await asyncio.to_thread(mission._node_names), replay_margin)
+        if restart:
+            pause_time, leases, mission_settings = mission._play_settings(mission_timeout, disable_directed_exploration)
+            await wrap_future(self.client.restart_mission_async(pause_time, leases, mission_settings))
+            progress.played(pause_time)
+        mission_state = await wrap_future(self.client.get_state_async())
+        progress.start(mission_state)
+        outcome = progress.outcome(mission_state)
+        while outcome is None:
+            self._last_status = MissionStatus.RUNNING
+            if progress.play_due():
+                pause_time, leases, mission_settings = mission._play_settings(mission_timeout,
+                    disable_directed_exploration)
+                await wrap_future(self.client.play_mission_async(pause_time, leases, mission_settings))
+                progress.played(pause_time)
+            await asyncio.sleep(poll_interval)
+            mission_state = await wrap_future(self.client.get_state_async(lower_tick_bound=progress.lower_tick_bound))
+            for node_status_change in progress.update(mission_state):
+                yield node_status_change
+            outcome = progress.outcome(mission_state)
+        self._last_status = outcome
+
+    async def run(self, mission_timeout=30, disable_directed_exploration=True, on_node_status=None, restart=False):
+        async for node_status_change in self.play(mission_timeout, disable_directed_exploration, restart=restart):
+            if on_node_status is not None:
+                on_node_status(node_status_change)
+        return self._last_status
+
+
+class AsyncSpot:
+    ''' awaitable facades over a connected Spot, so several robot rpcs can be in flight at once
+
+    the lease, estop keepalive and loaded state are shared w/ the wrapped Spot
+    '''
+
+    def __init__(self, spot: Spot):
+        self.spot = spot
+        self.lease = spot.lease
+        self.robot_state = AsyncRobotStateFacade(spot)
+        self.power = AsyncPowerFacade(spot, self.robot_state)
+        self.estop = AsyncEstopFacade(spot, self.robot_state)
+        self.docking = AsyncDockingFacade(spot)
+        self.world_object = AsyncWorldObjectFacade(spot)
+        self.graph_nav = AsyncGraphNavFacade(spot, self.robot_state)
+        self.mission = AsyncMissionFacade(spot)
+
+    @property
+    def name(self):
+        return self.spot.name
+
+    @property
+    def hostname(self):
+        return self.spot.hostname
+
+    @classmethod
+    async def connect(cls, hostname, username, password):
+        # authentication and time sync block, keep them off the event loop
+        spot = await asyncio.to_thread(Spot.connect, hostname, username, password)
+        return cls(spot)
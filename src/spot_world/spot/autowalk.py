@@ -1,7 +1,11 @@
 import logging
 import pathlib
+import os
+import math
+import threading
+import hashlib
+import time
 from bosdyn.api.autowalk import autowalk_pb2, walks_pb2
-from bosdyn.client.autowalk import AutowalkClient
 from spot_world.spot.graph_nav import Map
 
 logger = logging.getLogger(__name__)
@@ -15,6 +19,41 @@ class Mission:
     def skip_docking(self):
         self.walk.playback_mode.once.skip_docking_after_completion = True
 
+    def copy(self):
+        # missions are modified before upload (skip_docking), so cached missions are handed out as copies
+        walk = walks_pb2.Walk()
+        walk.CopyFrom(self.walk)
+        return Mission(walk)
+
+    @property
+    def element_count(self):
+        return len(self.walk.elements)
+
+    @property
+    def target_waypoint_ids(self):
+        ''' waypoint ids the mission navigates to, in order '''
+        waypoint_ids = []
+        for element in self.walk.elements:
+            target = element.target
+            if target.HasField('navigate_to'):
+                waypoint_ids.append(target.navigate_to.destination_waypoint_id)
+            elif target.HasField('navigate_route'):
+                waypoint_ids.extend(target.navigate_route.route.waypoint_id)
+        return waypoint_ids
+
+    def estimated_path_length(self, map: Map):
+        ''' travel distance between the mission targets along the map, inf when a target is unreachable '''
+        waypoint_ids = self.target_waypoint_ids
+        length = 0.0
+        for from_id, to_id in zip(waypoint_ids, waypoint_ids[1:]):
+            if from_id == to_id:
+                continue
+            distance = map.router.distances_from(from_id, [to_id]).get(to_id)
+            if distance is None:
+                return math.inf
+            length += distance
+        return length
+
     @classmethod
     def from_filesystem(cls, autowalk_path: pathlib.Path, mission_file: str):
         # check if the autowalk path exists
@@ -36,16 +75,168 @@ class AutowalkError(Exception):
     pass
 
 
+class MissionCatalog:
+    ''' the missions of an autowalk folder, parsed once and cached until their file changes
+
+    the missions folder is only rescanned when its mtime changes (a mission added or removed),
+    and a cached mission is only reparsed when the mtime or size of its file changes
+    '''
+
+    def __init__(self, autowalk_path: pathlib.Path):
+        self.autowalk_path = pathlib.Path(autowalk_path)
+        self.missions_path = self.autowalk_path / 'missions'
+        # name -> path, and the missions folder mtime it was scanned at
+        self._paths = {}
+        self._scanned_mtime = None
+        # name -> (mtime_ns, size, Mission)
+        self._missions = {}
+        # (name, map content hash) -> (Mission, estimated path length)
+        self._path_lengths = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _stat(path):
+        try:
+            path_stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return path_stat.st_mtime_ns, path_stat.st_size
+
+    def _scan(self):
+        try:
+            mtime = os.stat(self.missions_path).st_mtime_ns
+        except FileNotFoundError:
+            self._paths, self._scanned_mtime = {}, None
+            return
+        if mtime == self._scanned_mtime:
+            return
+        paths = {}
+        for entry in os.scandir(self.missions_path):
+            # exclude the .walk extension from the names
+            if entry.name.endswith('.walk') and entry.is_file():
+                paths[entry.name[:-len('.walk')]] = pathlib.Path(entry.path)
+        self._paths, self._scanned_mtime = paths, mtime
+        # forget missions which are no longer in the folder
+        for name in list(self._missions.keys()):
+            if name not in paths:
+                del self._missions[name]
+
+    @property
+    def names(self):
+        with self._lock:
+            self._scan()
+            return sorted(self._paths.keys())
+
+    def _load(self, name):
+        self._scan()
+        path = self._paths.get(name)
+        if path is None:
+            raise AutowalkError(f"mission not found {name}")
+        stat = self._stat(path)
+        if stat is None:
+            raise AutowalkError(f"mission path not found {path}")
+        cached = self._missions.get(name)
+        if cached is not None and cached[:2] == stat:
+            return cached[2]
+        logger.debug(f"parsing mission {name} from {path}")
+        walk = walks_pb2.Walk()
+        with open(path, 'rb') as mission_file:
+            walk.ParseFromString(mission_file.read())
+        mission = Mission(walk)
+        self._missions[name] = (*stat, mission)
+        return mission
+
+    def get(self, name):
+        ''' returns a copy of the named mission, free to modify before upload '''
+        with self._lock:
+            return self._load(name).copy()
+
+    def info(self, name, map: Map = None):
+        ''' returns dict of metadata for the named mission, the path length is only estimated w/ a map '''
+        with self._lock:
+            mission = self._load(name)
+            info = {
+                'name': name,
+                'elements': mission.element_count,
+                'target_waypoints': mission.target_waypoint_ids,
+                'path_length': None,
+            }
+            if map is not None:
+                key = (name, map.content_hash)
+                # the mission can change w/o the map changing, so key on the cached mission as well
+                cached = self._path_lengths.get(key)
+                if cached is None or cached[0] is not mission:
+                    cached = (mission, mission.estimated_path_length(map))
+                    self._path_lengths[key] = cached
+                info['path_length'] = cached[1]
+            return info
+
+
 class AutowalkFacade:
 
     def __init__(self, spot):
         self._spot = spot
+        # autowalk path -> MissionCatalog
+        self._catalogs = {}
+        # (fingerprint, mission id) of the last mission we loaded on the robot
+        self._loaded = None
+        # seconds the last full upload took, what skipping an upload saves
+        self.last_upload_seconds = None
 
     @property
     def client(self):
-        return self._spot._robot.ensure_client(AutowalkClient.default_service_name)
+        return self._spot.clients.ensure_type('bosdyn.client.autowalk', 'AutowalkClient')
+
+    def catalog(self, autowalk_path: pathlib.Path):
+        ''' the mission catalog of an autowalk folder, kept for the life of the facade '''
+        autowalk_path = pathlib.Path(autowalk_path).resolve()
+        catalog = self._catalogs.get(autowalk_path)
+        if catalog is None:
+            catalog = self._catalogs.setdefault(autowalk_path, MissionCatalog(autowalk_path))
+        return catalog
+
+    @staticmethod
+    def fingerprint(mission: Mission, map: Map = None):
+        ''' hash of the walk, and of the map it navigates, to tell when a loaded mission is stale '''
+        digest = hashlib.sha256(mission.walk.SerializeToString(deterministic=True))
+        if map is not None:
+            digest.update(map.content_hash.encode())
+        return digest.hexdigest()
+
+    def is_loaded(self, mission: Mission, map: Map = None):
+        ''' True when the robot still has this mission loaded from our last upload, on the same map '''
+        from bosdyn.client.exceptions import RpcError, ResponseError
+        if self._loaded is None:
+            return False
+        fingerprint, mission_id = self._loaded
+        if map is None:
+            map = self._spot.graph_nav.current_map
+        if fingerprint != self.fingerprint(mission, map):
+            return False
+        # the robot reports the mission id we loaded, so nothing else loaded a mission since
+        try:
+            mission_state = self._spot.mission.client.get_state(upper_tick_bound=0)
+        except (RpcError, ResponseError) as e:
+            logger.debug(f"unable to get mission state {e}")
+            return False
+        return mission_state.mission_id == mission_id
+
+    def upload_mission(self, mission: Mission, reuse=False):
+        ''' load the mission on the robot, returns False when the upload was skipped
 
-    def upload_mission(self, mission: Mission):
+        w/ reuse the upload is skipped when the robot still has this mission loaded, it then has
+        to be run w/ restart. the fingerprint covers the map uploaded through graph_nav, so a
+        mission is always reloaded after the map changes
+        '''
+        map = self._spot.graph_nav.current_map
+        if reuse and self.is_loaded(mission, map):
+            logger.debug(f"mission already loaded, skipping upload")
+            return False
+        self._loaded = None
+        started = time.perf_counter()
         autowalk_result = self.client.load_autowalk(mission.walk)
         if not autowalk_result.status == autowalk_pb2.LoadAutowalkResponse.STATUS_OK:
             raise AutowalkError('failed to upload mission')
+        self.last_upload_seconds = time.perf_counter() - started
+        self._loaded = (self.fingerprint(mission, map), autowalk_result.mission_id)
+        return True
@@ -0,0 +1,142 @@
+import logging
+import collections
+import threading
+import time
+from spot_world.spot.graph_nav import Map
+
+logger = logging.getLogger(__name__)
+
+
+class ChargeError(Exception):
+    pass
+
+
+class ChargeManager:
+    ''' decides when the robot has to head back to its dock, and charges it there
+
+    the drain rate is measured from the battery percentage in the robot states the other facades
+    already fetch, falling back to the robot's estimated runtime. the charge needed to get home is
+    the travel distance from the localized waypoint to the dock along the map graph, at
+    expected_speed, w/ safety_factor and reserve percent on top
+    '''
+
+    # about 90 minutes of runtime, used until the robot has reported a drain or a runtime estimate
+    default_drain_rate = 100.0 / (90 * 60)
+
+    def __init__(self, spot, map: Map, dock_id, reserve=10, resume_at=90, expected_speed=0.5,
+            safety_factor=1.5, drain_window=600, poll_interval=5.0):
+        self._spot = spot
+        self.map = map
+        self.dock_id = dock_id
+        self.reserve = reserve
+        self.resume_at = resume_at
+        self.expected_speed = expected_speed
+        self.safety_factor = safety_factor
+        self.drain_window = drain_window
+        self.poll_interval = poll_interval
+        # (time.monotonic(), charge percentage) while undocked and draining, within drain_window
+        self._samples = collections.deque()
+        self._estimated_drain_rate = None
+        self._lock = threading.Lock()
+        # waypoint id -> travel distance to the dock, from one search out from the dock
+        self._dock_distances = None
+        self._spot.robot_state.subscribe(self._on_battery, fields=['battery_states'])
+
+    def close(self):
+        self._spot.robot_state.unsubscribe(self._on_battery)
+
+    def _on_battery(self, robot_state, changed_fields):
+        if len(robot_state.battery_states) == 0:
+            return
+        battery_state = robot_state.battery_states[0]
+        percentage = battery_state.charge_percentage.value
+        now = time.monotonic()
+        with self._lock:
+            # a rising charge means the robot is charging, the drain starts over from here
+            if self._samples and percentage > self._samples[-1][1]:
+                self._samples.clear()
+            self._samples.append((now, percentage))
+            while self._samples and now - self._samples[0][0] > self.drain_window:
+                self._samples.popleft()
+            runtime = battery_state.estimated_runtime.ToSeconds()
+            if runtime > 0 and percentage > 0:
+                self._estimated_drain_rate = percentage / runtime
+
+    @property
+    def drain_rate(self):
+        ''' battery percent used per second '''
+        with self._lock:
+            if len(self._samples) >= 2:
+                (first_time, first_percentage), (last_time, last_percentage) = self._samples[0], self._samples[-1]
+                # wait for a minute of samples, the percentage is too coarse before that
+                if last_time - first_time >= 60 and first_percentage > last_percentage:
+                    return (first_percentage - last_percentage) / (last_time - first_time)
+            if self._estimated_drain_rate is not None:
+                return self._estimated_drain_rate
+        return self.default_drain_rate
+
+    @property
+    def battery(self):
+        # the shared robot state is recent enough to plan with
+        return self._spot.power.battery
+
+    @property
+    def dock_waypoint_id(self):
+        waypoint_id = self.map.get_waypoint_id_by_fiducial(self.dock_id)
+        if waypoint_id is None:
+            raise ChargeError(f"dock {self.dock_id} is not on the map")
+        return waypoint_id
+
+    def distance_to_dock(self, waypoint_id=None):
+        ''' travel distance from the waypoint (by default the localized one) to the dock
+
+        when the waypoint is unknown or not connected to the dock, the farthest distance on the map
+        is assumed
+        '''
+        if self._dock_distances is None:
+            self._dock_distances = self.map.router.distances_from(self.dock_waypoint_id)
+        if waypoint_id is None:
+            waypoint_id = self._spot.graph_nav.localized_waypoint_id()
+        distance = self._dock_distances.get(waypoint_id)
+        if distance is None:
+            distance = max(self._dock_distances.values(), default=0.0)
+        return distance
+
+    def return_cost(self, waypoint_id=None):
+        ''' battery percent needed to walk from the waypoint back to the dock '''
+        seconds = self.distance_to_dock(waypoint_id) / self.expected_speed
+        return seconds * self.drain_rate * self.safety_factor
+
+    def required_charge(self, upcoming_seconds=0, end_waypoint_id=None):
+        ''' battery percent needed for upcoming_seconds of work ending at end_waypoint_id, then the walk home '''
+        return self.reserve + upcoming_seconds * self.drain_rate * self.safety_factor \
+            + self.return_cost(end_waypoint_id)
+
+    def needs_charge(self, upcoming_seconds=0, end_waypoint_id=None):
+        ''' True when the battery won't cover the upcoming work and the walk back to the dock '''
+        return self.battery < self.required_charge(upcoming_seconds, end_waypoint_id)
+
+    def seconds_until_return(self):
+        ''' seconds of work left before the robot has to head home from where it is '''
+        spare = self.battery - self.required_charge()
+        return max(0.0, spare / (self.drain_rate * self.safety_factor))
+
+    def charge(self, charge_to=None, stop: threading.Event = None):
+        ''' return to the dock when undocked, then wait there until the battery reaches charge_to
+
+        returns the seconds spent, stop ends the wait early
+        '''
+        charge_to = charge_to or self.resume_at
+        started = time.monotonic()
+        if not self._spot.docking.is_docked():
+            self._spot.docking.return_to_dock(self.map, self.dock_id)
+        stop = stop or threading.Event()
+        while self.battery < charge_to and not stop.is_set():
+            stop.wait(self.poll_interval)
+        return time.monotonic() - started
+
+    def resume(self):
+        ''' leave the dock to continue working '''
+        if self._spot.docking.is_docked():
+            self._spot.docking.undock()
+            self._spot.graph_nav.localize_to_fiducial()
@@ -0,0 +1,96 @@
+import logging
+import threading
+import time
+import functools
+import importlib
+import grpc
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+@functools.cache
+def sdk_type(module_name, type_name):
+    ''' a class from the sdk, imported on first use and returned from a cache after that
+
+    the facades are imported before the sdk so it can load in the background, a
+    function-local import would instead go through the import system on every call
+    '''
+    return getattr(importlib.import_module(module_name), type_name)
+
+
+class ClientRegistry:
+    ''' the sdk clients of a robot by service name, created once and shared by the facades
+
+    the first client needs the robot's directory (an rpc), and a channel only connects on its
+    first rpc, so warm() does both up front for every client in parallel rather than on the
+    first use of each command. how long each client took to come up is kept in seconds
+    '''
+
+    def __init__(self, robot):
+        self._robot = robot
+        # service name -> client
+        self._clients = {}
+        # service name -> seconds to create the client and connect its channel
+        self.seconds = {}
+        # service name -> error for clients which failed to come up while warming
+        self.errors = {}
+        self._lock = threading.Lock()
+
+    def ensure(self, service_name):
+        # cached clients are returned w/o taking the lock
+        client = self._clients.get(service_name)
+        if client is None:
+            client = self._create(service_name)
+        return client
+
+    def ensure_type(self, module_name, client_type):
+        ''' the client for an sdk client class, e.g. ('bosdyn.client.power', 'PowerClient') '''
+        return self.ensure(sdk_type(module_name, client_type).default_service_name)
+
+    def _create(self, service_name):
+        started = time.perf_counter()
+        # the robot's ensure_client isn't thread safe, it may sync the directory twice
+        with self._lock:
+            client = self._clients.get(service_name)
+            if client is not None:
+                return client
+            client = self._clients[service_name] = self._robot.ensure_client(service_name)
+            self.errors.pop(service_name, None)
+        self.seconds.setdefault(service_name, time.perf_counter() - started)
+        return client
+
+    def _warm(self, service_name, timeout):
+        started = time.perf_counter()
+        client = self._create(service_name)
+        grpc.channel_ready_future(client.channel).result(timeout=timeout)
+        self.seconds[service_name] = time.perf_counter() - started
+
+    def warm(self, service_names, timeout=10.0, max_workers=8):
+        ''' create the clients and connect their channels in parallel, returns dict of service name -> seconds
+
+        a client which fails is left to be created on first use, w/ its error kept in errors
+        '''
+        if not service_names:
+            return {}
+        started = time.perf_counter()
+        # one directory sync up front, rather than each client racing to do it
+        self._robot.sync_with_directory()
+        self.seconds['directory'] = time.perf_counter() - started
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(service_names)),
+                thread_name_prefix='clients') as executor:
+            futures = {name: executor.submit(self._warm, name, timeout) for name in service_names}
+        for service_name, future in futures.items():
+            error = future.exception()
+            if error is not None:
+                logger.debug(f"unable to warm {service_name} client: {error!r}")
+                self.errors[service_name] = error
+                with self._lock:
+                    self._clients.pop(service_name, None)
+                self.seconds.pop(service_name, None)
+        return {name: self.seconds[name] for name in service_names if name in self.seconds}
+
+    def report(self):
+        lines = [f"{name:<24} {seconds * 1000:8.1f}ms" for name, seconds in sorted(self.seconds.items())]
+        lines += [f"{name:<24} failed: {error!r}" for name, error in sorted(self.errors.items())]
+        return '\n'.join(lines)
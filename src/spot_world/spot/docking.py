@@ -1,5 +1,4 @@
 import logging
-from bosdyn.client.docking import DockingClient, blocking_dock_robot, blocking_undock, get_dock_id
 
 logger = logging.getLogger(__name__)
 
@@ -20,23 +19,36 @@ class DockingFacade:
 
     @property
     def client(self):
-        return self._spot._robot.ensure_client(DockingClient.default_service_name)
+        return self._spot.clients.ensure_type('bosdyn.client.docking', 'DockingClient')
 
     def get_dock_id(self):
         # returns None when not docked
+        from bosdyn.client.docking import get_dock_id
         return get_dock_id(self._spot._robot)
 
     @property
     def status(self):
-        if get_dock_id(self._spot._robot) is not None:
+        if self.get_dock_id() is not None:
             return DockingStatus.DOCKED
         return DockingStatus.UNDOCKED
 
     def is_docked(self):
-        return get_dock_id(self._spot._robot) is not None
+        return self.get_dock_id() is not None
 
     def undock(self):
+        from bosdyn.client.docking import blocking_undock
         blocking_undock(self._spot._robot)
 
     def dock(self, dock_id):
+        from bosdyn.client.docking import blocking_dock_robot
         blocking_dock_robot(self._spot._robot, dock_id)
+
+    def return_to_dock(self, map, dock_id):
+        ''' navigate to the waypoint nearest the dock's fiducial on the map, then dock '''
+        waypoint_id = map.get_waypoint_id_by_fiducial(dock_id)
+        if waypoint_id is None:
+            raise DockingError(f"dock {dock_id} is not on the map")
+        result = self._spot.graph_nav.navigate_to_waypoint(waypoint_id)
+        if not result:
+            raise DockingError(f"unable to return to dock {dock_id}, {result}")
+        self.dock(dock_id)
@@ -1,5 +1,6 @@
 import logging
-from bosdyn.client.estop import EstopClient, EstopEndpoint, EstopKeepAlive, StopLevel
+import queue
+from bosdyn.api.robot_state_pb2 import EStopState
 
 logger = logging.getLogger(__name__)
 
@@ -21,10 +22,21 @@ class EstopFacade:
         self._spot = spot
         self._endpoint = None
         self._keepalive = None
+        self._keepalive_status = None
 
     @property
     def client(self):
-        return self._spot._robot.ensure_client(EstopClient.default_service_name)
+        return self._spot.clients.ensure_type('bosdyn.client.estop', 'EstopClient')
+
+    def _keepalive_ok(self):
+        # take the latest update from the keepalive w/o waiting for its next check in
+        from bosdyn.client.estop import EstopKeepAlive
+        try:
+            while True:
+                self._keepalive_status = self._keepalive.status_queue.get_nowait()[0]
+        except queue.Empty:
+            pass
+        return self._keepalive_status in (None, EstopKeepAlive.KeepAliveStatus.OK)
 
     @property
     def status(self):
@@ -32,9 +44,10 @@ class EstopFacade:
         if self._endpoint is None or self._keepalive is None:
             return EstopStatus.NONE
         # is the latest update from the keepalive ok
-        if self._keepalive.status_queue.get()[0] != EstopKeepAlive.KeepAliveStatus.OK:
+        if not self._keepalive_ok():
             return EstopStatus.ERROR
         # get the status from the robot
+        from bosdyn.client.estop import StopLevel
         stop_level = self.client.get_status().stop_level
         if stop_level == StopLevel.ESTOP_LEVEL_NONE:
             return EstopStatus.NOT_ESTOPPED
@@ -43,9 +56,24 @@ class EstopFacade:
         # if we couldn't resolve a status to return consider it an error
         return EstopStatus.ERROR
 
+    def status_from(self, robot_state):
+        # status from the estop states in an already fetched robot state, avoids get_status rpc
+        if self._endpoint is None or self._keepalive is None:
+            return EstopStatus.NONE
+        if not self._keepalive_ok():
+            return EstopStatus.ERROR
+        estop_states = [estop_state.state for estop_state in robot_state.estop_states]
+        if EStopState.STATE_ESTOPPED in estop_states:
+            return EstopStatus.ESTOPPED
+        if EStopState.STATE_NOT_ESTOPPED in estop_states:
+            return EstopStatus.NOT_ESTOPPED
+        # if we couldn't resolve a status to return consider it an error
+        return EstopStatus.ERROR
+
     def setup(self, timeout_seconds=5):
         if self._endpoint is not None or self._keepalive is not None:
             raise EstopError('estop endpoint is already active')
+        from bosdyn.client.estop import EstopEndpoint, EstopKeepAlive
         self._endpoint = EstopEndpoint(self.client, f"spot-console-estop", timeout_seconds)
         self._endpoint.force_simple_setup()
         self._keepalive = EstopKeepAlive(self._endpoint, max_status_queue_size=1)
@@ -74,6 +102,7 @@ class EstopFacade:
         self._keepalive.shutdown()
         self._endpoint = None
         self._keepalive = None
+        self._keepalive_status = None
 
     def __exit__(self, exc_type, exc_val, exc_tb):
         # why not shutdown? this is what the BD examples do
@@ -0,0 +1,151 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from spot_world.spot.spot import Spot
+from spot_world.spot import rpc_stats
+from spot_world.spot.rpc_stats import RpcStats
+
+logger = logging.getLogger(__name__)
+
+
+class FleetError(Exception):
+    pass
+
+
+class FleetResult:
+    ''' outcome of a fleet operation on one robot, the value returned or the exception raised '''
+
+    def __init__(self, hostname, value=None, error=None, seconds=0.0):
+        self.hostname = hostname
+        self.value = value
+        self.error = error
+        self.seconds = seconds
+
+    def __bool__(self):
+        return self.error is None
+
+    def __str__(self):
+        if self.error is not None:
+            return f"{self.hostname} failed after {self.seconds:.2f}s: {self.error}"
+        return f"{self.hostname} {self.value} ({self.seconds:.2f}s)"
+
+
+class Fleet:
+    ''' several robots sharing one sdk, connected and commanded in parallel
+
+    connections (and the user tokens the sdk keeps refreshed for them) are pooled by hostname,
+    so a robot is only authenticated again after its connection failed
+    '''
+
+    def __init__(self, sdk=None, max_workers=32):
+        self.sdk = sdk or Spot.create_sdk()
+        # hostname -> (username, password)
+        self._credentials = {}
+        # hostname -> connected Spot
+        self._spots = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='fleet')
+        # shared by the robots, so the stats of a command cover every robot it ran on
+        self.rpc_stats = RpcStats()
+
+    def add(self, hostname, username, password):
+        with self._lock:
+            self._credentials[hostname] = (username, password)
+
+    @property
+    def hostnames(self):
+        return list(self._credentials.keys())
+
+    @property
+    def spots(self):
+        ''' dict of hostname -> Spot for the connected robots '''
+        with self._lock:
+            return dict(self._spots)
+
+    def get(self, hostname):
+        spot = self._spots.get(hostname)
+        if spot is None:
+            raise FleetError(f"{hostname} is not connected")
+        return spot
+
+    def _connect(self, hostname):
+        spot = self._spots.get(hostname)
+        if spot is not None:
+            return spot
+        username, password = self._credentials[hostname]
+        # the shared sdk creates the robot once, the channels are reused on reconnect
+        spot = Spot.connect(hostname, username, password, sdk=self.sdk, rpc_stats=self.rpc_stats)
+        with self._lock:
+            self._spots[hostname] = spot
+        return spot
+
+    def connect(self, hostnames=None):
+        ''' authenticate and time sync the robots in parallel, returns dict of hostname -> FleetResult '''
+        hostnames = hostnames or self.hostnames
+        unknown = [hostname for hostname in hostnames if hostname not in self._credentials]
+        if unknown:
+            raise FleetError(f"unknown robots {', '.join(unknown)}")
+        return self._fan_out(hostnames, self._connect)
+
+    def disconnect(self, hostname):
+        ''' drop a robot from the pool, it is authenticated again on the next connect '''
+        with self._lock:
+            self._spots.pop(hostname, None)
+
+    def _timed(self, hostname, fn, *args):
+        started = time.perf_counter()
+        try:
+            value = fn(*args)
+        except Exception as e:
+            logger.debug(f"{hostname} failed: {e}")
+            return FleetResult(hostname, error=e, seconds=time.perf_counter() - started)
+        return FleetResult(hostname, value, seconds=time.perf_counter() - started)
+
+    def _fan_out(self, hostnames, fn):
+        futures = {
+            hostname: rpc_stats.submit(self._executor, self._timed, hostname, fn, hostname)
+            for hostname in hostnames
+        }
+        return {hostname: future.result() for hostname, future in futures.items()}
+
+    def run(self, fn, hostnames=None):
+        ''' call fn(spot) for each connected robot in parallel, returns dict of hostname -> FleetResult
+
+        fn is run on a thread per robot, for long running commands like missions. robots which
+        aren't connected get a failed result
+        '''
+        hostnames = hostnames or self.hostnames
+
+        def _run(hostname):
+            return fn(self.get(hostname))
+
+        return self._fan_out(hostnames, _run)
+
+    def robot_states(self, hostnames=None):
+        ''' fetch every robot state at once, returns dict of hostname -> FleetResult of the RobotState
+
+        the requests are all issued w/ the sdk async calls before waiting on any of them, so the
+        fleet costs about one round trip regardless of its size, and no threads
+        '''
+        hostnames = hostnames or self.hostnames
+        started = time.perf_counter()
+        futures = {}
+        results = {}
+        for hostname in hostnames:
+            try:
+                futures[hostname] = self.get(hostname).robot_state.client.get_robot_state_async()
+            except Exception as e:
+                results[hostname] = FleetResult(hostname, error=e)
+        for hostname, future in futures.items():
+            try:
+                # share the state w/ the robot's facades, as the async facades do
+                robot_state = self._spots[hostname].robot_state.update(future.result())
+            except Exception as e:
+                results[hostname] = FleetResult(hostname, error=e, seconds=time.perf_counter() - started)
+            else:
+                results[hostname] = FleetResult(hostname, robot_state, seconds=time.perf_counter() - started)
+        return {hostname: results[hostname] for hostname in hostnames}
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,278 @@
+import logging
+import math
+import array
+import collections
+import numpy
+from bosdyn.api.graph_nav import map_pb2
+from spot_world.spot.clients import sdk_type
+
+logger = logging.getLogger(__name__)
+
+
+# poses and transforms are packed as x, y, z, qw, qx, qy, qz
+POSE_STRIDE = 7
+
+
+def _pack_pose(pose, values: array.array):
+    values.extend((pose.x, pose.y, pose.z, pose.rot.w, pose.rot.x, pose.rot.y, pose.rot.z))
+
+
+def _pack_pose_proto(pose, values: array.array):
+    # straight from a geometry_pb2.SE3Pose, so loading a map doesn't need the sdk's math helpers
+    position, rotation = pose.position, pose.rotation
+    values.extend((position.x, position.y, position.z, rotation.w, rotation.x, rotation.y, rotation.z))
+
+
+def _unpack_pose(values: array.array, index):
+    x, y, z, qw, qx, qy, qz = values[index * POSE_STRIDE:(index + 1) * POSE_STRIDE]
+    if math.isnan(x):
+        return None
+    # the sdk's math helpers are only imported once a pose is needed, see sdk_type
+    SE3Pose, Quat = sdk_type('bosdyn.client.math_helpers', 'SE3Pose'), sdk_type('bosdyn.client.math_helpers', 'Quat')
+    return SE3Pose(x, y, z, Quat(qw, qx, qy, qz))
+
+
+class MapGeometry:
+    ''' waypoint poses and edge transforms of a graph, packed into flat arrays
+
+    waypoints are referred to by index, in the order of graph.waypoints
+    '''
+
+    def __init__(self, waypoint_ids, poses: array.array, edge_waypoints: array.array, edge_transforms: array.array):
+        self.waypoint_ids = waypoint_ids
+        self.index_by_id = {waypoint_id: i for i, waypoint_id in enumerate(waypoint_ids)}
+        # seed_tform_waypoint per waypoint, nan for waypoints which couldn't be placed
+        self._poses = poses
+        # (from index, to index) per edge, -1 when the edge references a missing waypoint
+        self._edge_waypoints = edge_waypoints
+        # from_tform_to per edge
+        self._edge_transforms = edge_transforms
+
+    def __len__(self):
+        return len(self.waypoint_ids)
+
+    @property
+    def edge_count(self):
+        return len(self._edge_waypoints) // 2
+
+    def edge(self, edge_index):
+        ''' returns (from index, to index, from_tform_to SE3Pose) for an edge '''
+        from_index = self._edge_waypoints[edge_index * 2]
+        to_index = self._edge_waypoints[edge_index * 2 + 1]
+        return from_index, to_index, _unpack_pose(self._edge_transforms, edge_index)
+
+    def edge_length(self, edge_index):
+        offset = edge_index * POSE_STRIDE
+        x, y, z = self._edge_transforms[offset:offset + 3]
+        return math.sqrt(x ** 2 + y ** 2 + z ** 2)
+
+    def edges(self):
+        ''' yields (from index, to index, length) for the edges between known waypoints '''
+        for edge_index in range(self.edge_count):
+            from_index = self._edge_waypoints[edge_index * 2]
+            to_index = self._edge_waypoints[edge_index * 2 + 1]
+            if from_index >= 0 and to_index >= 0:
+                yield from_index, to_index, self.edge_length(edge_index)
+
+    def pose(self, index):
+        ''' seed_tform_waypoint as a SE3Pose, None when the waypoint couldn't be placed '''
+        return _unpack_pose(self._poses, index)
+
+    def position(self, index):
+        ''' seed frame (x, y, z) of a waypoint, None when it couldn't be placed '''
+        x, y, z = self._poses[index * POSE_STRIDE:index * POSE_STRIDE + 3]
+        if math.isnan(x):
+            return None
+        return (x, y, z)
+
+    @property
+    def nbytes(self):
+        # memory held by the packed arrays
+        return sum(a.itemsize * len(a) for a in (self._poses, self._edge_waypoints, self._edge_transforms))
+
+    @property
+    def positions(self):
+        ''' (waypoints, 3) numpy view of the waypoint positions, nan rows for unplaced waypoints '''
+        return numpy.frombuffer(self._poses, dtype=numpy.float64).reshape(-1, POSE_STRIDE)[:, :3]
+
+    def nearest_waypoints(self, position, k=1):
+        ''' returns up to k (distance, waypoint id) nearest to the seed frame position, closest first '''
+        return self.nearest_waypoints_batch([position], k)[0]
+
+    def nearest_waypoints_batch(self, positions, k=1, chunk_size=1024):
+        ''' nearest_waypoints for many positions at once, returns a list per position '''
+        waypoint_positions = self.positions
+        k = min(k, len(waypoint_positions))
+        queries = numpy.asarray(positions, dtype=numpy.float64).reshape(-1, 3)
+        results = []
+        # a chunk of queries at a time bounds the (queries, waypoints) distance matrix
+        for start in range(0, len(queries), chunk_size):
+            chunk = queries[start:start + chunk_size]
+            if k == 0:
+                results.extend([] for _ in chunk)
+                continue
+            distances = numpy.linalg.norm(chunk[:, numpy.newaxis, :] - waypoint_positions[numpy.newaxis, :, :], axis=2)
+            distances[numpy.isnan(distances)] = numpy.inf
+            nearest = numpy.argpartition(distances, k - 1, axis=1)[:, :k]
+            nearest_distances = numpy.take_along_axis(distances, nearest, axis=1)
+            order = numpy.argsort(nearest_distances, axis=1)
+            nearest = numpy.take_along_axis(nearest, order, axis=1)
+            nearest_distances = numpy.take_along_axis(nearest_distances, order, axis=1)
+            for row, row_distances in zip(nearest, nearest_distances):
+                results.append([
+                    (float(distance), self.waypoint_ids[index])
+                    for index, distance in zip(row, row_distances) if numpy.isfinite(distance)
+                ])
+        return results
+
+    @classmethod
+    def from_graph(cls, graph: map_pb2.Graph):
+        waypoint_ids = [waypoint.id for waypoint in graph.waypoints]
+        index_by_id = {waypoint_id: i for i, waypoint_id in enumerate(waypoint_ids)}
+        edge_waypoints = array.array('l')
+        edge_transforms = array.array('d')
+        for edge in graph.edges:
+            edge_waypoints.append(index_by_id.get(edge.id.from_waypoint, -1))
+            edge_waypoints.append(index_by_id.get(edge.id.to_waypoint, -1))
+            _pack_pose_proto(edge.from_tform_to, edge_transforms)
+        poses = array.array('d', [math.nan]) * (len(waypoint_ids) * POSE_STRIDE)
+        geometry = cls(waypoint_ids, poses, edge_waypoints, edge_transforms)
+        geometry._place_waypoints(graph)
+        return geometry
+
+    def _set_pose(self, index, pose, pack=_pack_pose):
+        values = array.array('d')
+        pack(pose, values)
+        self._poses[index * POSE_STRIDE:(index + 1) * POSE_STRIDE] = values
+
+    def _place_waypoints(self, graph: map_pb2.Graph):
+        # prefer the anchoring when the graph has one, it is optimized for the whole map
+        if len(graph.anchoring.anchors) > 0:
+            for anchor in graph.anchoring.anchors:
+                index = self.index_by_id.get(anchor.id)
+                if index is not None:
+                    self._set_pose(index, anchor.seed_tform_waypoint, pack=_pack_pose_proto)
+            return
+        # otherwise chain the edge transforms outward from each unplaced waypoint
+        SE3Pose = sdk_type('bosdyn.client.math_helpers', 'SE3Pose')
+        edge_transforms = collections.defaultdict(list)
+        for edge_index in range(self.edge_count):
+            from_index, to_index, from_tform_to = self.edge(edge_index)
+            if from_index < 0 or to_index < 0:
+                continue
+            edge_transforms[from_index].append((to_index, from_tform_to))
+            edge_transforms[to_index].append((from_index, from_tform_to.inverse()))
+        poses = {}
+        for start_index in range(len(self.waypoint_ids)):
+            if start_index in poses:
+                continue
+            poses[start_index] = SE3Pose.from_identity()
+            queue = collections.deque([start_index])
+            while queue:
+                current_index = queue.popleft()
+                for next_index, current_tform_next in edge_transforms[current_index]:
+                    if next_index not in poses:
+                        poses[next_index] = poses[current_index] * current_tform_next
+                        queue.append(next_index)
+        for index, pose in poses.items():
+            self._set_pose(index, pose)
+
+
+class FiducialSighting:
+    ''' a fiducial seen from a waypoint, position is of the fiducial relative to the waypoint snapshot
+
+    the position is nan when the snapshot didn't have a transform for the fiducial
+    '''
+
+    __slots__ = ('fiducial', 'waypoint_id', 'x', 'y', 'z')
+
+    def __init__(self, fiducial, waypoint_id, x, y, z):
+        self.fiducial = fiducial
+        self.waypoint_id = waypoint_id
+        self.x = x
+        self.y = y
+        self.z = z
+
+    @property
+    def distance(self):
+        return math.sqrt(self.x ** 2 + self.y ** 2 + self.z ** 2)
+
+    def __repr__(self):
+        return f"FiducialSighting({self.fiducial}, {self.waypoint_id!r}, {self.x:.3f}, {self.y:.3f}, {self.z:.3f})"
+
+
+class FiducialSightings:
+    ''' every fiducial sighting in a map's waypoint snapshots, packed into flat arrays
+
+    this is all the fiducial lookups need from the snapshots, so the snapshots themselves
+    (point clouds, images) can stay unparsed or be released once this is built
+    '''
+
+    def __init__(self, waypoint_ids, fiducials: array.array, waypoints: array.array, positions: array.array):
+        # waypoints are indexes into waypoint_ids
+        self._waypoint_ids = waypoint_ids
+        self._fiducials = fiducials
+        self._waypoints = waypoints
+        # x, y, z per sighting
+        self._positions = positions
+
+    def __len__(self):
+        return len(self._fiducials)
+
+    def __getitem__(self, i):
+        x, y, z = self._positions[i * 3:i * 3 + 3]
+        return FiducialSighting(self._fiducials[i], self._waypoint_ids[self._waypoints[i]], x, y, z)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    @property
+    def nbytes(self):
+        return sum(a.itemsize * len(a) for a in (self._fiducials, self._waypoints, self._positions))
+
+    @property
+    def waypoint_ids(self):
+        return self._waypoint_ids
+
+    @property
+    def arrays(self):
+        ''' (fiducials, waypoint indexes, (sightings, 3) positions) as numpy views of the packed arrays '''
+        return (
+            numpy.frombuffer(self._fiducials, dtype=numpy.dtype(self._fiducials.typecode)),
+            numpy.frombuffer(self._waypoints, dtype=numpy.dtype(self._waypoints.typecode)),
+            numpy.frombuffer(self._positions, dtype=numpy.float64).reshape(-1, 3),
+        )
+
+    @classmethod
+    def from_snapshots(cls, graph: map_pb2.Graph, waypoint_snapshots):
+        ''' extract the sightings from the waypoint snapshots of graph
+
+        waypoint_snapshots is a dict of snapshot id -> map_pb2.WaypointSnapshot, or a SnapshotStore
+        in which case each snapshot is parsed only for the extraction and isn't kept
+        '''
+        waypoint_ids = [waypoint.id for waypoint in graph.waypoints]
+        fiducials = array.array('l')
+        waypoints = array.array('l')
+        positions = array.array('d')
+        parse = getattr(waypoint_snapshots, 'parse', waypoint_snapshots.__getitem__)
+        for index, waypoint in enumerate(graph.waypoints):
+            if waypoint.snapshot_id not in waypoint_snapshots:
+                continue
+            snapshot = parse(waypoint.snapshot_id)
+            # iterate over the objects in the snapshot and check for fiducials in objects
+            for snapshot_object in snapshot.objects:
+                if not snapshot_object.HasField('apriltag_properties'):
+                    continue
+                fiducial = snapshot_object.apriltag_properties.tag_id
+                transform = snapshot_object.transforms_snapshot \
+                    .child_to_parent_edge_map.get(f'fiducial_{fiducial}')
+                fiducials.append(fiducial)
+                waypoints.append(index)
+                # keep sightings w/o a transform so the fiducial is still known, w/ a nan position
+                if transform is None:
+                    positions.extend((math.nan, math.nan, math.nan))
+                    continue
+                position = transform.parent_tform_child.position
+                positions.extend((position.x, position.y, position.z))
+        return cls(waypoint_ids, fiducials, waypoints, positions)
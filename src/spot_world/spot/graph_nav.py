@@ -3,24 +3,263 @@ import pathlib
 import time
 import collections
 import os
-import math
-from bosdyn.client.exceptions import ResponseError
-from bosdyn.client.graph_nav import GraphNavClient
-from bosdyn.client.frame_helpers import get_odom_tform_body
+import json
+import hashlib
+import threading
+import collections.abc
+import numpy
+from concurrent.futures import ThreadPoolExecutor
 from bosdyn.api.graph_nav import graph_nav_pb2, map_pb2, nav_pb2
+from spot_world.spot.routing import Router
+from spot_world.spot.geometry import MapGeometry, FiducialSightings
+from spot_world.spot.transfer import SnapshotTransfer
+from spot_world.spot.map_cache import MapCache, MapCacheError
 
 logger = logging.getLogger(__name__)
 
 
+class SnapshotStore(collections.abc.Mapping):
+    ''' read only mapping of snapshot id -> snapshot proto, parsed on first access '''
+
+    def __init__(self, snapshot_class, raw_snapshots):
+        self._snapshot_class = snapshot_class
+        # raw_snapshots is a dict of snapshot id -> serialized snapshot bytes
+        self._raw_snapshots = raw_snapshots
+        self._snapshots = {}
+        self._lock = threading.Lock()
+
+    def __getitem__(self, snapshot_id):
+        snapshot = self._snapshots.get(snapshot_id)
+        if snapshot is not None:
+            return snapshot
+        snapshot = self._snapshot_class()
+        snapshot.ParseFromString(self._raw_snapshots[snapshot_id])
+        with self._lock:
+            # another thread may have parsed the same snapshot in the meantime
+            return self._snapshots.setdefault(snapshot_id, snapshot)
+
+    def __iter__(self):
+        return iter(self._raw_snapshots)
+
+    def __len__(self):
+        return len(self._raw_snapshots)
+
+    def __contains__(self, snapshot_id):
+        return snapshot_id in self._raw_snapshots
+
+    def parse(self, snapshot_id):
+        # parse a snapshot w/o keeping it, for one off reads of snapshots too large to hold
+        snapshot = self._snapshots.get(snapshot_id)
+        if snapshot is not None:
+            return snapshot
+        snapshot = self._snapshot_class()
+        snapshot.ParseFromString(self._raw_snapshots[snapshot_id])
+        return snapshot
+
+    def release(self):
+        # drop the parsed snapshots, they are parsed again when next accessed
+        with self._lock:
+            self._snapshots = {}
+
+    @property
+    def parsed_count(self):
+        return len(self._snapshots)
+
+    @property
+    def resident_size(self):
+        # estimated bytes held in memory, serialized snapshots in a mapped cache file aren't counted
+        size = sum(snapshot.ByteSize() for snapshot in list(self._snapshots.values()))
+        size += sum(len(raw) for raw in self._raw_snapshots.values() if isinstance(raw, bytes))
+        return size
+
+    def size(self, snapshot_id):
+        # serialized size of the snapshot, without parsing it
+        return len(self._raw_snapshots[snapshot_id])
+
+
+class FiducialIndex:
+    ''' fiducial number -> waypoints which see the fiducial, w/ distance from the waypoint '''
+
+    # bump when the saved file format or the sighting rules change
+    VERSION = 1
+
+    def __init__(self, sightings, graph_hash=None):
+        # sightings is a dict of fiducial number -> list of (distance, waypoint id)
+        # sorted by distance, a fiducial may have no usable sightings (see from_map)
+        self._sightings = sightings
+        self.graph_hash = graph_hash
+
+    @property
+    def fiducials(self):
+        return list(self._sightings.keys())
+
+    def sightings(self, fiducial: int):
+        return self._sightings.get(fiducial, [])
+
+    def closest_waypoint(self, fiducial: int):
+        sightings = self._sightings.get(fiducial)
+        if not sightings:
+            return None
+        distance, waypoint_id = sightings[0]
+        return waypoint_id
+
+    def closest_waypoints(self, fiducials):
+        ''' returns dict of fiducial -> closest waypoint id (None when not found) for many fiducials '''
+        return {fiducial: self.closest_waypoint(fiducial) for fiducial in fiducials}
+
+    @classmethod
+    def from_map(cls, map):
+        # the sightings extracted from the snapshots, w/o holding the snapshots
+        fiducial_sightings = map.fiducial_sightings
+        fiducials, waypoints, positions = fiducial_sightings.arrays
+        # distance to the fiducial from body at the waypoint for every sighting at once
+        distances = numpy.sqrt(numpy.sum(positions ** 2, axis=1))
+        # sightings w/o a transform (nan) only record that the fiducial exists
+        usable = ~numpy.isnan(distances)
+        # when this is a docking fiducial exclude distance less than 1
+        # this will prevent selecting a waypoint on top of the dock
+        usable &= ~((fiducials >= 500) & (distances < 1.0))
+        sightings = {int(fiducial): [] for fiducial in numpy.unique(fiducials)}
+        # grouped by fiducial, closest first and equal distances by waypoint id
+        waypoint_ids = fiducial_sightings.waypoint_ids
+        sighting_waypoint_ids = numpy.array(waypoint_ids, dtype=object)[waypoints] if len(waypoints) else waypoints
+        order = numpy.lexsort((sighting_waypoint_ids, distances, fiducials))
+        for i in order[usable[order]]:
+            sightings[int(fiducials[i])].append((float(distances[i]), waypoint_ids[waypoints[i]]))
+        return cls(sightings, map.graph_hash)
+
+    @staticmethod
+    def path_for(base_path: pathlib.Path):
+        # the index is kept beside the autowalk folder, not inside of it
+        base_path = pathlib.Path(base_path).resolve()
+        return base_path.parent / f"{base_path.name}.fiducials.json"
+
+    def save(self, index_path: pathlib.Path):
+        data = {
+            'version': self.VERSION,
+            'graph_hash': self.graph_hash,
+            'fiducials': {
+                str(fiducial): [[distance, waypoint_id] for distance, waypoint_id in fiducial_sightings]
+                for fiducial, fiducial_sightings in self._sightings.items()
+            },
+        }
+        with open(index_path, 'w') as index_file:
+            json.dump(data, index_file)
+
+    @classmethod
+    def load(cls, index_path: pathlib.Path, graph_hash):
+        # returns None when there is no saved index or it was built for another graph
+        try:
+            with open(index_path, 'r') as index_file:
+                data = json.load(index_file)
+        except (OSError, ValueError):
+            return None
+        if data.get('version') != cls.VERSION or data.get('graph_hash') != graph_hash:
+            return None
+        sightings = {
+            int(fiducial): [(distance, waypoint_id) for distance, waypoint_id in fiducial_sightings]
+            for fiducial, fiducial_sightings in data['fiducials'].items()
+        }
+        return cls(sightings, graph_hash)
+
 
 class Map:
 
-    def __init__(self, graph: map_pb2.Graph, waypoint_snapshots, edge_snapshots):
+    def __init__(self, graph: map_pb2.Graph, waypoint_snapshots, edge_snapshots, fiducial_index=None):
         self.graph = graph
         # waypoint_snapshots is dict of waypoint snapshot id -> map_pb2.WaypointSnapshot
+        # or a SnapshotStore which parses the snapshots when first accessed
         self.waypoint_snapshots = waypoint_snapshots
-        # edge_snapshots is a dict of edge snapshot id -> map_pb2.EdgeSnapshot
+        # edge_snapshots is a dict of edge snapshot id -> map_pb2.EdgeSnapshot (or SnapshotStore)
         self.edge_snapshots = edge_snapshots
+        # built from the waypoint snapshots when first used, unless provided
+        self._fiducial_index = fiducial_index
+        self._fiducial_sightings = None
+        self._geometry = None
+        self._graph_hash = None
+        self._content_hash = None
+        self._router = None
+
+    @property
+    def graph_hash(self):
+        # snapshot ids are part of the graph, so this identifies the whole map
+        if self._graph_hash is None:
+            serialized_graph = self.graph.SerializeToString(deterministic=True)
+            self._graph_hash = hashlib.sha256(serialized_graph).hexdigest()
+        return self._graph_hash
+
+    @staticmethod
+    def graph_content_hash(graph: map_pb2.Graph):
+        # hash of the waypoints and edges, independent of their order and of the anchoring
+        # so a graph uploaded w/ generate_new_anchoring still matches when downloaded
+        content = hashlib.sha256()
+        for waypoint in sorted(graph.waypoints, key=lambda w: w.id):
+            content.update(waypoint.SerializeToString(deterministic=True))
+        for edge in sorted(graph.edges, key=lambda e: (e.id.from_waypoint, e.id.to_waypoint)):
+            content.update(edge.SerializeToString(deterministic=True))
+        return content.hexdigest()
+
+    @property
+    def content_hash(self):
+        if self._content_hash is None:
+            self._content_hash = self.graph_content_hash(self.graph)
+        return self._content_hash
+
+    @property
+    def resident_size(self):
+        ''' estimated bytes of the map held in memory '''
+        size = self.graph.ByteSize()
+        for snapshots in (self.waypoint_snapshots, self.edge_snapshots):
+            if isinstance(snapshots, SnapshotStore):
+                size += snapshots.resident_size
+            else:
+                size += sum(snapshot.ByteSize() for snapshot in snapshots.values())
+        if self._geometry is not None:
+            size += self._geometry.nbytes
+        if self._fiducial_sightings is not None:
+            size += self._fiducial_sightings.nbytes
+        return size
+
+    def waypoint_snapshot(self, snapshot_id):
+        # a snapshot for a one off use (i.e. uploading), not kept parsed on the map
+        if isinstance(self.waypoint_snapshots, SnapshotStore):
+            return self.waypoint_snapshots.parse(snapshot_id)
+        return self.waypoint_snapshots[snapshot_id]
+
+    def edge_snapshot(self, snapshot_id):
+        if isinstance(self.edge_snapshots, SnapshotStore):
+            return self.edge_snapshots.parse(snapshot_id)
+        return self.edge_snapshots[snapshot_id]
+
+    def waypoint_snapshot_size(self, snapshot_id):
+        if isinstance(self.waypoint_snapshots, SnapshotStore):
+            return self.waypoint_snapshots.size(snapshot_id)
+        return self.waypoint_snapshots[snapshot_id].ByteSize()
+
+    def edge_snapshot_size(self, snapshot_id):
+        if isinstance(self.edge_snapshots, SnapshotStore):
+            return self.edge_snapshots.size(snapshot_id)
+        return self.edge_snapshots[snapshot_id].ByteSize()
+
+    @property
+    def geometry(self):
+        # waypoint poses and edge transforms, packed
+        if self._geometry is None:
+            self._geometry = MapGeometry.from_graph(self.graph)
+        return self._geometry
+
+    @property
+    def fiducial_sightings(self):
+        # extracted once from the waypoint snapshots, which are not kept parsed for it
+        if self._fiducial_sightings is None:
+            self._fiducial_sightings = FiducialSightings.from_snapshots(self.graph, self.waypoint_snapshots)
+        return self._fiducial_sightings
+
+    @property
+    def fiducial_index(self):
+        if self._fiducial_index is None:
+            self._fiducial_index = FiducialIndex.from_map(self)
+        return self._fiducial_index
 
     # based on the assumption that a graph is created via autowalk
     # and that the first (by timestamp) waypoint is the begining of the mission
@@ -32,160 +271,435 @@ class Map:
         first_waypoint = sorted(self.graph.waypoints, key=lambda w: w.annotations.creation_time.seconds)[0]
         return first_waypoint
 
+    @property
+    def router(self):
+        # adjacency is built once per map, on first use
+        if self._router is None:
+            self._router = Router(self.geometry)
+        return self._router
+
+    def prepare(self):
+        ''' build the hash, geometry, router and fiducial index now rather than on first use '''
+        self.content_hash
+        self.router
+        self.fiducial_index
+        return self
+
     def shortest_path(self, start_waypoint_id, end_waypoint_id):
         ''' returns list of waypoint ids for shortest path between start and end '''
-        # https://onestepcode.com/graph-shortest-path-python/
-        graph = collections.defaultdict(set)
-        for edge in self.graph.edges:
-            graph[edge.id.from_waypoint].add(edge.id.to_waypoint)
-            graph[edge.id.to_waypoint].add(edge.id.from_waypoint)
-        paths, index = [[start_waypoint_id]], 0
-        previous_waypoints = {start_waypoint_id}
-        if start_waypoint_id == end_waypoint_id:
-            return paths[0]
-        while index < len(paths):
-            current_path = paths[index]
-            last_waypoint = current_path[-1]
-            next_waypoints = graph[last_waypoint]
-            if end_waypoint_id in next_waypoints:
-                current_path.append(end_waypoint_id)
-                return current_path
-            for next_waypoint in next_waypoints:
-                if not next_waypoint in previous_waypoints:
-                    new_path = current_path[:]
-                    new_path.append(next_waypoint)
-                    previous_waypoints.add(next_waypoint)
-            index += 1
-        return []
+        return self.router.shortest_path(start_waypoint_id, end_waypoint_id)
 
     def get_fiducials(self):
-        fiducials = set()
-        for waypoint in self.graph.waypoints:
-            snapshot = self.waypoint_snapshots[waypoint.snapshot_id]
-            for potential_fiducial in snapshot.objects:
-                if potential_fiducial.HasField('apriltag_properties'):
-                    fiducial_number = potential_fiducial.apriltag_properties.tag_id
-                    fiducials.add(fiducial_number)
-        return list(fiducials)
-
-    def _calc_distance_from_origin(self, x, y, z):
-        # https://www.math.usm.edu/lambers/mat169/fall09/lecture17.pdf
-        return math.sqrt(x ** 2 + y ** 2 + z ** 2)
+        return self.fiducial_index.fiducials
 
     def get_waypoint_id_by_fiducial(self, search_fiducial: int):
-        # find the closest waypoint to the fiducial
-        distances_and_waypoints = []
-        # iterate over the waypoints on the map and get the snapshots
-        for waypoint in self.graph.waypoints:
-            snapshot = self.waypoint_snapshots[waypoint.snapshot_id]
-            # iterate over the objects in the snapshot and check for fiducial in objects
-            for snapshot_object in snapshot.objects:
-                if snapshot_object.HasField('apriltag_properties'):
-                    if snapshot_object.apriltag_properties.tag_id == search_fiducial:
-                        # get x,y,z to calc distance to fiducial from body at waypoint
-                        transform = snapshot_object.transforms_snapshot \
-                            .child_to_parent_edge_map.get(f'fiducial_{search_fiducial}')
-                        x = transform.parent_tform_child.position.x
-                        y = transform.parent_tform_child.position.y
-                        z = transform.parent_tform_child.position.z
-                        # calc distance to fiducial
-                        distance = self._calc_distance_from_origin(x, y, z)
-                        # when this is a docking fiducial exclude distance less than 1
-                        # this will prevent selecting a waypoint on top of the dock
-                        if search_fiducial >= 500:
-                            if distance < 1.0:
-                                continue
-                        distances_and_waypoints.append(
-                            (distance, waypoint.id)
-                        )
-        # return None when the fiducial wasn't found
-        if len(distances_and_waypoints) == 0:
+        # find the closest waypoint to the fiducial, None when the fiducial wasn't found
+        return self.fiducial_index.closest_waypoint(search_fiducial)
+
+    def get_waypoint_ids_by_fiducials(self, fiducials):
+        ''' returns dict of fiducial -> closest waypoint id, None for fiducials which weren't found '''
+        return self.fiducial_index.closest_waypoints(fiducials)
+
+    def nearest_waypoints(self, position, k=1):
+        ''' returns up to k (distance, waypoint id) nearest to a seed frame SE3Pose or (x, y, z), closest first '''
+        if hasattr(position, 'position'):
+            position = position.position
+        if hasattr(position, 'x'):
+            position = (position.x, position.y, position.z)
+        return self.geometry.nearest_waypoints(position, k)
+
+    def get_waypoint_id_by_position(self, position):
+        # the closest waypoint to a seed frame position, None for an empty map
+        nearest = self.nearest_waypoints(position, k=1)
+        if not nearest:
             return None
-        distance, waypoint_id = sorted(distances_and_waypoints)[0]
+        distance, waypoint_id = nearest[0]
         return waypoint_id
 
+    def rank_fiducials_by_travel(self, start_waypoint_id, fiducials=None):
+        ''' returns list of (travel distance, fiducial, waypoint id) sorted by travel distance from start '''
+        if fiducials is None:
+            fiducials = self.get_fiducials()
+        waypoint_ids = {
+            fiducial: waypoint_id
+            for fiducial, waypoint_id in self.get_waypoint_ids_by_fiducials(fiducials).items()
+            if waypoint_id is not None
+        }
+        # a single search from the start covers all of the fiducial waypoints
+        distances = self.router.distances_from(start_waypoint_id, set(waypoint_ids.values()))
+        ranked = [
+            (distances[waypoint_id], fiducial, waypoint_id)
+            for fiducial, waypoint_id in waypoint_ids.items()
+            if waypoint_id in distances
+        ]
+        return sorted(ranked)
+
+    @staticmethod
+    def _read_snapshots(snapshots_path: pathlib.Path, snapshot_ids, executor, snapshot_class=None):
+        # returns dict of snapshot id -> bytes, or parsed protos when snapshot_class is given
+        def _read_snapshot(snapshot_id):
+            snapshot_path = pathlib.Path(snapshots_path, snapshot_id)
+            if not snapshot_path.exists():
+                raise GraphNavError(f"snapshot file {snapshot_path} not found")
+            with open(snapshot_path, 'rb') as snapshot_file:
+                raw_snapshot = snapshot_file.read()
+            if snapshot_class is None:
+                return raw_snapshot
+            snapshot = snapshot_class()
+            snapshot.ParseFromString(raw_snapshot)
+            return snapshot
+        return dict(zip(snapshot_ids, executor.map(_read_snapshot, snapshot_ids)))
+
+    @staticmethod
+    def _snapshot_ids(graph: map_pb2.Graph):
+        waypoint_snapshot_ids = list(dict.fromkeys(
+            waypoint.snapshot_id for waypoint in graph.waypoints if len(waypoint.snapshot_id) > 0
+        ))
+        edge_snapshot_ids = list(dict.fromkeys(
+            edge.snapshot_id for edge in graph.edges if len(edge.snapshot_id) > 0
+        ))
+        return waypoint_snapshot_ids, edge_snapshot_ids
+
     @classmethod
-    def from_filesystem(cls, base_path: pathlib.Path):
+    def _read_cached(cls, base_path: pathlib.Path, max_workers=8):
+        # returns (serialized graph, dict of waypoint snapshot id -> serialized snapshot, same for edges)
+        # as views into the map cache beside base_path, the cache is rebuilt when the source files change
+        cache_path = MapCache.path_for(base_path)
+        sources = MapCache.source_stats(base_path)
+        map_cache = MapCache.open(cache_path, sources)
+        if map_cache is not None:
+            return map_cache.graph, map_cache.waypoint_snapshots, map_cache.edge_snapshots
+        logger.debug(f"building map cache {cache_path}")
+        with open(pathlib.Path(base_path, 'graph'), 'rb') as graph_file:
+            raw_graph = graph_file.read()
+        graph = map_pb2.Graph()
+        graph.ParseFromString(raw_graph)
+        waypoint_snapshot_ids, edge_snapshot_ids = cls._snapshot_ids(graph)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            raw_waypoint_snapshots = cls._read_snapshots(pathlib.Path(base_path, 'waypoint_snapshots'),
+                waypoint_snapshot_ids, executor)
+            raw_edge_snapshots = cls._read_snapshots(pathlib.Path(base_path, 'edge_snapshots'),
+                edge_snapshot_ids, executor)
+        try:
+            map_cache = MapCache.build(cache_path, raw_graph, raw_waypoint_snapshots, raw_edge_snapshots, sources)
+        except (OSError, MapCacheError) as e:
+            # still usable from memory, only the next load is slower
+            logger.warning(f"unable to save map cache {cache_path}: {e}")
+            return raw_graph, raw_waypoint_snapshots, raw_edge_snapshots
+        return map_cache.graph, map_cache.waypoint_snapshots, map_cache.edge_snapshots
+
+    @classmethod
+    def from_filesystem(cls, base_path: pathlib.Path, lazy=False, max_workers=8, cache=False):
         # expect the base path to be the folder from a autowalk from tablet
         graph_path = pathlib.Path(base_path, 'graph')
         if not graph_path.exists():
             raise GraphNavError(f"graph file {graph_path} not found")
         graph = map_pb2.Graph()
-        with open(graph_path, 'rb') as graph_file:
-            graph.ParseFromString(graph_file.read())
-        waypoint_snapshots = {}
-        for waypoint in graph.waypoints:
-            if len(waypoint.snapshot_id) == 0:
-                continue
-            waypoint_snapshot_path = pathlib.Path(base_path, 'waypoint_snapshots', waypoint.snapshot_id)
-            if not waypoint_snapshot_path.exists():
-                raise GraphNavError(f"waypoint snapshot file {waypoint_snapshot_path} not found")
-            waypoint_snapshot = map_pb2.WaypointSnapshot()
-            with open(waypoint_snapshot_path, 'rb') as waypoint_snapshot_file:
-                waypoint_snapshot.ParseFromString(waypoint_snapshot_file.read())
-            waypoint_snapshots[waypoint.snapshot_id] = waypoint_snapshot
-        edge_snapshots = {}
-        for edge in graph.edges:
-            if len(edge.snapshot_id) == 0:
-                continue
-            edge_snapshot_path = pathlib.Path(base_path, 'edge_snapshots', edge.snapshot_id)
-            if not edge_snapshot_path.exists():
-                raise GraphNavError(f"edge snapshot file {edge_snapshot_path} not found")
-            edge_snapshot = map_pb2.EdgeSnapshot()
-            with open(edge_snapshot_path, 'rb') as edge_snapshot_file:
-                edge_snapshot.ParseFromString(edge_snapshot_file.read())
-            edge_snapshots[edge.snapshot_id] = edge_snapshot
-        return cls(graph, waypoint_snapshots, edge_snapshots)
+        if cache:
+            # one memory mapped file instead of a file per snapshot, see MapCache
+            raw_graph, raw_waypoint_snapshots, raw_edge_snapshots = cls._read_cached(base_path, max_workers)
+            graph.ParseFromString(raw_graph)
+            waypoint_snapshots = SnapshotStore(map_pb2.WaypointSnapshot, raw_waypoint_snapshots)
+            edge_snapshots = SnapshotStore(map_pb2.EdgeSnapshot, raw_edge_snapshots)
+            if not lazy:
+                waypoint_snapshots = dict(waypoint_snapshots)
+                edge_snapshots = dict(edge_snapshots)
+        else:
+            with open(graph_path, 'rb') as graph_file:
+                graph.ParseFromString(graph_file.read())
+            waypoint_snapshot_ids, edge_snapshot_ids = cls._snapshot_ids(graph)
+            # read the snapshot files w/ a thread pool, when lazy the parsing is
+            # deferred until a snapshot is first accessed from the map
+            waypoint_snapshots_path = pathlib.Path(base_path, 'waypoint_snapshots')
+            edge_snapshots_path = pathlib.Path(base_path, 'edge_snapshots')
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                if lazy:
+                    waypoint_snapshots = SnapshotStore(map_pb2.WaypointSnapshot,
+                        cls._read_snapshots(waypoint_snapshots_path, waypoint_snapshot_ids, executor))
+                    edge_snapshots = SnapshotStore(map_pb2.EdgeSnapshot,
+                        cls._read_snapshots(edge_snapshots_path, edge_snapshot_ids, executor))
+                else:
+                    waypoint_snapshots = cls._read_snapshots(waypoint_snapshots_path,
+                        waypoint_snapshot_ids, executor, map_pb2.WaypointSnapshot)
+                    edge_snapshots = cls._read_snapshots(edge_snapshots_path,
+                        edge_snapshot_ids, executor, map_pb2.EdgeSnapshot)
+        map = cls(graph, waypoint_snapshots, edge_snapshots)
+        # reuse the fiducial index from a previous load of this map when possible
+        index_path = FiducialIndex.path_for(base_path)
+        map._fiducial_index = FiducialIndex.load(index_path, map.graph_hash)
+        if map._fiducial_index is None:
+            try:
+                map.fiducial_index.save(index_path)
+            except OSError as e:
+                logger.warning(f"unable to save fiducial index {index_path}: {e}")
+        return map
 
 
 class GraphNavError(Exception):
     pass
 
 
+class UploadReport:
+    ''' what an upload_map call sent to the robot and what it was able to skip '''
+
+    def __init__(self):
+        # True when the robot already had this exact graph and nothing was uploaded
+        self.unchanged = False
+        # True when the robot graph had to be cleared before uploading
+        self.cleared = False
+        self.bytes_sent = 0
+        self.bytes_skipped = 0
+        self.waypoint_snapshots_sent = 0
+        self.waypoint_snapshots_skipped = 0
+        self.edge_snapshots_sent = 0
+        self.edge_snapshots_skipped = 0
+
+    def __str__(self):
+        if self.unchanged:
+            return f"map unchanged on robot, skipped {self.bytes_skipped} bytes"
+        return (
+            f"uploaded {self.waypoint_snapshots_sent} waypoint and {self.edge_snapshots_sent} edge snapshots"
+            f" ({self.bytes_sent} bytes), skipped {self.waypoint_snapshots_skipped} waypoint"
+            f" and {self.edge_snapshots_skipped} edge snapshots ({self.bytes_skipped} bytes)"
+        )
+
+
+class NavigationStatus:
+    REACHED = 'REACHED'
+    LOST = 'LOST'
+    STUCK = 'STUCK'
+    TIMEOUT = 'TIMEOUT'
+    FAILED = 'FAILED'
+
+
+class NavigationResult:
+    ''' outcome of navigate_to_waypoint, truthy when the goal was reached '''
+
+    def __init__(self, status, elapsed, commands_sent, feedback_polls, feedback_status=None, remaining_distance=None):
+        self.status = status
+        # seconds from the first navigate_to until the result
+        self.elapsed = elapsed
+        # navigate_to calls, the first plus re-issues to extend the command
+        self.commands_sent = commands_sent
+        self.feedback_polls = feedback_polls
+        # last graph_nav_pb2.NavigationFeedbackResponse status, None when no feedback was received
+        self.feedback_status = feedback_status
+        self.remaining_distance = remaining_distance
+
+    def __bool__(self):
+        return self.status == NavigationStatus.REACHED
+
+    def __str__(self):
+        feedback_status = 'NONE'
+        if self.feedback_status is not None:
+            feedback_status = graph_nav_pb2.NavigationFeedbackResponse.Status.Name(self.feedback_status)
+        return (
+            f"navigation {self.status} ({feedback_status}) after {self.elapsed:.1f}s,"
+            f" {self.commands_sent} commands, {self.feedback_polls} feedback polls"
+        )
+
+
+class NavigationControl:
+    ''' the decisions of navigate_to_waypoint w/o the rpcs, shared by the blocking and async facades
+
+    each round the facade checks timed_out(), sends the navigate_to command when command_due()
+    and hands the command id to command_sent(), then polls feedback and hands it to
+    on_feedback(). that returns a NavigationResult once navigation is over, otherwise the facade
+    waits poll_interval() before the next round
+    '''
+
+    status_by_feedback = {
+        graph_nav_pb2.NavigationFeedbackResponse.STATUS_REACHED_GOAL: NavigationStatus.REACHED,
+        graph_nav_pb2.NavigationFeedbackResponse.STATUS_LOST: NavigationStatus.LOST,
+        graph_nav_pb2.NavigationFeedbackResponse.STATUS_NO_LOCALIZATION: NavigationStatus.LOST,
+        graph_nav_pb2.NavigationFeedbackResponse.STATUS_NOT_LOCALIZED_TO_ROUTE: NavigationStatus.LOST,
+        graph_nav_pb2.NavigationFeedbackResponse.STATUS_STUCK: NavigationStatus.STUCK,
+        graph_nav_pb2.NavigationFeedbackResponse.STATUS_NO_ROUTE: NavigationStatus.FAILED,
+        graph_nav_pb2.NavigationFeedbackResponse.STATUS_ROBOT_IMPAIRED: NavigationStatus.FAILED,
+        graph_nav_pb2.NavigationFeedbackResponse.STATUS_CONSTRAINT_FAULT: NavigationStatus.FAILED,
+        graph_nav_pb2.NavigationFeedbackResponse.STATUS_COMMAND_OVERRIDDEN: NavigationStatus.FAILED,
+        graph_nav_pb2.NavigationFeedbackResponse.STATUS_LEASE_ERROR: NavigationStatus.FAILED,
+        graph_nav_pb2.NavigationFeedbackResponse.STATUS_AREA_CALLBACK_ERROR: NavigationStatus.FAILED,
+    }
+
+    def __init__(self, graph_nav, waypoint_id, timeout=None, command_duration=10.0,
+            min_poll_interval=0.2, max_poll_interval=2.0, expected_speed=0.5):
+        self._graph_nav = graph_nav
+        self.waypoint_id = waypoint_id
+        self.timeout = timeout
+        self.command_duration = command_duration
+        self.min_poll_interval = min_poll_interval
+        self.max_poll_interval = max_poll_interval
+        self.expected_speed = expected_speed
+        self.started = time.monotonic()
+        # None until the first command, and again after the command lapsed
+        self.command_id = None
+        self._command_expires = self.started
+        self._command_time = self.started
+        self.commands_sent, self.feedback_polls = 0, 0
+        self.feedback = None
+
+    def result(self, status):
+        feedback = self.feedback
+        return NavigationResult(status, time.monotonic() - self.started, self.commands_sent, self.feedback_polls,
+            feedback_status=feedback.status if feedback is not None else None,
+            remaining_distance=feedback.remaining_route_length if feedback is not None else None,
+        )
+
+    def timed_out(self):
+        return self.timeout is not None and time.monotonic() - self.started > self.timeout
+
+    def command_due(self):
+        # extend the command while there is still time for a slow poll before it expires
+        self._command_time = time.monotonic()
+        return self.command_id is None or self._command_expires - self._command_time < self.max_poll_interval * 1.5
+
+    def command_sent(self, command_id):
+        self.command_id = command_id
+        self._command_expires = self._command_time + self.command_duration
+        self.commands_sent += 1
+
+    def command_failed(self, error):
+        logger.debug(f"navigate_to {self.waypoint_id} failed: {error}")
+        return self.result(NavigationStatus.FAILED)
+
+    def on_feedback(self, feedback):
+        ''' returns the NavigationResult when feedback ends navigation, otherwise None '''
+        self.feedback = feedback
+        self.feedback_polls += 1
+        self._graph_nav._notify_feedback(feedback)
+        if feedback.status == graph_nav_pb2.NavigationFeedbackResponse.STATUS_COMMAND_TIMED_OUT:
+            # the command lapsed between polls, start a new one
+            self.command_id = None
+            return None
+        status = self.status_by_feedback.get(feedback.status)
+        if status is not None:
+            return self.result(status)
+        return None
+
+    def poll_interval(self):
+        # right away after a lapsed command, otherwise about a quarter of the expected time left on
+        # the route within the bounds, and never past the timeout
+        if self.command_id is None:
+            return 0.0
+        poll_interval = self.feedback.remaining_route_length / self.expected_speed / 4
+        poll_interval = min(max(poll_interval, self.min_poll_interval), self.max_poll_interval)
+        if self.timeout is not None:
+            poll_interval = min(poll_interval, max(0.0, self.started + self.timeout - time.monotonic()))
+        return poll_interval
+
+
 class GraphNavFacade:
 
     def __init__(self, spot):
         self._spot = spot
+        # snapshot uploads and downloads run through this, set max_workers/retries to tune
+        self.transfer = SnapshotTransfer()
+        # the map last uploaded to the robot
+        self.current_map = None
+        # called w/ each NavigationFeedbackResponse while navigating, e.g. to record it
+        self._feedback_listeners = []
 
     @property
     def client(self):
-        return self._spot._robot.ensure_client(GraphNavClient.default_service_name)
+        return self._spot.clients.ensure_type('bosdyn.client.graph_nav', 'GraphNavClient')
+
+    def subscribe_feedback(self, callback):
+        self._feedback_listeners.append(callback)
+
+    def unsubscribe_feedback(self, callback):
+        self._feedback_listeners = [c for c in self._feedback_listeners if c != callback]
+
+    def _notify_feedback(self, feedback):
+        for callback in list(self._feedback_listeners):
+            try:
+                callback(feedback)
+            except Exception as e:
+                logger.warning(f"navigation feedback listener {callback} failed: {e}")
 
     def clear(self):
         self.client.clear_graph()
 
-    def upload_map(self, map: Map):
+    def upload_map(self, map: Map, incremental=False, progress=None):
+        ''' upload graph and the snapshots the robot doesn't have, returns an UploadReport
+
+        when incremental, the graph already on the robot is checked first. it is only kept when
+        it matches the map or the map adds to it. the robot appends an uploaded graph to the one
+        it has, so a waypoint or edge the map removed or changed would otherwise stay on the robot
+        and be routed over. the graph is sent even when it matches, as the robot's response is
+        what says which snapshots it is missing, e.g. after an earlier upload failed part way.
+        progress is passed along to SnapshotTransfer.run for the waypoint and edge snapshots
+        '''
+        report = UploadReport()
+        waypoint_snapshot_ids = set(w.snapshot_id for w in map.graph.waypoints if len(w.snapshot_id) > 0)
+        edge_snapshot_ids = set(e.snapshot_id for e in map.graph.edges if len(e.snapshot_id) > 0)
+        graph_matches = False
+        if incremental:
+            robot_graph = self.client.download_graph()
+            if robot_graph is not None and len(robot_graph.waypoints) > 0:
+                graph_matches = Map.graph_content_hash(robot_graph) == map.content_hash
+                # snapshots already on the robot are kept when the map only adds to its graph
+                if not graph_matches and not self._graph_extends(map.graph, robot_graph):
+                    self.clear()
+                    report.cleared = True
         generate_new_anchoring = not len(map.graph.anchoring.anchors)
         response = self.client.upload_graph(
             graph=map.graph,
             generate_new_anchoring=generate_new_anchoring,
         )
-        for snapshot_id in response.unknown_waypoint_snapshot_ids:
-            waypoint_snapshot = map.waypoint_snapshots[snapshot_id]
-            self.client.upload_waypoint_snapshot(waypoint_snapshot)
-        for snapshot_id in response.unknown_edge_snapshot_ids:
-            edge_snapshot = map.edge_snapshots[snapshot_id]
-            self.client.upload_edge_snapshot(edge_snapshot)
-
-    def download_map(self):
+        report.bytes_sent += map.graph.ByteSize()
+        unknown_waypoint_snapshot_ids = set(response.unknown_waypoint_snapshot_ids)
+        unknown_edge_snapshot_ids = set(response.unknown_edge_snapshot_ids)
+        self.transfer.run(unknown_waypoint_snapshot_ids,
+            lambda i: self.client.upload_waypoint_snapshot(map.waypoint_snapshot(i)), progress)
+        self.transfer.run(unknown_edge_snapshot_ids,
+            lambda i: self.client.upload_edge_snapshot(map.edge_snapshot(i)), progress)
+        report.waypoint_snapshots_sent = len(unknown_waypoint_snapshot_ids)
+        report.edge_snapshots_sent = len(unknown_edge_snapshot_ids)
+        report.bytes_sent += sum(map.waypoint_snapshot_size(i) for i in unknown_waypoint_snapshot_ids)
+        report.bytes_sent += sum(map.edge_snapshot_size(i) for i in unknown_edge_snapshot_ids)
+        for snapshot_id in waypoint_snapshot_ids - unknown_waypoint_snapshot_ids:
+            report.waypoint_snapshots_skipped += 1
+            report.bytes_skipped += map.waypoint_snapshot_size(snapshot_id)
+        for snapshot_id in edge_snapshot_ids - unknown_edge_snapshot_ids:
+            report.edge_snapshots_skipped += 1
+            report.bytes_skipped += map.edge_snapshot_size(snapshot_id)
+        report.unchanged = graph_matches and not unknown_waypoint_snapshot_ids and not unknown_edge_snapshot_ids
+        self.current_map = map
+        return report
+
+    @staticmethod
+    def _graph_extends(graph: map_pb2.Graph, robot_graph: map_pb2.Graph):
+        # True when every waypoint and edge of robot_graph is in graph unchanged
+        waypoints = {w.id: w for w in graph.waypoints}
+        if any(waypoints.get(w.id) != w for w in robot_graph.waypoints):
+            return False
+        edges = {(e.id.from_waypoint, e.id.to_waypoint): e for e in graph.edges}
+        return all(edges.get((e.id.from_waypoint, e.id.to_waypoint)) == e for e in robot_graph.edges)
+
+    def download_map(self, progress=None):
         graph = self.client.download_graph()
         if graph is None:
-            raise GraphNavClient('download of graph failed')
-        waypoint_snapshots = {}
-        for waypoint in graph.waypoints:
-            if len(waypoint.snapshot_id) == 0:
-                continue
-            waypoint_snapshot = self.client.download_waypoint_snapshot(waypoint.snapshot_id)
-            waypoint_snapshots[waypoint.snapshot_id] = waypoint_snapshot
-        edge_snapshots = {}
-        for edge in graph.edges:
-            if len(edge.snapshot_id) == 0:
-                continue
-            edge_snapshot = self.client.download_edge_snapshot(edge.snapshot_id)
-            edge_snapshots[edge.snapshot_id] = edge_snapshot
+            raise GraphNavError('download of graph failed')
+        waypoint_snapshot_ids = list(dict.fromkeys(
+            waypoint.snapshot_id for waypoint in graph.waypoints if len(waypoint.snapshot_id) > 0
+        ))
+        edge_snapshot_ids = list(dict.fromkeys(
+            edge.snapshot_id for edge in graph.edges if len(edge.snapshot_id) > 0
+        ))
+        waypoint_snapshots = self.transfer.run(waypoint_snapshot_ids,
+            self.client.download_waypoint_snapshot, progress)
+        edge_snapshots = self.transfer.run(edge_snapshot_ids,
+            self.client.download_edge_snapshot, progress)
         return Map(graph, waypoint_snapshots, edge_snapshots)
 
+    def localized_waypoint_id(self):
+        # waypoint the robot is localized to, None when it isn't localized
+        localization_state = self.client.get_localization_state()
+        return localization_state.localization.waypoint_id or None
+
     def localize_to_fiducial(self):
+        from bosdyn.client.frame_helpers import get_odom_tform_body
         robot_state = self._spot.robot_state.get()
         current_odom_tform_body = get_odom_tform_body(robot_state.kinematic_state.transforms_snapshot)
         localization = nav_pb2.Localization()
@@ -194,27 +708,29 @@ class GraphNavFacade:
             ko_tform_body=current_odom_tform_body.to_proto(),
         )
 
-    def navigate_to_waypoint(self, waypoint_id):
-        navigation_complete = False
-        while not navigation_complete:
-            navigation_command = None
-            try:
-                navigation_command = self.client.navigate_to(waypoint_id, 1.0,
-                    leases=[self._spot.lease.current],
-                    command_id=navigation_command
-                )
-            except ResponseError as e:
-                return False
-            time.sleep(.5)
-            navigation_complete = self._check_success(navigation_command)
-        return True
-
-    def _check_success(self, command=-1):
-        if command == -1:
-            return False
-        feedback = self.client.navigation_feedback(command)
-        if feedback.status == graph_nav_pb2.NavigationFeedbackResponse.STATUS_REACHED_GOAL:
-            return True
-        # todo: handle other possible statuses here?
-        else:
-            return False
+    def navigate_to_waypoint(self, waypoint_id, timeout=None, command_duration=10.0,
+            min_poll_interval=0.2, max_poll_interval=2.0, expected_speed=0.5):
+        ''' navigate to the waypoint and wait for the outcome, returns a NavigationResult
+
+        the navigate_to command is issued once and re-issued w/ the same command id to extend it
+        before it expires. feedback is polled more often as the remaining route gets shorter,
+        at about a quarter of the expected time left at expected_speed (m/s)
+        '''
+        from bosdyn.client.exceptions import ResponseError
+        control = NavigationControl(self, waypoint_id, timeout, command_duration, min_poll_interval,
+            max_poll_interval, expected_speed)
+        while not control.timed_out():
+            if control.command_due():
+                try:
+                    command_id = self.client.navigate_to(waypoint_id, command_duration,
+                        leases=[self._spot.lease.current],
+                        command_id=control.command_id,
+                    )
+                except ResponseError as e:
+                    return control.command_failed(e)
+                control.command_sent(command_id)
+            result = control.on_feedback(self.client.navigation_feedback(control.command_id))
+            if result is not None:
+                return result
+            time.sleep(control.poll_interval())
+        return control.result(NavigationStatus.TIMEOUT)
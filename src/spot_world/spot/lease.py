@@ -1,5 +1,4 @@
 import logging
-from bosdyn.client.lease import LeaseKeepAlive, LeaseClient, ResourceAlreadyClaimedError
 
 logger = logging.getLogger(__name__)
 
@@ -22,7 +21,7 @@ class LeaseFacade:
 
     @property
     def client(self):
-        return self._spot._robot.ensure_client(LeaseClient.default_service_name)
+        return self._spot.clients.ensure_type('bosdyn.client.lease', 'LeaseClient')
 
     @property
     def status(self):
@@ -35,6 +34,7 @@ class LeaseFacade:
         return self._lease
 
     def acquire(self):
+        from bosdyn.client.lease import LeaseKeepAlive, ResourceAlreadyClaimedError
         # todo: handle already having a lease? throw our own LeaseError?
         if not self._lease:
             try:
@@ -44,6 +44,7 @@ class LeaseFacade:
                 raise LeaseError('unable to acquire lease, robot is already being controlled')
 
     def take(self):
+        from bosdyn.client.lease import LeaseKeepAlive
         if not self._lease:
             self._lease = self.client.take()
             self._keepalive = LeaseKeepAlive(self.client)
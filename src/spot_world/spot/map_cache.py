@@ -0,0 +1,147 @@
+import logging
+import pathlib
+import os
+import mmap
+import json
+import struct
+
+logger = logging.getLogger(__name__)
+
+
+class MapCacheError(Exception):
+    pass
+
+
+class MapCache:
+    ''' an autowalk map packed into one memory mapped file
+
+    the file is a header, the graph and snapshots back to back, then a json index of
+    (offset, length) for each of them and the mtime and size of the source files it was built from
+    '''
+
+    MAGIC = b'SWMAPCCH'
+    # bump when the file layout changes
+    VERSION = 1
+    # magic, version, index offset, index length
+    _header = struct.Struct('<8sIQQ')
+
+    def __init__(self, path: pathlib.Path, mapped: mmap.mmap, index):
+        self.path = path
+        self._mmap = mapped
+        self._view = memoryview(mapped)
+        self._index = index
+
+    @staticmethod
+    def path_for(base_path: pathlib.Path):
+        # like the fiducial index, the cache is kept beside the autowalk folder
+        base_path = pathlib.Path(base_path).resolve()
+        return base_path.parent / f"{base_path.name}.mapcache"
+
+    @staticmethod
+    def source_stats(base_path: pathlib.Path):
+        ''' returns dict of path relative to base_path -> [mtime_ns, size] for the map files '''
+        base_path = pathlib.Path(base_path)
+        graph_stat = os.stat(base_path / 'graph')
+        stats = {'graph': [graph_stat.st_mtime_ns, graph_stat.st_size]}
+        # stat without opening each snapshot file, scandir avoids a lookup per file
+        for folder in ('waypoint_snapshots', 'edge_snapshots'):
+            try:
+                entries = list(os.scandir(base_path / folder))
+            except FileNotFoundError:
+                continue
+            for entry in entries:
+                if entry.is_file():
+                    entry_stat = entry.stat()
+                    stats[f"{folder}/{entry.name}"] = [entry_stat.st_mtime_ns, entry_stat.st_size]
+        return stats
+
+    def _slice(self, offset, length):
+        # a view into the mapped file, no bytes are copied
+        return self._view[offset:offset + length]
+
+    @property
+    def sources(self):
+        return self._index['sources']
+
+    @property
+    def graph(self):
+        return self._slice(*self._index['graph'])
+
+    @property
+    def waypoint_snapshots(self):
+        ''' dict of waypoint snapshot id -> memoryview of the serialized snapshot '''
+        return {i: self._slice(*entry) for i, entry in self._index['waypoint_snapshots'].items()}
+
+    @property
+    def edge_snapshots(self):
+        ''' dict of edge snapshot id -> memoryview of the serialized snapshot '''
+        return {i: self._slice(*entry) for i, entry in self._index['edge_snapshots'].items()}
+
+    @classmethod
+    def open(cls, cache_path: pathlib.Path, sources=None):
+        ''' returns the cache at cache_path, None when missing, invalid or built from other sources '''
+        try:
+            with open(cache_path, 'rb') as cache_file:
+                mapped = mmap.mmap(cache_file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+        try:
+            magic, version, index_offset, index_length = cls._header.unpack_from(mapped, 0)
+            if magic != cls.MAGIC or version != cls.VERSION:
+                raise MapCacheError(f"{cache_path} is not a version {cls.VERSION} map cache")
+            if index_offset + index_length > len(mapped):
+                raise MapCacheError(f"{cache_path} is truncated")
+            index = json.loads(mapped[index_offset:index_offset + index_length])
+        except (struct.error, ValueError, MapCacheError) as e:
+            logger.debug(f"ignoring map cache: {e}")
+            mapped.close()
+            return None
+        if sources is not None and index['sources'] != sources:
+            logger.debug(f"map cache {cache_path} is stale")
+            mapped.close()
+            return None
+        return cls(pathlib.Path(cache_path), mapped, index)
+
+    @classmethod
+    def build(cls, cache_path: pathlib.Path, graph: bytes, waypoint_snapshots, edge_snapshots, sources):
+        ''' write a cache of the serialized graph and snapshot dicts (id -> bytes), returns it opened
+
+        the file is written beside cache_path and moved into place, so readers never see a partial cache
+        '''
+        cache_path = pathlib.Path(cache_path)
+        index = {'sources': sources, 'waypoint_snapshots': {}, 'edge_snapshots': {}}
+        temp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+        try:
+            with open(temp_path, 'wb') as cache_file:
+                cache_file.write(b'\0' * cls._header.size)
+                offset = cls._header.size
+
+                def _write(data):
+                    nonlocal offset
+                    cache_file.write(data)
+                    entry = [offset, len(data)]
+                    offset += len(data)
+                    return entry
+
+                index['graph'] = _write(graph)
+                for snapshot_id, snapshot in waypoint_snapshots.items():
+                    index['waypoint_snapshots'][snapshot_id] = _write(snapshot)
+                for snapshot_id, snapshot in edge_snapshots.items():
+                    index['edge_snapshots'][snapshot_id] = _write(snapshot)
+                serialized_index = json.dumps(index).encode()
+                cache_file.write(serialized_index)
+                cache_file.seek(0)
+                cache_file.write(cls._header.pack(cls.MAGIC, cls.VERSION, offset, len(serialized_index)))
+            os.replace(temp_path, cache_path)
+        finally:
+            if temp_path.exists():
+                temp_path.unlink()
+        cache = cls.open(cache_path)
+        if cache is None:
+            raise MapCacheError(f"unable to open map cache {cache_path} after building it")
+        return cache
+
+    def close(self):
+        # only possible once no snapshot views are still referenced
+        self._view.release()
+        self._mmap.close()
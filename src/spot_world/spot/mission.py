@@ -1,10 +1,9 @@
 import logging
 import pathlib
 import time
-import bosdyn.mission.client
-from bosdyn.client.exceptions import RpcError, ResponseError
 from bosdyn.api.mission import mission_pb2
 from bosdyn.api.mission import nodes_pb2
+from bosdyn.api.mission import util_pb2
 from spot_world.spot.graph_nav import Map
 
 logger = logging.getLogger(__name__)
@@ -24,6 +23,96 @@ class MissionStatus:
     FAILED_ON_QUESTION = 'FAILED_ON_QUESTION'
 
 
+class NodeStatusChange:
+    ''' a mission node whose result changed, as seen in the mission state history '''
+
+    def __init__(self, tick, node_id, name, result, error=''):
+        self.tick = tick
+        self.node_id = node_id
+        # name from the mission info, empty when the node is unnamed or the info is unavailable
+        self.name = name
+        # util_pb2.Result value
+        self.result = result
+        self.error = error
+
+    @property
+    def finished(self):
+        return self.result in (util_pb2.RESULT_SUCCESS, util_pb2.RESULT_FAILURE, util_pb2.RESULT_ERROR)
+
+    def __str__(self):
+        s = f"{self.name or self.node_id} {util_pb2.Result.Name(self.result)}"
+        if self.error:
+            s += f" {self.error}"
+        return s
+
+
+class MissionProgress:
+    ''' the decisions of MissionFacade.play w/o the rpcs, shared by the blocking and async facades
+
+    the facade hands the first mission state to start(), then while outcome() is None it plays
+    the mission when play_due() (passing the pause time to played()), waits, and hands each
+    get_state response (fetched from lower_tick_bound) to update() for the node status changes
+    '''
+
+    def __init__(self, node_names, replay_margin=10):
+        # node id -> name from the loaded mission, used to label status changes
+        self.node_names = node_names
+        self.replay_margin = replay_margin
+        self.node_results = {}
+        self.pause_time = 0
+        self.last_tick = 0
+
+    def start(self, mission_state):
+        self.last_tick = mission_state.tick_counter
+
+    @property
+    def lower_tick_bound(self):
+        # only fetch history newer than the last seen tick
+        return self.last_tick + 1
+
+    @staticmethod
+    def _question_fails_mission(questions):
+        # fail the mission unless we can handle the question w/o user input
+        for question in questions:
+            # todo: for now we ignore any questions w/ SEVERITY_LEVEL_INFO
+            #       in the future we could either automatically act or prompt user
+            if question.severity == 1:  # SEVERITY_LEVEL_INFO
+                return False
+        return True
+
+    def outcome(self, mission_state):
+        ''' None while the mission is still running, otherwise its MissionStatus '''
+        if mission_state.status in (mission_pb2.State.STATUS_NONE, mission_pb2.State.STATUS_RUNNING):
+            if mission_state.questions and self._question_fails_mission(mission_state.questions):
+                logger.debug(f"fail mission due to spot question prompt")
+                return MissionStatus.FAILED_ON_QUESTION
+            return None
+        logger.debug(f"last mission state {mission_state}")
+        if mission_state.status == mission_pb2.State.STATUS_SUCCESS:
+            return MissionStatus.SUCCESS
+        return MissionStatus.FAILURE
+
+    def play_due(self):
+        # push the pause deadline out only when it is getting close
+        return self.pause_time - time.time() < self.replay_margin
+
+    def played(self, pause_time):
+        self.pause_time = pause_time
+
+    def update(self, mission_state):
+        ''' returns a NodeStatusChange for each node whose result changed in the mission state history '''
+        changes = []
+        for node_states_at_tick in sorted(mission_state.history, key=lambda h: h.tick_counter):
+            for node_state in node_states_at_tick.node_states:
+                if self.node_results.get(node_state.id) == node_state.result:
+                    continue
+                self.node_results[node_state.id] = node_state.result
+                changes.append(NodeStatusChange(node_states_at_tick.tick_counter, node_state.id,
+                    self.node_names.get(node_state.id, ''), node_state.result, node_state.error))
+        self.last_tick = max(self.last_tick, mission_state.tick_counter)
+        return changes
+
+
 class MissionFacade:
 
     def __init__(self, spot):
@@ -32,38 +121,75 @@ class MissionFacade:
 
     @property
     def client(self):
-        return self._spot._robot.ensure_client(bosdyn.mission.client.MissionClient.default_service_name)
+        return self._spot.clients.ensure_type('bosdyn.mission.client', 'MissionClient')
 
     @property
     def status(self):
         return self._last_status
 
-    def run(self, mission_timeout=30, disable_directed_exploration=True):
+    def _node_names(self):
+        # map of node id -> node name from the loaded mission, used to label status changes
+        from bosdyn.client.exceptions import RpcError, ResponseError
+        node_names = {}
+        try:
+            mission_info = self.client.get_info()
+        except (RpcError, ResponseError) as e:
+            logger.debug(f"unable to get mission info {e}")
+            return node_names
+        nodes = [mission_info.root]
+        while nodes:
+            node = nodes.pop()
+            node_names[node.id] = node.name
+            nodes.extend(node.children)
+        return node_names
+
+    def _play_settings(self, mission_timeout, disable_directed_exploration):
+        # returns the pause time, leases and settings for play_mission / restart_mission
+        pause_time = time.time() + mission_timeout
+        body_lease = self._spot.lease.client.lease_wallet.advance()
+        mission_settings = mission_pb2.PlaySettings(
+            disable_directed_exploration=disable_directed_exploration,
+        )
+        return pause_time, [body_lease], mission_settings
+
+    def play(self, mission_timeout=30, disable_directed_exploration=True, poll_interval=0.5, replay_margin=10,
+            restart=False):
+        ''' play the loaded mission, yielding a NodeStatusChange as each node changes result
+
+        play_mission is only re-issued (w/ an advanced lease) when the pause deadline is within
+        replay_margin seconds, and get_state only fetches history newer than the last seen tick.
+        w/ restart the loaded mission is first restarted from the beginning, this is how a mission
+        which already ran is run again w/o loading it again.
+        the outcome is available from status once the iterator is exhausted
+        '''
+        progress = MissionProgress(self._node_names(), replay_margin)
+        if restart:
+            pause_time, leases, mission_settings = self._play_settings(mission_timeout, disable_directed_exploration)
+            self.client.restart_mission(pause_time, leases, mission_settings)
+            progress.played(pause_time)
         mission_state = self.client.get_state()
         logger.debug(f"initial mission state {mission_state}")
-        while mission_state.status in (mission_pb2.State.STATUS_NONE, mission_pb2.State.STATUS_RUNNING):
+        progress.start(mission_state)
+        outcome = progress.outcome(mission_state)
+        while outcome is None:
             self._last_status = MissionStatus.RUNNING
-            if mission_state.questions:
-                # fail the mission unless we can handle the question w/o user input
-                question_fails_mission = True
-                for question in mission_state.questions:
-                    # todo: for now we ignore any questions w/ SEVERITY_LEVEL_INFO
-                    #       in the future we could either automatically act or prompt user
-                    if question.severity == 1:  # SEVERITY_LEVEL_INFO
-                        question_fails_mission = False
-                if question_fails_mission:
-                    logger.debug(f"fail mission due to spot question prompt")
-                    return MissionStatus.FAILED_ON_QUESTION
-            local_pause_time = time.time() + mission_timeout
-            body_lease = self._spot.lease.client.lease_wallet.advance()
-            mission_settings = mission_pb2.PlaySettings(
-                disable_directed_exploration=disable_directed_exploration,
-            )
-            self.client.play_mission(local_pause_time, [body_lease], mission_settings)
-            time.sleep(1)
-            mission_state = self.client.get_state()
-        logger.debug(f"last mission state {mission_state}")
-        if mission_state.status == mission_pb2.State.STATUS_SUCCESS:
-            return MissionStatus.SUCCESS
-        else:
-            return MissionStatus.FAILURE
+            if progress.play_due():
+                pause_time, leases, mission_settings = self._play_settings(mission_timeout, disable_directed_exploration)
+                self.client.play_mission(pause_time, leases, mission_settings)
+                progress.played(pause_time)
+            time.sleep(poll_interval)
+            mission_state = self.client.get_state(lower_tick_bound=progress.lower_tick_bound)
+            yield from progress.update(mission_state)
+            outcome = progress.outcome(mission_state)
+        self._last_status = outcome
+
+    def run(self, mission_timeout=30, disable_directed_exploration=True, on_node_status=None, restart=False):
+        ''' play the loaded mission until it completes, returns a MissionStatus
+
+        on_node_status, when given, is called w/ each NodeStatusChange
+        '''
+        for node_status_change in self.play(mission_timeout, disable_directed_exploration, restart=restart):
+            logger.debug(f"mission node {node_status_change}")
+            if on_node_status is not None:
+                on_node_status(node_status_change)
+        return self._last_status
@@ -1,5 +1,4 @@
 import logging
-from bosdyn.client.power import PowerClient
 from bosdyn.api.robot_state_pb2 import PowerState
 
 logger = logging.getLogger(__name__)
@@ -21,19 +20,28 @@ class PowerFacade:
 
     @property
     def client(self):
-        return self._spot._robot.ensure_client(PowerClient.default_service_name)
+        return self._spot.clients.ensure_type('bosdyn.client.power', 'PowerClient')
+
+    def _robot_state(self):
+        # share a recent robot state w/ the other facades rather than query the robot again
+        return self._spot.robot_state.get(max_age=self._spot.robot_state.shared_max_age)
 
     @property
     def status(self):
-        power_state = self._spot.robot_state.client.get_robot_state().power_state
-        if power_state.motor_power_state == PowerState.STATE_ON:
+        return self.status_from(self._robot_state())
+
+    def status_from(self, robot_state):
+        # status from an already fetched robot state, avoids another rpc
+        if robot_state.power_state.motor_power_state == PowerState.STATE_ON:
             return PowerStatus.ON
         return PowerStatus.OFF
 
     @property
     def battery(self):
-        # returns percentage as a string, XX%
-        robot_state = self._spot.robot_state.get()
+        return self.battery_from(self._robot_state())
+
+    def battery_from(self, robot_state):
+        # returns percentage as an int
         if len(robot_state.battery_states) > 0:
             return int(robot_state.battery_states[0].charge_percentage.value)
         return 0
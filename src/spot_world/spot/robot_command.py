@@ -1,5 +1,4 @@
 import logging
-from bosdyn.client.robot_command import RobotCommandClient, RobotCommandBuilder
 
 logger = logging.getLogger(__name__)
 
@@ -15,7 +14,7 @@ class RobotCommandFacade:
 
     @property
     def client(self):
-        return self._spot._robot.ensure_client(RobotCommandClient.default_service_name)
+        return self._spot.clients.ensure_type('bosdyn.client.robot_command', 'RobotCommandClient')
 
     def _try_grpc(self, desc, thunk):
         try:
@@ -32,7 +31,9 @@ class RobotCommandFacade:
         self._try_grpc(desc, _start_command)
 
     def stand(self):
+        from bosdyn.client.robot_command import RobotCommandBuilder
         self._start_robot_command('stand', RobotCommandBuilder.synchro_stand_command())
 
     def sit(self):
+        from bosdyn.client.robot_command import RobotCommandBuilder
         self._start_robot_command('sit', RobotCommandBuilder.synchro_sit_command())
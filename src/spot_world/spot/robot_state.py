@@ -1,5 +1,7 @@
 import logging
-from bosdyn.client.robot_state import RobotStateClient
+import time
+import threading
+from spot_world.spot.rpc_stats import background
 
 logger = logging.getLogger(__name__)
 
@@ -8,10 +10,106 @@ class RobotStateFacade:
 
     def __init__(self, spot):
         self._spot = spot
+        # latest robot state and the time.monotonic() it was received
+        self._state = None
+        self._state_time = None
+        self._lock = threading.Lock()
+        # list of (callback, fields) called when any of the fields change
+        self._subscribers = []
+        self._poller = None
+        self._poller_stop = threading.Event()
+        # how old a state the other facades will accept instead of querying the robot
+        self.shared_max_age = 0.5
 
     @property
     def client(self):
-        return self._spot._robot.ensure_client(RobotStateClient.default_service_name)
+        return self._spot.clients.ensure_type('bosdyn.client.robot_state', 'RobotStateClient')
 
-    def get(self):
-        return self.client.get_robot_state()
+    def get(self, max_age=0):
+        ''' returns a robot state no older than max_age seconds, 0 always queries the robot '''
+        if max_age:
+            state = self.cached(max_age)
+            if state is not None:
+                return state
+        return self.refresh()
+
+    def cached(self, max_age):
+        ''' returns the cached robot state when it is no older than max_age seconds, otherwise None '''
+        with self._lock:
+            state, state_time = self._state, self._state_time
+        if state is not None and time.monotonic() - state_time <= max_age:
+            return state
+        return None
+
+    @property
+    def age(self):
+        # seconds since the cached state was received, None when there is none
+        if self._state_time is None:
+            return None
+        return time.monotonic() - self._state_time
+
+    def refresh(self):
+        return self.update(self.client.get_robot_state())
+
+    def update(self, state):
+        # record a robot state fetched outside of this facade, e.g. by the async facades
+        with self._lock:
+            previous_state = self._state
+            self._state = state
+            self._state_time = time.monotonic()
+        self._notify(previous_state, state)
+        return state
+
+    def subscribe(self, callback, fields=None):
+        ''' call callback(robot_state, changed_fields) when any of fields change
+
+        fields are top level RobotState field names like 'power_state' or 'battery_states',
+        None subscribes to every field
+        '''
+        self._subscribers.append((callback, fields))
+
+    def unsubscribe(self, callback):
+        self._subscribers = [(c, f) for c, f in self._subscribers if c != callback]
+
+    def _notify(self, previous_state, state):
+        for callback, fields in list(self._subscribers):
+            if fields is None:
+                fields = [field.name for field in state.DESCRIPTOR.fields]
+            changed_fields = [
+                field for field in fields
+                if previous_state is None or getattr(previous_state, field) != getattr(state, field)
+            ]
+            if not changed_fields:
+                continue
+            try:
+                callback(state, changed_fields)
+            except Exception as e:
+                logger.warning(f"robot state subscriber {callback} failed: {e}")
+
+    @property
+    def polling(self):
+        return self._poller is not None and self._poller.is_alive()
+
+    def start(self, rate_hz=2.0):
+        ''' refresh the robot state from a background thread rate_hz times a second '''
+        if self.polling:
+            return
+        self._poller_stop.clear()
+        self._poller = threading.Thread(target=background('robot state')(self._poll), args=(1.0 / rate_hz,),
+            daemon=True)
+        self._poller.start()
+
+    def stop(self):
+        self._poller_stop.set()
+        if self._poller is not None:
+            self._poller.join()
+            self._poller = None
+
+    def _poll(self, period):
+        while not self._poller_stop.is_set():
+            started = time.monotonic()
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.debug(f"robot state poll failed: {e}")
+            self._poller_stop.wait(max(0.0, period - (time.monotonic() - started)))
@@ -0,0 +1,131 @@
+import logging
+import heapq
+import math
+from bosdyn.api.graph_nav import map_pb2
+from spot_world.spot.geometry import MapGeometry
+
+logger = logging.getLogger(__name__)
+
+
+class Router:
+    ''' weighted shortest path queries over the waypoints and edges of a graph '''
+
+    def __init__(self, geometry: MapGeometry):
+        # waypoints are referred to by index internally, ids are only used at the edges of the api
+        self._waypoint_ids = geometry.waypoint_ids
+        self._index_by_id = geometry.index_by_id
+        # adjacency is a list (by waypoint index) of (neighbor index, edge length) tuples
+        self._neighbors = [[] for _ in self._waypoint_ids]
+        # positions are used for the a* heuristic, None for waypoints we can't place
+        self._positions = [geometry.position(i) for i in range(len(geometry))]
+        # the straight line distance is scaled by the smallest ratio of edge length to straight line
+        # distance, so it never overestimates even where loop closures make edges shorter than the
+        # positions suggest. w/ unplaced waypoints there is no bound, and the search is dijkstra's
+        self._heuristic_scale = 0.0 if None in self._positions else 1.0
+        for from_index, to_index, length in geometry.edges():
+            self._neighbors[from_index].append((to_index, length))
+            self._neighbors[to_index].append((from_index, length))
+            if self._heuristic_scale > 0.0:
+                straight = math.dist(self._positions[from_index], self._positions[to_index])
+                if straight > 0.0:
+                    self._heuristic_scale = min(self._heuristic_scale, length / straight)
+
+    @classmethod
+    def from_graph(cls, graph: map_pb2.Graph):
+        return cls(MapGeometry.from_graph(graph))
+
+    def _heuristic(self, index, goal_index):
+        # scaled straight line distance, a lower bound on the travel distance which is consistent
+        # (no edge is shorter than the drop in heuristic along it), so settled waypoints are final
+        if self._heuristic_scale == 0.0:
+            return 0.0
+        return self._heuristic_scale * math.dist(self._positions[index], self._positions[goal_index])
+
+    def shortest_path(self, start_waypoint_id, end_waypoint_id):
+        ''' returns list of waypoint ids for shortest path between start and end '''
+        start = self._index_by_id.get(start_waypoint_id)
+        goal = self._index_by_id.get(end_waypoint_id)
+        if start is None or goal is None:
+            return []
+        # a* search, previous holds the best known predecessor of each waypoint
+        distances = {start: 0.0}
+        previous = {start: None}
+        queue = [(self._heuristic(start, goal), start)]
+        settled = set()
+        while queue:
+            _, current = heapq.heappop(queue)
+            if current == goal:
+                break
+            if current in settled:
+                continue
+            settled.add(current)
+            for neighbor, length in self._neighbors[current]:
+                distance = distances[current] + length
+                if distance < distances.get(neighbor, math.inf):
+                    distances[neighbor] = distance
+                    previous[neighbor] = current
+                    heapq.heappush(queue, (distance + self._heuristic(neighbor, goal), neighbor))
+        if goal not in previous:
+            return []
+        path, current = [], goal
+        while current is not None:
+            path.append(self._waypoint_ids[current])
+            current = previous[current]
+        path.reverse()
+        return path
+
+    def distances_from(self, start_waypoint_id, end_waypoint_ids=None):
+        ''' returns dict of waypoint id -> travel distance from start, unreachable waypoints are left out '''
+        start = self._index_by_id.get(start_waypoint_id)
+        if start is None:
+            return {}
+        # when targets are given we can stop once all of them are settled
+        remaining = None
+        if end_waypoint_ids is not None:
+            remaining = {self._index_by_id[i] for i in end_waypoint_ids if i in self._index_by_id}
+        # dijkstra search
+        distances = {start: 0.0}
+        queue = [(0.0, start)]
+        settled = set()
+        while queue:
+            distance, current = heapq.heappop(queue)
+            if current in settled:
+                continue
+            settled.add(current)
+            if remaining is not None:
+                remaining.discard(current)
+                if not remaining:
+                    break
+            for neighbor, length in self._neighbors[current]:
+                neighbor_distance = distance + length
+                if neighbor_distance < distances.get(neighbor, math.inf):
+                    distances[neighbor] = neighbor_distance
+                    heapq.heappush(queue, (neighbor_distance, neighbor))
+        if end_waypoint_ids is None:
+            return {self._waypoint_ids[i]: distances[i] for i in settled}
+        return {
+            waypoint_id: distances[self._index_by_id[waypoint_id]]
+            for waypoint_id in end_waypoint_ids
+            if self._index_by_id.get(waypoint_id) in settled
+        }
+
+    def distance_matrix(self, start_waypoint_ids, end_waypoint_ids):
+        ''' returns dict of start id -> dict of end id -> travel distance '''
+        end_waypoint_ids = list(end_waypoint_ids)
+        return {
+            start_waypoint_id: self.distances_from(start_waypoint_id, end_waypoint_ids)
+            for start_waypoint_id in start_waypoint_ids
+        }
+
+    def path_length(self, waypoint_ids):
+        ''' returns the length of a path of waypoint ids, inf when consecutive waypoints aren't connected '''
+        length = 0.0
+        for from_id, to_id in zip(waypoint_ids, waypoint_ids[1:]):
+            from_index, to_index = self._index_by_id.get(from_id), self._index_by_id.get(to_id)
+            if from_index is None or to_index is None:
+                return math.inf
+            edge_lengths = [l for neighbor, l in self._neighbors[from_index] if neighbor == to_index]
+            if not edge_lengths:
+                return math.inf
+            length += min(edge_lengths)
+        return length
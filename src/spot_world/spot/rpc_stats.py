@@ -0,0 +1,434 @@
+import logging
+import time
+import json
+import bisect
+import threading
+import contextlib
+import contextvars
+import grpc
+
+logger = logging.getLogger(__name__)
+
+
+# upper bounds (seconds) of the latency histogram buckets, the last bucket is unbounded
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# rpcs made on the main thread outside of a console command
+IDLE_COMMAND = '(idle)'
+# rpcs made on other threads which aren't labelled, i.e. the sdk keepalives and time sync
+BACKGROUND_COMMAND = '(background)'
+
+# the command rpcs are attributed to. a context variable so each thread (and asyncio task) has its
+# own, and shared by every RpcStats so the robots of a fleet see the same command
+_current_command = contextvars.ContextVar('spot_world_rpc_command', default=None)
+
+
+def current_command():
+    command = _current_command.get()
+    if command is not None:
+        return command
+    return IDLE_COMMAND if threading.current_thread() is threading.main_thread() else BACKGROUND_COMMAND
+
+
+@contextlib.contextmanager
+def background(name):
+    ''' attribute the rpcs made inside the with block to the background task '(name)' '''
+    token = _current_command.set(f"({name})")
+    try:
+        yield
+    finally:
+        _current_command.reset(token)
+
+
+def submit(executor, fn, *args, **kwargs):
+    ''' executor.submit, w/ the rpcs fn makes attributed to the command which submitted it '''
+    return executor.submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+
+class RpcMethodStats:
+    ''' counts, bytes and a latency histogram for one rpc method '''
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.request_bytes = 0
+        self.response_bytes = 0
+        self.latency_sum = 0.0
+        self.latency_max = 0.0
+        # one count per bucket in LATENCY_BUCKETS plus one for anything slower
+        self.latency_buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+
+    def record(self, latency, request_bytes, response_bytes, error):
+        self.count += 1
+        if error:
+            self.errors += 1
+        self.request_bytes += request_bytes
+        self.response_bytes += response_bytes
+        self.latency_sum += latency
+        self.latency_max = max(self.latency_max, latency)
+        self.latency_buckets[bisect.bisect_left(LATENCY_BUCKETS, latency)] += 1
+
+    @property
+    def latency_mean(self):
+        return self.latency_sum / self.count if self.count else 0.0
+
+    def latency_quantile(self, quantile):
+        # upper bound of the bucket holding the quantile, the max for the unbounded bucket
+        rank = quantile * self.count
+        seen = 0
+        for bound, bucket_count in zip(LATENCY_BUCKETS, self.latency_buckets):
+            seen += bucket_count
+            if seen >= rank:
+                return min(bound, self.latency_max)
+        return self.latency_max
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'errors': self.errors,
+            'request_bytes': self.request_bytes,
+            'response_bytes': self.response_bytes,
+            'latency_sum': self.latency_sum,
+            'latency_max': self.latency_max,
+            'latency_buckets': dict(zip([str(b) for b in LATENCY_BUCKETS] + ['+Inf'], self.latency_buckets)),
+        }
+
+
+class CommandStats:
+    ''' runs and wall time of one console command, and the rpcs it made by method '''
+
+    def __init__(self):
+        self.runs = 0
+        self.seconds = 0.0
+        # full rpc method name (/package.Service/Method) -> RpcMethodStats
+        self.methods = {}
+
+    @property
+    def rpc_count(self):
+        return sum(m.count for m in self.methods.values())
+
+    def to_dict(self):
+        return {
+            'runs': self.runs,
+            'seconds': self.seconds,
+            'rpcs': {method: stats.to_dict() for method, stats in sorted(self.methods.items())},
+        }
+
+
+class RpcStats:
+    ''' records every rpc made over the instrumented channels, attributed to the running command
+
+    the command is per thread, an rpc is attributed to the command of the thread which made it.
+    work handed to an executor w/ submit() keeps the command of the thread submitting it, and
+    background threads label their rpcs w/ background()
+    '''
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # command name -> CommandStats
+        self._commands = {}
+
+    @property
+    def current_command(self):
+        return current_command()
+
+    @contextlib.contextmanager
+    def command(self, name):
+        ''' attribute the rpcs made inside the with block to the named command '''
+        token = _current_command.set(name)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            _current_command.reset(token)
+            with self._lock:
+                command_stats = self._command_stats(name)
+                command_stats.runs += 1
+                command_stats.seconds += elapsed
+
+    def _command_stats(self, name):
+        command_stats = self._commands.get(name)
+        if command_stats is None:
+            command_stats = self._commands[name] = CommandStats()
+        return command_stats
+
+    def record(self, method, latency, request_bytes=0, response_bytes=0, error=False, command=None):
+        # the command is passed when the rpc finishes on another thread than it started on
+        command = command or current_command()
+        with self._lock:
+            command_stats = self._command_stats(command)
+            method_stats = command_stats.methods.get(method)
+            if method_stats is None:
+                method_stats = command_stats.methods[method] = RpcMethodStats()
+            method_stats.record(latency, request_bytes, response_bytes, error)
+
+    def reset(self):
+        with self._lock:
+            self._commands = {}
+
+    @property
+    def commands(self):
+        ''' dict of command name -> CommandStats '''
+        with self._lock:
+            return dict(self._commands)
+
+    def instrument(self, robot):
+        ''' route the rpcs of robot through instrumented channels
+
+        wraps the channels the robot already has, clients created later for the same
+        authorities (all the spot services) pick up the wrapped channel from the robot
+        '''
+        for authority, channel in list(robot.channels_by_authority.items()):
+            if not isinstance(channel, InstrumentedChannel):
+                robot.channels_by_authority[authority] = InstrumentedChannel(channel, self)
+        for client in robot.service_clients_by_name.values():
+            channel = client._channel
+            if channel is not None and not isinstance(channel, InstrumentedChannel):
+                client.channel = InstrumentedChannel(channel, self)
+
+    def to_dict(self):
+        return {name: stats.to_dict() for name, stats in sorted(self.commands.items())}
+
+    def to_json(self):
+        return json.dumps(self.to_dict(), indent=2)
+
+    def to_prometheus(self):
+        ''' returns the stats in the prometheus text exposition format '''
+        lines = []
+
+        def _labels(**labels):
+            values = []
+            for key, value in labels.items():
+                # escape backslashes and quotes per the exposition format
+                value = str(value).replace('\\', '\\\\').replace('"', '\\"')
+                values.append(key + '="' + value + '"')
+            return '{' + ','.join(values) + '}'
+
+        def _metric(name, metric_type, help_text, samples):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            lines.extend(samples)
+
+        commands = sorted(self.commands.items())
+        rpcs = [
+            (command, method, stats)
+            for command, command_stats in commands
+            for method, stats in sorted(command_stats.methods.items())
+        ]
+
+        def _rpc_labels(command, method, **labels):
+            service, _, method_name = method.lstrip('/').partition('/')
+            return _labels(command=command, service=service, method=method_name, **labels)
+
+        _metric('spot_world_command_runs_total', 'counter', 'console command runs',
+            [f"spot_world_command_runs_total{_labels(command=c)} {s.runs}" for c, s in commands])
+        _metric('spot_world_command_seconds_total', 'counter', 'console command wall time in seconds',
+            [f"spot_world_command_seconds_total{_labels(command=c)} {s.seconds}" for c, s in commands])
+        _metric('spot_world_rpc_errors_total', 'counter', 'rpcs which raised an error',
+            [f"spot_world_rpc_errors_total{_rpc_labels(c, m)} {s.errors}" for c, m, s in rpcs])
+        _metric('spot_world_rpc_request_bytes_total', 'counter', 'serialized request bytes sent',
+            [f"spot_world_rpc_request_bytes_total{_rpc_labels(c, m)} {s.request_bytes}" for c, m, s in rpcs])
+        _metric('spot_world_rpc_response_bytes_total', 'counter', 'serialized response bytes received',
+            [f"spot_world_rpc_response_bytes_total{_rpc_labels(c, m)} {s.response_bytes}" for c, m, s in rpcs])
+        samples = []
+        for command, method, stats in rpcs:
+            cumulative = 0
+            for bound, bucket_count in zip(list(LATENCY_BUCKETS) + ['+Inf'], stats.latency_buckets):
+                cumulative += bucket_count
+                samples.append(
+                    f"spot_world_rpc_latency_seconds_bucket{_rpc_labels(command, method, le=bound)} {cumulative}")
+            samples.append(f"spot_world_rpc_latency_seconds_sum{_rpc_labels(command, method)} {stats.latency_sum}")
+            samples.append(f"spot_world_rpc_latency_seconds_count{_rpc_labels(command, method)} {stats.count}")
+        _metric('spot_world_rpc_latency_seconds', 'histogram', 'rpc latency in seconds', samples)
+        return '\n'.join(lines) + '\n'
+
+
+def _byte_size(message):
+    try:
+        return message.ByteSize()
+    except AttributeError:
+        return 0
+
+
+class _TimedResponses:
+    ''' iterates a streamed response, recording the rpc once the stream ends '''
+
+    def __init__(self, responses, on_done):
+        self._responses = responses
+        self._on_done = on_done
+        self._response_bytes = 0
+        self._done = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        try:
+            response = next(self._responses)
+        except StopIteration:
+            self._finish(False)
+            raise
+        except Exception:
+            self._finish(True)
+            raise
+        self._response_bytes += _byte_size(response)
+        return response
+
+    def _finish(self, error):
+        if not self._done:
+            self._done = True
+            self._on_done(self._response_bytes, error)
+
+    def __getattr__(self, name):
+        # cancel(), code() etc. of the underlying call
+        return getattr(self._responses, name)
+
+
+class _TimedRequests:
+    ''' iterates a streamed request, counting the bytes sent '''
+
+    def __init__(self, requests):
+        self._requests = iter(requests)
+        self.request_bytes = 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        request = next(self._requests)
+        self.request_bytes += _byte_size(request)
+        return request
+
+
+class _TimedCall:
+    ''' common timing for the multicallables, keeps _method so sdk client logging still works '''
+
+    def __init__(self, multicallable, method, stats):
+        self._multicallable = multicallable
+        self._method = multicallable._method if hasattr(multicallable, '_method') else method
+        self._method_name = method.decode() if isinstance(method, bytes) else method
+        self._stats = stats
+
+    def _record(self, started, request_bytes, response_bytes, error, command=None):
+        self._stats.record(self._method_name, time.perf_counter() - started, request_bytes, response_bytes, error,
+            command)
+
+    def _blocking(self, call, request_bytes, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            result = call(*args, **kwargs)
+        except Exception:
+            self._record(started, request_bytes(), 0, True)
+            raise
+        response = result[0] if isinstance(result, tuple) else result
+        self._record(started, request_bytes(), _byte_size(response), False)
+        return result
+
+    def _future(self, future, started, request_bytes):
+        # the future completes on a grpc thread, keep the command of the caller
+        command = current_command()
+
+        def _done(f):
+            try:
+                response = f.result()
+            except Exception:
+                self._record(started, request_bytes(), 0, True, command)
+            else:
+                self._record(started, request_bytes(), _byte_size(response), False, command)
+        future.add_done_callback(_done)
+        return future
+
+    def _streamed(self, responses, started, request_bytes):
+        command = current_command()
+        return _TimedResponses(responses,
+            lambda response_bytes, error: self._record(started, request_bytes(), response_bytes, error, command))
+
+
+class _TimedUnaryUnary(_TimedCall, grpc.UnaryUnaryMultiCallable):
+
+    def __call__(self, request, *args, **kwargs):
+        return self._blocking(self._multicallable, lambda: _byte_size(request), request, *args, **kwargs)
+
+    def with_call(self, request, *args, **kwargs):
+        return self._blocking(self._multicallable.with_call, lambda: _byte_size(request), request, *args, **kwargs)
+
+    def future(self, request, *args, **kwargs):
+        started = time.perf_counter()
+        return self._future(self._multicallable.future(request, *args, **kwargs), started,
+            lambda: _byte_size(request))
+
+
+class _TimedUnaryStream(_TimedCall, grpc.UnaryStreamMultiCallable):
+
+    def __call__(self, request, *args, **kwargs):
+        started = time.perf_counter()
+        return self._streamed(self._multicallable(request, *args, **kwargs), started,
+            lambda: _byte_size(request))
+
+
+class _TimedStreamUnary(_TimedCall, grpc.StreamUnaryMultiCallable):
+
+    def __call__(self, request_iterator, *args, **kwargs):
+        requests = _TimedRequests(request_iterator)
+        return self._blocking(self._multicallable, lambda: requests.request_bytes, requests, *args, **kwargs)
+
+    def with_call(self, request_iterator, *args, **kwargs):
+        requests = _TimedRequests(request_iterator)
+        return self._blocking(self._multicallable.with_call, lambda: requests.request_bytes,
+            requests, *args, **kwargs)
+
+    def future(self, request_iterator, *args, **kwargs):
+        started = time.perf_counter()
+        requests = _TimedRequests(request_iterator)
+        return self._future(self._multicallable.future(requests, *args, **kwargs), started,
+            lambda: requests.request_bytes)
+
+
+class _TimedStreamStream(_TimedCall, grpc.StreamStreamMultiCallable):
+
+    def __call__(self, request_iterator, *args, **kwargs):
+        started = time.perf_counter()
+        requests = _TimedRequests(request_iterator)
+        return self._streamed(self._multicallable(requests, *args, **kwargs), started,
+            lambda: requests.request_bytes)
+
+
+class InstrumentedChannel(grpc.Channel):
+    ''' grpc channel recording the rpcs made over the wrapped channel in an RpcStats
+
+    grpc.intercept_channel isn't used as its multicallables keep the method name as str,
+    and the sdk clients expect bytes when they log
+    '''
+
+    def __init__(self, channel, stats: RpcStats):
+        self._channel = channel
+        self._stats = stats
+
+    def unary_unary(self, method, *args, **kwargs):
+        return _TimedUnaryUnary(self._channel.unary_unary(method, *args, **kwargs), method, self._stats)
+
+    def unary_stream(self, method, *args, **kwargs):
+        return _TimedUnaryStream(self._channel.unary_stream(method, *args, **kwargs), method, self._stats)
+
+    def stream_unary(self, method, *args, **kwargs):
+        return _TimedStreamUnary(self._channel.stream_unary(method, *args, **kwargs), method, self._stats)
+
+    def stream_stream(self, method, *args, **kwargs):
+        return _TimedStreamStream(self._channel.stream_stream(method, *args, **kwargs), method, self._stats)
+
+    def subscribe(self, callback, try_to_connect=False):
+        self._channel.subscribe(callback, try_to_connect=try_to_connect)
+
+    def unsubscribe(self, callback):
+        self._channel.unsubscribe(callback)
+
+    def close(self):
+        self._channel.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
@@ -0,0 +1,343 @@
+import logging
+import datetime
+import itertools
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from spot_world.spot.autowalk import MissionCatalog
+from spot_world.spot.graph_nav import Map
+from spot_world.spot.mission import MissionStatus
+from spot_world.spot.charging import ChargeManager
+from spot_world.spot.rpc_stats import background
+
+logger = logging.getLogger(__name__)
+
+
+class SchedulerError(Exception):
+    pass
+
+
+class JobStatus:
+    QUEUED = 'QUEUED'
+    RUNNING = 'RUNNING'
+    SUCCESS = 'SUCCESS'
+    FAILURE = 'FAILURE'
+    CANCELLED = 'CANCELLED'
+
+
+class Job:
+    ''' a mission queued on the scheduler
+
+    higher priority jobs run first, ties run in the order they were submitted. window is a daily
+    (start, end) pair of datetime.time the job may start within, it wraps past midnight when end is
+    before start. the job only starts once the battery is at least min_battery percent
+    '''
+
+    def __init__(self, job_id, mission_name, priority=0, window=None, min_battery=None):
+        self.id = job_id
+        self.mission_name = mission_name
+        self.priority = priority
+        self.window = window
+        self.min_battery = min_battery
+        self.status = JobStatus.QUEUED
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+        self.error = ''
+
+    def in_window(self, now: datetime.datetime):
+        if self.window is None:
+            return True
+        start, end = self.window
+        now = now.time()
+        if start <= end:
+            return start <= now < end
+        return now >= start or now < end
+
+    @property
+    def done(self):
+        return self.status in (JobStatus.SUCCESS, JobStatus.FAILURE, JobStatus.CANCELLED)
+
+    @property
+    def duration(self):
+        if self.started is None:
+            return None
+        return (self.finished or time.time()) - self.started
+
+    def __str__(self):
+        s = f"{self.id} {self.mission_name} {self.status} priority {self.priority}"
+        if self.window is not None:
+            s += f" window {self.window[0]:%H:%M}-{self.window[1]:%H:%M}"
+        if self.min_battery is not None:
+            s += f" battery >= {self.min_battery}%"
+        if self.duration is not None:
+            s += f" ({self.duration:.0f}s)"
+        if self.error:
+            s += f" {self.error}"
+        return s
+
+
+class MissionScheduler:
+    ''' runs a queue of missions on the robot from a background thread
+
+    the next job is parsed and validated against the map while the current mission runs, so it is
+    uploaded as soon as the robot is free. before each job the charger predicts whether the battery
+    covers the mission and the walk back to the dock, and if not the robot charges first
+    '''
+
+    def __init__(self, spot, catalog: MissionCatalog, map: Map, charger: ChargeManager = None, poll_interval=1.0):
+        self._spot = spot
+        self.catalog = catalog
+        self.map = map
+        # w/o a charger (no known dock) jobs run until the queue is empty, whatever the battery
+        self.charger = charger
+        # a charger created here for the dock the robot started on, closed when the worker stops
+        self._own_charger = None
+        self.poll_interval = poll_interval
+        self._jobs = []
+        self._job_ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._worker = None
+        # prepares the next mission while the current one runs
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='scheduler-prepare')
+        # job id -> future of the prepared Mission
+        self._prepared = {}
+        self._started = None
+        self._stopped = None
+        self._charging_seconds = 0.0
+        # mission name -> seconds of the last run, to predict the battery the next run needs
+        self._mission_seconds = {}
+        # called w/ (job, message) for job progress, from the scheduler thread
+        self._listeners = []
+
+    def subscribe(self, callback):
+        self._listeners.append(callback)
+
+    def unsubscribe(self, callback):
+        self._listeners = [c for c in self._listeners if c != callback]
+
+    def _notify(self, job, message):
+        logger.debug(f"job {job.id if job else '-'}: {message}")
+        for callback in list(self._listeners):
+            try:
+                callback(job, message)
+            except Exception as e:
+                logger.warning(f"scheduler listener {callback} failed: {e}")
+
+    def submit(self, mission_name, priority=0, window=None, min_battery=None):
+        ''' queue a mission by its catalog name, returns the Job '''
+        if mission_name not in self.catalog.names:
+            raise SchedulerError(f"mission not found {mission_name}")
+        with self._lock:
+            job = Job(next(self._job_ids), mission_name, priority, window, min_battery)
+            self._jobs.append(job)
+        self._wake.set()
+        return job
+
+    def cancel(self, job_id):
+        ''' cancel a queued job, a running job is left to finish '''
+        with self._lock:
+            for job in self._jobs:
+                if job.id == job_id:
+                    if job.status != JobStatus.QUEUED:
+                        raise SchedulerError(f"job {job_id} is {job.status}")
+                    job.status = JobStatus.CANCELLED
+                    future = self._prepared.pop(job_id, None)
+                    if future is not None:
+                        future.cancel()
+                    return job
+        raise SchedulerError(f"no job {job_id}")
+
+    @property
+    def jobs(self):
+        with self._lock:
+            return list(self._jobs)
+
+    @property
+    def pending(self):
+        ''' queued jobs in the order they would run if they could all start now '''
+        with self._lock:
+            queued = [job for job in self._jobs if job.status == JobStatus.QUEUED]
+        return sorted(queued, key=lambda job: (-job.priority, job.id))
+
+    def _next_job(self, battery, exclude=None):
+        # highest priority queued job which can start now, None when none can
+        now = datetime.datetime.now()
+        for job in self.pending:
+            if job is exclude or not job.in_window(now):
+                continue
+            if job.min_battery is not None and battery < job.min_battery and self.charger is None:
+                # can't charge up to the job's threshold w/o a dock
+                continue
+            return job
+        return None
+
+    def _prepare(self, job):
+        ''' the job's mission, parsed and checked against the map '''
+        mission = self.catalog.get(job.mission_name)
+        # docking is handled by the scheduler between jobs
+        mission.skip_docking()
+        missing = [i for i in mission.target_waypoint_ids if i not in self.map.geometry.index_by_id]
+        if missing:
+            raise SchedulerError(f"mission targets waypoints not on the map {', '.join(sorted(set(missing)))}")
+        if math.isinf(self.catalog.info(job.mission_name, self.map)['path_length']):
+            raise SchedulerError('mission targets are not connected on the map')
+        return mission
+
+    def _prepare_async(self, job):
+        with self._lock:
+            future = self._prepared.get(job.id)
+            if future is None:
+                future = self._prepared[job.id] = self._executor.submit(self._prepare, job)
+        return future
+
+    @property
+    def running(self):
+        return self._worker is not None and self._worker.is_alive()
+
+    def start(self):
+        if self.running:
+            if self._stop.is_set():
+                raise SchedulerError('the scheduler is stopping once the current mission finishes')
+            return
+        self._stop.clear()
+        self._started = time.time()
+        self._stopped = None
+        # the rpcs of the jobs are attributed to the scheduler, not to the console command running alongside
+        self._worker = threading.Thread(target=background('scheduler')(self._run), name='scheduler', daemon=True)
+        self._worker.start()
+
+    def stop(self, wait=True):
+        ''' stop once the current job is finished '''
+        self._stop.set()
+        self._wake.set()
+        if wait and self._worker is not None:
+            self._worker.join()
+            self._worker = None
+
+    def _run(self):
+        try:
+            # charge at the dock the robot starts on when not given one
+            dock_id = self._spot.docking.get_dock_id()
+            if self.charger is None and dock_id is not None:
+                self.charger = self._own_charger = ChargeManager(self._spot, self.map, dock_id)
+            while not self._stop.is_set():
+                battery = self._spot.power.battery
+                job = self._next_job(battery)
+                if job is None:
+                    self._wake.wait(self.poll_interval)
+                    self._wake.clear()
+                    continue
+                self._run_job(job, battery)
+        except Exception as e:
+            logger.exception('scheduler stopped')
+            self._notify(None, f"scheduler stopped: {e}")
+        finally:
+            if self._own_charger is not None:
+                # stops sampling the battery drain, the next start creates another if needed
+                self._own_charger.close()
+                if self.charger is self._own_charger:
+                    self.charger = None
+                self._own_charger = None
+            self._stopped = time.time()
+
+    def _expected_seconds(self, job, mission):
+        # the last run of the mission, or its walking time when it hasn't run yet
+        seconds = self._mission_seconds.get(job.mission_name)
+        if seconds is None:
+            seconds = self.catalog.info(job.mission_name, self.map)['path_length'] / self.charger.expected_speed
+        return seconds
+
+    def _charge_to(self, job):
+        return max(job.min_battery or 0, self.charger.resume_at)
+
+    def _needs_charge(self, job, mission, battery):
+        if self.charger is None:
+            return False
+        if job.min_battery is not None and battery < job.min_battery:
+            return True
+        # a mission longer than a charge lasts runs once charged, rather than waiting on the dock forever
+        if battery >= self._charge_to(job) and self._spot.docking.is_docked():
+            return False
+        end_waypoint_id = mission.target_waypoint_ids[-1] if mission.target_waypoint_ids else None
+        return self.charger.needs_charge(self._expected_seconds(job, mission), end_waypoint_id)
+
+    def _run_job(self, job, battery):
+        try:
+            mission = self._prepare_async(job).result()
+        except Exception as e:
+            with self._lock:
+                job.started = time.time()
+            self._finish(job, JobStatus.FAILURE, str(e))
+            return
+        if self._needs_charge(job, mission, battery):
+            self._charge(self._charge_to(job))
+            # another job may be due by the time the robot is charged
+            return
+        with self._lock:
+            if job.status != JobStatus.QUEUED:
+                return
+            job.status = JobStatus.RUNNING
+            job.started = time.time()
+        try:
+            if self._spot.docking.is_docked():
+                self._spot.docking.undock()
+                self._spot.graph_nav.localize_to_fiducial()
+            uploaded = self._spot.autowalk.upload_mission(mission, reuse=True)
+            self._notify(job, f"started {job.mission_name}")
+            # validate the following job while this one runs
+            following = self._next_job(self._spot.power.battery, exclude=job)
+            if following is not None:
+                self._prepare_async(following)
+            status = self._spot.mission.run(restart=not uploaded)
+        except Exception as e:
+            self._finish(job, JobStatus.FAILURE, str(e))
+            return
+        if status == MissionStatus.SUCCESS:
+            self._mission_seconds[job.mission_name] = job.duration
+            self._finish(job, JobStatus.SUCCESS)
+        else:
+            self._finish(job, JobStatus.FAILURE, status)
+
+    def _finish(self, job, status, error=''):
+        with self._lock:
+            job.status = status
+            job.error = error
+            job.finished = time.time()
+            self._prepared.pop(job.id, None)
+        self._notify(job, f"finished {job.mission_name} {status} {error}".strip())
+
+    def _charge(self, charge_to):
+        self._notify(None, f"battery at {self._spot.power.battery}%, docking to charge to {charge_to}%")
+        self._charging_seconds += self.charger.charge(charge_to, stop=self._stop)
+        self._notify(None, f"charged to {self._spot.power.battery}%")
+
+    def stats(self):
+        ''' dict of job counts and throughput since the scheduler was started '''
+        jobs = self.jobs
+        counts = {status: 0 for status in (JobStatus.QUEUED, JobStatus.RUNNING, JobStatus.SUCCESS,
+            JobStatus.FAILURE, JobStatus.CANCELLED)}
+        for job in jobs:
+            counts[job.status] += 1
+        elapsed = 0.0
+        if self._started is not None:
+            elapsed = (self._stopped or time.time()) - self._started
+        finished = [job for job in jobs if job.status in (JobStatus.SUCCESS, JobStatus.FAILURE)]
+        mission_seconds = sum(job.duration for job in finished)
+        return {
+            'running': self.running,
+            'jobs': counts,
+            'elapsed_seconds': elapsed,
+            'mission_seconds': mission_seconds,
+            'charging_seconds': self._charging_seconds,
+            'missions_per_hour': counts[JobStatus.SUCCESS] / elapsed * 3600 if elapsed else 0.0,
+            'mean_mission_seconds': mission_seconds / len(finished) if finished else None,
+        }
+
+    def close(self, wait=True):
+        ''' stop, and release the thread preparing missions. w/o wait a running mission is left to finish '''
+        self.stop(wait=wait)
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -1,6 +1,4 @@
 import logging
-import bosdyn.client
-import bosdyn.mission.client
 from spot_world.spot.power import PowerFacade
 from spot_world.spot.robot_state import RobotStateFacade
 from spot_world.spot.estop import EstopFacade
@@ -11,14 +9,22 @@ from spot_world.spot.graph_nav import GraphNavFacade
 from spot_world.spot.world_object import WorldObjectFacade
 from spot_world.spot.mission import MissionFacade
 from spot_world.spot.autowalk import AutowalkFacade
+from spot_world.spot.rpc_stats import RpcStats
+from spot_world.spot.clients import ClientRegistry
+from spot_world.spot.timing import PhaseTimer, no_phase
 
 logger = logging.getLogger(__name__)
 
 
 class Spot:
 
-    def __init__(self, robot):
+    def __init__(self, robot, rpc_stats: RpcStats = None):
         self._robot = robot
+        # every rpc to the robot is counted and timed, robots can share the stats
+        self.rpc_stats = rpc_stats or RpcStats()
+        self.rpc_stats.instrument(robot)
+        # the facades get their clients from here, so they are created once
+        self.clients = ClientRegistry(robot)
         self.robot_state = RobotStateFacade(self)
         self.estop = EstopFacade(self)
         self.lease = LeaseFacade(self)
@@ -41,12 +47,48 @@ class Spot:
 
     # figure out where to get serial and nickname
 
-    @classmethod
-    def connect(cls, hostname, username, password):
-        sdk = bosdyn.client.create_standard_sdk('spot-world', [
+    @staticmethod
+    def create_sdk():
+        # the sdk is the bulk of our import time, so the facades import their bosdyn.client modules
+        # when first used and the console can parse the map on one thread while this imports on another
+        import bosdyn.client
+        import bosdyn.mission.client
+        return bosdyn.client.create_standard_sdk('spot-world', [
             bosdyn.mission.client.MissionClient
         ])
-        robot = sdk.create_robot(hostname)
-        robot.authenticate(username, password)
-        robot.time_sync.wait_for_sync()
-        return cls(robot)
+
+    @staticmethod
+    def client_service_names():
+        ''' service names of the clients the facades use '''
+        from bosdyn.client.robot_state import RobotStateClient
+        from bosdyn.client.estop import EstopClient
+        from bosdyn.client.lease import LeaseClient
+        from bosdyn.client.power import PowerClient
+        from bosdyn.client.robot_command import RobotCommandClient
+        from bosdyn.client.docking import DockingClient
+        from bosdyn.client.graph_nav import GraphNavClient
+        from bosdyn.client.world_object import WorldObjectClient
+        from bosdyn.client.autowalk import AutowalkClient
+        from bosdyn.mission.client import MissionClient
+        return [client.default_service_name for client in (
+            RobotStateClient, EstopClient, LeaseClient, PowerClient, RobotCommandClient, DockingClient,
+            GraphNavClient, WorldObjectClient, AutowalkClient, MissionClient,
+        )]
+
+    @classmethod
+    def connect(cls, hostname, username, password, sdk=None, timer: PhaseTimer = None, rpc_stats: RpcStats = None):
+        # an sdk can be passed in to share it, or to provide a robot it has already created
+        phase = timer.phase if timer is not None else no_phase
+        with phase('sdk'):
+            if sdk is None:
+                sdk = cls.create_sdk()
+            robot = sdk.create_robot(hostname)
+        with phase('authenticate'):
+            robot.authenticate(username, password)
+        with phase('time sync'):
+            robot.time_sync.wait_for_sync()
+        spot = cls(robot, rpc_stats)
+        # after instrumenting, so the warmed channels are the instrumented ones
+        with phase('clients'):
+            spot.clients.warm(cls.client_service_names())
+        return spot
@@ -0,0 +1,533 @@
+import logging
+import pathlib
+import os
+import bisect
+import queue
+import struct
+import threading
+import time
+import zlib
+from bosdyn.api import robot_state_pb2
+from bosdyn.api.graph_nav import graph_nav_pb2
+from bosdyn.api.mission import mission_pb2
+from spot_world.spot.rpc_stats import background
+
+logger = logging.getLogger(__name__)
+
+
+class TelemetryError(Exception):
+    pass
+
+
+class TelemetryChannel:
+    ROBOT_STATE = 'robot_state'
+    LOCALIZATION = 'localization'
+    MISSION_STATE = 'mission_state'
+    # recorded as the graph nav facade receives it, rather than sampled
+    NAVIGATION_FEEDBACK = 'navigation_feedback'
+
+
+# channel -> (id written to the log, message type), the ids are part of the file format so are never reused
+_channels = {
+    TelemetryChannel.ROBOT_STATE: (1, robot_state_pb2.RobotState),
+    TelemetryChannel.LOCALIZATION: (2, graph_nav_pb2.GetLocalizationStateResponse),
+    TelemetryChannel.MISSION_STATE: (3, mission_pb2.State),
+    TelemetryChannel.NAVIGATION_FEEDBACK: (4, graph_nav_pb2.NavigationFeedbackResponse),
+}
+_channels_by_id = {channel_id: channel for channel, (channel_id, _) in _channels.items()}
+
+
+class TelemetryRecord:
+
+    __slots__ = ('timestamp', 'channel', 'data')
+
+    def __init__(self, timestamp, channel, data):
+        # time.time() the sample was received
+        self.timestamp = timestamp
+        self.channel = channel
+        # the serialized message
+        self.data = data
+
+    def parse(self):
+        message = _channels[self.channel][1]()
+        message.ParseFromString(self.data)
+        return message
+
+
+class TelemetryChunk:
+    ''' index entry of a chunk, the records between first and last (timestamps) compressed together '''
+
+    __slots__ = ('offset', 'length', 'count', 'first', 'last')
+
+    def __init__(self, offset, length, count, first, last):
+        self.offset = offset
+        # compressed length, after the chunk header
+        self.length = length
+        self.count = count
+        self.first = first
+        self.last = last
+
+    @property
+    def end(self):
+        return self.offset + _chunk_header.size + self.length
+
+
+# the log is a header, then chunks appended one after another. each chunk is a header w/ the
+# compressed length, record count and time range, then the zlib compressed records. a record is a
+# header w/ the timestamp, channel id and length, then the serialized message. the index beside the
+# log repeats the chunk headers w/ their offsets, so a time range is found w/o reading the log
+
+LOG_MAGIC = b'SWTLMLOG'
+INDEX_MAGIC = b'SWTLMIDX'
+# bump when the file layout changes
+VERSION = 1
+# magic, version
+_header = struct.Struct('<8sI')
+# compressed length, record count, first timestamp, last timestamp
+_chunk_header = struct.Struct('<IIdd')
+# timestamp, channel id, length
+_record_header = struct.Struct('<dBI')
+# offset, compressed length, record count, first timestamp, last timestamp
+_index_entry = struct.Struct('<QIIdd')
+
+
+def index_path_for(path: pathlib.Path):
+    path = pathlib.Path(path)
+    return path.with_name(f"{path.name}.index")
+
+
+def _check_header(header_bytes, magic, path):
+    try:
+        file_magic, version = _header.unpack(header_bytes)
+    except struct.error:
+        raise TelemetryError(f"{path} is truncated")
+    if file_magic != magic or version != VERSION:
+        raise TelemetryError(f"{path} is not a version {VERSION} telemetry file")
+
+
+def _read_index(index_path):
+    # the chunks recorded in the index, [] when it is missing or unreadable
+    try:
+        data = pathlib.Path(index_path).read_bytes()
+        _check_header(data[:_header.size], INDEX_MAGIC, index_path)
+    except (OSError, TelemetryError) as e:
+        logger.debug(f"ignoring telemetry index: {e}")
+        return []
+    entries = (len(data) - _header.size) // _index_entry.size
+    return [
+        TelemetryChunk(*_index_entry.unpack_from(data, _header.size + i * _index_entry.size))
+        for i in range(entries)
+    ]
+
+
+def _scan_chunks(log_file, offset, size):
+    # the complete chunks from offset on, from their headers w/o reading the compressed records
+    chunks = []
+    while offset + _chunk_header.size <= size:
+        log_file.seek(offset)
+        chunk = TelemetryChunk(offset, *_chunk_header.unpack(log_file.read(_chunk_header.size)))
+        if chunk.end > size:
+            # a chunk which was still being written when the recorder stopped
+            break
+        chunks.append(chunk)
+        offset = chunk.end
+    return chunks
+
+
+def _load_chunks(log_file, path):
+    ''' the chunks of an open log, from its index plus any chunks appended since the index was written
+
+    returns (chunks, indexed) where indexed is how many of the chunks came from the index
+    '''
+    log_file.seek(0)
+    _check_header(log_file.read(_header.size), LOG_MAGIC, path)
+    size = os.fstat(log_file.fileno()).st_size
+    chunks = _read_index(index_path_for(path))
+
+    def _matches(chunk):
+        if chunk.end > size:
+            return False
+        log_file.seek(chunk.offset)
+        return _chunk_header.unpack(log_file.read(_chunk_header.size)) == \
+            (chunk.length, chunk.count, chunk.first, chunk.last)
+
+    # entries are only appended, so when the last one matches the log the ones before it do too
+    while chunks and not _matches(chunks[-1]):
+        chunks.pop()
+    indexed = len(chunks)
+    offset = chunks[-1].end if chunks else _header.size
+    return chunks + _scan_chunks(log_file, offset, size), indexed
+
+
+class TelemetryWriter:
+    ''' appends records to a telemetry log, a chunk at a time
+
+    a chunk is written once it holds chunk_seconds of records or chunk_bytes of serialized messages.
+    an existing log is appended to, after dropping a chunk left partially written
+    '''
+
+    def __init__(self, path: pathlib.Path, chunk_seconds=5.0, chunk_bytes=1024 * 1024, compression_level=6):
+        self.path = pathlib.Path(path)
+        self.chunk_seconds = chunk_seconds
+        self.chunk_bytes = chunk_bytes
+        self.compression_level = compression_level
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        exists = self.path.exists() and self.path.stat().st_size > 0
+        self._log_file = open(self.path, 'r+b' if exists else 'w+b')
+        index_path = index_path_for(self.path)
+        if exists:
+            chunks, indexed = _load_chunks(self._log_file, self.path)
+            end = chunks[-1].end if chunks else _header.size
+            self._log_file.truncate(end)
+            self._log_file.seek(end)
+            # rewrite the index when it is missing chunks found in the log
+            if indexed < len(chunks) or not index_path.exists():
+                self._index_file = open(index_path, 'wb')
+                self._index_file.write(_header.pack(INDEX_MAGIC, VERSION))
+                for chunk in chunks:
+                    self._write_index_entry(chunk)
+            else:
+                self._index_file = open(index_path, 'ab')
+                self._index_file.truncate(_header.size + len(chunks) * _index_entry.size)
+        else:
+            self._log_file.write(_header.pack(LOG_MAGIC, VERSION))
+            self._index_file = open(index_path, 'wb')
+            self._index_file.write(_header.pack(INDEX_MAGIC, VERSION))
+        self._offset = self._log_file.tell()
+        self._records = []
+        self._raw_bytes = 0
+        # totals over the life of the writer
+        self.records_written = 0
+        self.raw_bytes_written = 0
+        self.bytes_written = 0
+
+    def _write_index_entry(self, chunk):
+        self._index_file.write(_index_entry.pack(chunk.offset, chunk.length, chunk.count, chunk.first, chunk.last))
+
+    def append(self, timestamp, channel, data: bytes):
+        self._records.append((timestamp, _channels[channel][0], data))
+        self._raw_bytes += _record_header.size + len(data)
+        if self._raw_bytes >= self.chunk_bytes or timestamp - self._records[0][0] >= self.chunk_seconds:
+            self.flush()
+
+    def flush(self):
+        ''' write the buffered records as a chunk '''
+        if not self._records:
+            return
+        # records are kept in time order within a chunk, whatever order they were appended in
+        self._records.sort(key=lambda record: record[0])
+        raw = bytearray()
+        for timestamp, channel_id, data in self._records:
+            raw += _record_header.pack(timestamp, channel_id, len(data))
+            raw += data
+        compressed = zlib.compress(raw, self.compression_level)
+        chunk = TelemetryChunk(self._offset, len(compressed), len(self._records),
+            self._records[0][0], self._records[-1][0])
+        self._log_file.write(_chunk_header.pack(chunk.length, chunk.count, chunk.first, chunk.last))
+        self._log_file.write(compressed)
+        self._log_file.flush()
+        # the index entry follows the chunk, so an index never refers to a chunk that isn't there
+        self._write_index_entry(chunk)
+        self._index_file.flush()
+        self._offset = chunk.end
+        self.records_written += chunk.count
+        self.raw_bytes_written += len(raw)
+        self.bytes_written += _chunk_header.size + len(compressed)
+        self._records = []
+        self._raw_bytes = 0
+
+    def close(self):
+        self.flush()
+        self._log_file.close()
+        self._index_file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class TelemetryLog:
+    ''' reads a telemetry log, decompressing only the chunks a time range touches
+
+    a log still being recorded can be read, refresh() picks up the chunks written since
+    '''
+
+    def __init__(self, path: pathlib.Path):
+        self.path = pathlib.Path(path)
+        try:
+            self._log_file = open(self.path, 'rb')
+        except OSError as e:
+            raise TelemetryError(f"unable to open telemetry log {self.path}: {e}")
+        self._lock = threading.Lock()
+        self._chunks = []
+        # last timestamp of each chunk, for bisecting
+        self._lasts = []
+        # the last decompressed chunk, reads of a time range usually touch it again
+        self._cached = (None, None)
+        self.refresh()
+
+    def refresh(self):
+        with self._lock:
+            if not self._chunks:
+                self._chunks, _ = _load_chunks(self._log_file, self.path)
+            else:
+                size = os.fstat(self._log_file.fileno()).st_size
+                self._chunks += _scan_chunks(self._log_file, self._chunks[-1].end, size)
+            self._lasts = [chunk.last for chunk in self._chunks]
+
+    @property
+    def chunks(self):
+        return list(self._chunks)
+
+    @property
+    def start_time(self):
+        return self._chunks[0].first if self._chunks else None
+
+    @property
+    def end_time(self):
+        return max(self._lasts, default=None)
+
+    @property
+    def duration(self):
+        if not self._chunks:
+            return 0.0
+        return self.end_time - self.start_time
+
+    def __len__(self):
+        return sum(chunk.count for chunk in self._chunks)
+
+    @property
+    def size(self):
+        return self._chunks[-1].end if self._chunks else _header.size
+
+    def _records(self, chunk):
+        cached_chunk, records = self._cached
+        if cached_chunk is chunk:
+            return records
+        with self._lock:
+            self._log_file.seek(chunk.offset + _chunk_header.size)
+            compressed = self._log_file.read(chunk.length)
+        raw = memoryview(zlib.decompress(compressed))
+        records = []
+        offset = 0
+        for _ in range(chunk.count):
+            timestamp, channel_id, length = _record_header.unpack_from(raw, offset)
+            offset += _record_header.size
+            channel = _channels_by_id.get(channel_id)
+            # skip channels added by a newer version
+            if channel is not None:
+                records.append(TelemetryRecord(timestamp, channel, bytes(raw[offset:offset + length])))
+            offset += length
+        self._cached = (chunk, records)
+        return records
+
+    def read(self, start=None, end=None, channels=None):
+        ''' yields the TelemetryRecords from start to end (time.time() values, inclusive), in time order '''
+        chunks = self._chunks
+        # the first chunk which may hold records at or after start
+        index = bisect.bisect_left(self._lasts, start) if start is not None else 0
+        for chunk in chunks[index:]:
+            if end is not None and chunk.first > end:
+                break
+            for record in self._records(chunk):
+                if start is not None and record.timestamp < start:
+                    continue
+                if end is not None and record.timestamp > end:
+                    break
+                if channels is None or record.channel in channels:
+                    yield record
+
+    def __iter__(self):
+        return self.read()
+
+    def channel_counts(self, start=None, end=None):
+        ''' dict of channel -> records from start to end '''
+        counts = {}
+        for record in self.read(start, end):
+            counts[record.channel] = counts.get(record.channel, 0) + 1
+        return counts
+
+    def close(self):
+        self._log_file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class TelemetryRecorder:
+    ''' samples robot state, localization and mission state into a telemetry log at rate_hz
+
+    each tick issues the requests at once w/ the sdk async calls, so a tick costs about one round
+    trip whatever the channels. the robot state is shared through RobotStateFacade like any other.
+    navigation feedback isn't sampled, each response the graph nav facade gets while navigating is
+    recorded. samples are handed to a writer thread which compresses and writes the chunks, and
+    when it falls behind samples are dropped (and counted) rather than slowing down the sampling
+    '''
+
+    def __init__(self, spot, path: pathlib.Path, rate_hz=10.0, channels=None, chunk_seconds=5.0, max_queue=1024):
+        self._spot = spot
+        self.path = pathlib.Path(path)
+        self.rate_hz = rate_hz
+        self.channels = list(channels or _channels.keys())
+        unknown = [channel for channel in self.channels if channel not in _channels]
+        if unknown:
+            raise TelemetryError(f"unknown telemetry channels {', '.join(unknown)}")
+        self.chunk_seconds = chunk_seconds
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._stop = threading.Event()
+        self._sampler = None
+        self._writer_thread = None
+        self._writer = None
+        # highest mission tick recorded, so each sample only fetches the newer node history
+        self._mission_tick = None
+        self._started = None
+        self._stopped = None
+        self._ticks = 0
+        self._late_ticks = 0
+        self._tick_seconds = 0.0
+        self._samples = {channel: 0 for channel in self.channels}
+        self._errors = {channel: 0 for channel in self.channels}
+        self._dropped = 0
+
+    @property
+    def running(self):
+        return self._sampler is not None and self._sampler.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+        self._writer = TelemetryWriter(self.path, chunk_seconds=self.chunk_seconds)
+        self._stop.clear()
+        self._started = time.time()
+        self._stopped = None
+        self._writer_thread = threading.Thread(target=self._write, name='telemetry-writer', daemon=True)
+        self._writer_thread.start()
+        self._sampler = threading.Thread(target=background('telemetry')(self._sample), name='telemetry', daemon=True)
+        self._sampler.start()
+        if TelemetryChannel.NAVIGATION_FEEDBACK in self.channels:
+            self._spot.graph_nav.subscribe_feedback(self._on_navigation_feedback)
+
+    def stop(self):
+        ''' stop sampling, and wait for the samples taken to be written '''
+        if self._sampler is None:
+            return
+        self._spot.graph_nav.unsubscribe_feedback(self._on_navigation_feedback)
+        self._stop.set()
+        self._sampler.join()
+        self._sampler = None
+        # the writer stops once it reaches the None, or has already stopped on a write error
+        if self._writer_thread.is_alive():
+            self._queue.put(None)
+        self._writer_thread.join()
+        self._writer_thread = None
+        self._writer.close()
+        self._stopped = time.time()
+
+    def _requests(self):
+        # channel -> sdk future, all in flight together
+        futures = {}
+        if TelemetryChannel.ROBOT_STATE in self.channels:
+            futures[TelemetryChannel.ROBOT_STATE] = self._spot.robot_state.client.get_robot_state_async()
+        if TelemetryChannel.LOCALIZATION in self.channels:
+            futures[TelemetryChannel.LOCALIZATION] = self._spot.graph_nav.client.get_localization_state_async()
+        if TelemetryChannel.MISSION_STATE in self.channels:
+            lower_tick_bound = self._mission_tick + 1 if self._mission_tick is not None else None
+            futures[TelemetryChannel.MISSION_STATE] = \
+                self._spot.mission.client.get_state_async(lower_tick_bound=lower_tick_bound)
+        return futures
+
+    def _sample_once(self):
+        try:
+            futures = self._requests()
+        except Exception as e:
+            logger.debug(f"telemetry requests failed: {e}")
+            for channel in self.channels:
+                if channel != TelemetryChannel.NAVIGATION_FEEDBACK:
+                    self._errors[channel] += 1
+            return
+        for channel, future in futures.items():
+            try:
+                message = future.result()
+            except Exception as e:
+                logger.debug(f"telemetry {channel} failed: {e}")
+                self._errors[channel] += 1
+                continue
+            timestamp = time.time()
+            if channel == TelemetryChannel.ROBOT_STATE:
+                self._spot.robot_state.update(message)
+            elif channel == TelemetryChannel.MISSION_STATE:
+                if message.history:
+                    self._mission_tick = max(node_states.tick_counter for node_states in message.history)
+                elif self._mission_tick is not None and message.tick_counter < self._mission_tick:
+                    # a new mission was loaded, its ticks start over
+                    self._mission_tick = None
+            self._enqueue(timestamp, channel, message)
+
+    def _enqueue(self, timestamp, channel, message):
+        try:
+            self._queue.put_nowait((timestamp, channel, message.SerializeToString()))
+        except queue.Full:
+            self._dropped += 1
+            return
+        self._samples[channel] += 1
+
+    def _on_navigation_feedback(self, feedback):
+        # from the thread navigating, only serialized here, the writer thread does the rest
+        self._enqueue(time.time(), TelemetryChannel.NAVIGATION_FEEDBACK, feedback)
+
+    def _sample(self):
+        period = 1.0 / self.rate_hz
+        next_tick = time.monotonic()
+        while not self._stop.is_set():
+            started = time.monotonic()
+            self._sample_once()
+            self._ticks += 1
+            self._tick_seconds += time.monotonic() - started
+            next_tick += period
+            now = time.monotonic()
+            if now > next_tick:
+                # behind, skip the missed ticks rather than sampling in a burst to catch up
+                self._late_ticks += 1
+                next_tick = now
+            self._stop.wait(next_tick - now)
+
+    def _write(self):
+        while True:
+            sample = self._queue.get()
+            if sample is None:
+                break
+            try:
+                self._writer.append(*sample)
+            except Exception:
+                logger.exception('telemetry write failed')
+                self._stop.set()
+                break
+
+    def stats(self):
+        ''' dict of sampling and writing totals since the recorder was started '''
+        elapsed = 0.0
+        if self._started is not None:
+            elapsed = (self._stopped or time.time()) - self._started
+        writer = self._writer
+        bytes_written = writer.bytes_written if writer is not None else 0
+        raw_bytes_written = writer.raw_bytes_written if writer is not None else 0
+        return {
+            'running': self.running,
+            'path': str(self.path),
+            'elapsed_seconds': elapsed,
+            'ticks': self._ticks,
+            'rate_hz': self._ticks / elapsed if elapsed else 0.0,
+            'late_ticks': self._late_ticks,
+            'mean_tick_seconds': self._tick_seconds / self._ticks if self._ticks else None,
+            'samples': dict(self._samples),
+            'errors': dict(self._errors),
+            'dropped': self._dropped,
+            'queued': self._queue.qsize(),
+            'bytes_written': bytes_written,
+            'compression_ratio': raw_bytes_written / bytes_written if bytes_written else None,
+        }
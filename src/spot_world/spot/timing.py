@@ -0,0 +1,72 @@
+import logging
+import contextlib
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class Phase:
+
+    def __init__(self, name, thread_name, start, seconds):
+        self.name = name
+        self.thread_name = thread_name
+        # seconds from when the timer was created
+        self.start = start
+        self.seconds = seconds
+
+    @property
+    def end(self):
+        return self.start + self.seconds
+
+
+class PhaseTimer:
+    ''' wall time of named phases, which may run at the same time on different threads
+
+    the report compares the wall time from the timer's creation to the end of the last phase
+    against the sum of the phases, the difference is what running them side by side saved
+    '''
+
+    def __init__(self):
+        self._created = time.perf_counter()
+        self._phases = []
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            phase = Phase(name, threading.current_thread().name, started - self._created,
+                time.perf_counter() - started)
+            logger.debug(f"{name} took {phase.seconds:.3f}s")
+            with self._lock:
+                self._phases.append(phase)
+
+    @property
+    def phases(self):
+        ''' recorded phases in the order they started '''
+        with self._lock:
+            return sorted(self._phases, key=lambda phase: phase.start)
+
+    @property
+    def wall_seconds(self):
+        return max((phase.end for phase in self.phases), default=0.0)
+
+    def report(self):
+        phases = self.phases
+        name_width = max((len(phase.name) for phase in phases), default=0)
+        lines = [
+            f"{phase.name:<{name_width}}  {phase.start:6.2f}s +{phase.seconds:6.2f}s  {phase.thread_name}"
+            for phase in phases
+        ]
+        wall_seconds = self.wall_seconds
+        serial_seconds = sum(phase.seconds for phase in phases)
+        lines.append(f"ready in {wall_seconds:.2f}s, {max(0.0, serial_seconds - wall_seconds):.2f}s saved by overlap")
+        return '\n'.join(lines)
+
+
+def no_phase(name):
+    # stands in for PhaseTimer.phase when there is no timer
+    return contextlib.nullcontext()
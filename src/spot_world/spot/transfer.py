@@ -0,0 +1,61 @@
+import logging
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from spot_world.spot import rpc_stats
+from spot_world.spot.clients import sdk_type
+
+logger = logging.getLogger(__name__)
+
+
+class TransferError(Exception):
+    pass
+
+
+class SnapshotTransfer:
+    ''' runs one rpc per snapshot w/ bounded concurrency, retrying failed snapshots w/ backoff '''
+
+    def __init__(self, max_workers=4, retries=3, backoff_seconds=0.5):
+        self.max_workers = max_workers
+        # a snapshot is attempted retries + 1 times, waiting backoff_seconds * 2^attempt between
+        self.retries = retries
+        self.backoff_seconds = backoff_seconds
+
+    def _transfer_with_retry(self, transfer_snapshot, snapshot_id):
+        attempt = 0
+        while True:
+            try:
+                return transfer_snapshot(snapshot_id)
+            except sdk_type('bosdyn.client.exceptions', 'RpcError') as e:
+                if attempt >= self.retries:
+                    raise TransferError(f"transfer of snapshot {snapshot_id} failed: {e}") from e
+                delay = self.backoff_seconds * (2 ** attempt)
+                logger.debug(f"retrying snapshot {snapshot_id} in {delay}s after {e}")
+                time.sleep(delay)
+                attempt += 1
+
+    def run(self, snapshot_ids, transfer_snapshot, progress=None):
+        ''' calls transfer_snapshot(snapshot_id) for each id, returns dict of snapshot id -> result
+
+        progress, when given, is called as progress(completed, total, snapshot_id) after each snapshot
+        '''
+        snapshot_ids = list(snapshot_ids)
+        total = len(snapshot_ids)
+        completed = 0
+        lock = threading.Lock()
+
+        def _transfer(snapshot_id):
+            nonlocal completed
+            result = self._transfer_with_retry(transfer_snapshot, snapshot_id)
+            if progress is not None:
+                with lock:
+                    completed += 1
+                    progress(completed, total, snapshot_id)
+            return result
+
+        if total == 0:
+            return {}
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, total)) as executor:
+            # the transfers are attributed to the command which started them
+            futures = [rpc_stats.submit(executor, _transfer, snapshot_id) for snapshot_id in snapshot_ids]
+            return dict(zip(snapshot_ids, (future.result() for future in futures)))
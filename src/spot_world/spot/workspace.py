@@ -0,0 +1,134 @@
+import logging
+import pathlib
+import collections
+import threading
+from spot_world.spot.graph_nav import Map
+
+logger = logging.getLogger(__name__)
+
+
+class MapWorkspaceError(Exception):
+    pass
+
+
+class MapWorkspace:
+    ''' autowalk folders by name, w/ their maps loaded on demand and kept in a memory bounded lru
+
+    the pinned map (the one on the robot) is never evicted, least recently used maps are
+    evicted once the estimated resident size of the loaded maps is over max_bytes
+    '''
+
+    def __init__(self, autowalk_paths=(), max_bytes=512 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        # name -> autowalk folder path
+        self._paths = {}
+        # name -> Map, least recently used first
+        self._maps = collections.OrderedDict()
+        self._pinned = None
+        self._lock = threading.Lock()
+        for autowalk_path in autowalk_paths:
+            self.add(autowalk_path)
+
+    @staticmethod
+    def name_for(autowalk_path: pathlib.Path):
+        # the folder name from the tablet w/o the .walk extension
+        name = pathlib.Path(autowalk_path).name
+        if name.endswith('.walk'):
+            name = name[:-len('.walk')]
+        return name
+
+    @staticmethod
+    def is_autowalk(path: pathlib.Path):
+        return pathlib.Path(path, 'graph').is_file()
+
+    @classmethod
+    def from_directory(cls, directory: pathlib.Path, **kwargs):
+        ''' a workspace of every autowalk folder directly inside directory '''
+        directory = pathlib.Path(directory)
+        autowalk_paths = sorted(p for p in directory.iterdir() if p.is_dir() and cls.is_autowalk(p))
+        return cls(autowalk_paths, **kwargs)
+
+    def add(self, autowalk_path: pathlib.Path):
+        ''' index an autowalk folder, returns its name '''
+        autowalk_path = pathlib.Path(autowalk_path).resolve()
+        if not self.is_autowalk(autowalk_path):
+            raise MapWorkspaceError(f"{autowalk_path} is not an autowalk folder")
+        name = self.name_for(autowalk_path)
+        existing_path = self._paths.get(name)
+        if existing_path is not None and existing_path != autowalk_path:
+            raise MapWorkspaceError(f"map name {name} is used by both {existing_path} and {autowalk_path}")
+        self._paths[name] = autowalk_path
+        return name
+
+    @property
+    def names(self):
+        return sorted(self._paths.keys())
+
+    def path(self, name):
+        try:
+            return self._paths[name]
+        except KeyError:
+            raise MapWorkspaceError(f"no map named {name}")
+
+    def name_of(self, autowalk_path: pathlib.Path):
+        # name of an indexed autowalk folder, None when it isn't in the workspace
+        autowalk_path = pathlib.Path(autowalk_path).resolve()
+        for name, path in self._paths.items():
+            if path == autowalk_path:
+                return name
+        return None
+
+    def is_loaded(self, name):
+        return name in self._maps
+
+    @property
+    def pinned(self):
+        return self._pinned
+
+    def pin(self, name):
+        ''' keep the named map loaded, unpinning the previous one '''
+        self.path(name)
+        self._pinned = name
+
+    def get(self, name):
+        ''' returns the named Map, loading it when it isn't already loaded '''
+        path = self.path(name)
+        with self._lock:
+            map = self._maps.get(name)
+            if map is not None:
+                self._maps.move_to_end(name)
+                return map
+        # load outside of the lock, loads are slow and other maps are still usable meanwhile
+        logger.debug(f"loading map {name} from {path}")
+        map = Map.from_filesystem(path, lazy=True, cache=True)
+        with self._lock:
+            map = self._maps.setdefault(name, map)
+            self._maps.move_to_end(name)
+            self._evict(keep=name)
+        return map
+
+    @property
+    def resident_size(self):
+        ''' estimated bytes held by the loaded maps '''
+        with self._lock:
+            maps = list(self._maps.values())
+        return sum(map.resident_size for map in maps)
+
+    def _evict(self, keep=None):
+        # drop least recently used maps until under max_bytes, never the pinned or just used map
+        sizes = {name: map.resident_size for name, map in self._maps.items()}
+        total = sum(sizes.values())
+        for name in list(self._maps.keys()):
+            if total <= self.max_bytes:
+                break
+            if name in (self._pinned, keep):
+                continue
+            logger.debug(f"evicting map {name} ({sizes[name]} bytes)")
+            del self._maps[name]
+            total -= sizes[name]
+
+    def evict(self, name):
+        with self._lock:
+            if name == self._pinned:
+                raise MapWorkspaceError(f"map {name} is in use")
+            self._maps.pop(name, None)
@@ -1,5 +1,4 @@
 import logging
-from bosdyn.client.world_object import WorldObjectClient
 from bosdyn.api import world_object_pb2
 
 logger = logging.getLogger(__name__)
@@ -12,7 +11,7 @@ class WorldObjectFacade:
 
     @property
     def client(self):
-        return self._spot._robot.ensure_client(WorldObjectClient.default_service_name)
+        return self._spot.clients.ensure_type('bosdyn.client.world_object', 'WorldObjectClient')
 
     def get_visible_fiducials(self):
         request_fiducials = [world_object_pb2.WORLD_OBJECT_APRILTAG]
@@ -0,0 +1,82 @@
+import sys
+import pathlib
+import pytest
+from bosdyn.api.graph_nav import map_pb2
+from bosdyn.api.autowalk import walks_pb2
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent / 'src'))
+
+from spot_world.fake import FakeRobot  # noqa: E402
+from spot_world.spot.graph_nav import Map  # noqa: E402
+
+
+def make_map(waypoint_count=4, skip_edges=(), edge_x=1.0, fiducials=None):
+    ''' a line of waypoints 1m apart, w/ a snapshot for every waypoint and edge
+
+    fiducials is a dict of waypoint index -> dict of fiducial -> distance (None for no transform)
+    of the fiducials seen from that waypoint
+    '''
+    graph = map_pb2.Graph()
+    waypoint_snapshots, edge_snapshots = {}, {}
+    for i in range(waypoint_count):
+        waypoint = graph.waypoints.add(id=f"waypoint-{i}", snapshot_id=f"waypoint-snapshot-{i}")
+        waypoint.waypoint_tform_ko.rotation.w = 1.0
+        waypoint.annotations.creation_time.seconds = 1000 + i
+        snapshot = waypoint_snapshots[waypoint.snapshot_id] = map_pb2.WaypointSnapshot(id=waypoint.snapshot_id)
+        for fiducial, distance in (fiducials or {}).get(i, {}).items():
+            snapshot_object = snapshot.objects.add()
+            snapshot_object.apriltag_properties.tag_id = fiducial
+            if distance is not None:
+                edge_map = snapshot_object.transforms_snapshot.child_to_parent_edge_map
+                edge_map[f"fiducial_{fiducial}"].parent_tform_child.position.x = distance
+    for i in range(waypoint_count - 1):
+        if i in skip_edges:
+            continue
+        edge = graph.edges.add(snapshot_id=f"edge-snapshot-{i}")
+        edge.id.from_waypoint, edge.id.to_waypoint = f"waypoint-{i}", f"waypoint-{i + 1}"
+        edge.from_tform_to.position.x = edge_x
+        edge.from_tform_to.rotation.w = 1.0
+        edge_snapshots[edge.snapshot_id] = map_pb2.EdgeSnapshot(id=edge.snapshot_id)
+    return Map(graph, waypoint_snapshots, edge_snapshots)
+
+
+def save_map(map, autowalk_path):
+    ''' write map as an autowalk folder from the tablet, returns its path '''
+    autowalk_path = pathlib.Path(autowalk_path)
+    for folder, snapshots in (('waypoint_snapshots', map.waypoint_snapshots), ('edge_snapshots', map.edge_snapshots)):
+        pathlib.Path(autowalk_path, folder).mkdir(parents=True, exist_ok=True)
+        for snapshot_id, snapshot in snapshots.items():
+            pathlib.Path(autowalk_path, folder, snapshot_id).write_bytes(snapshot.SerializeToString())
+    pathlib.Path(autowalk_path, 'missions').mkdir(exist_ok=True)
+    pathlib.Path(autowalk_path, 'graph').write_bytes(map.graph.SerializeToString())
+    return autowalk_path
+
+
+def make_walk(waypoint_ids):
+    ''' an autowalk mission w/ an element navigating to each waypoint in turn '''
+    walk = walks_pb2.Walk()
+    for i, waypoint_id in enumerate(waypoint_ids):
+        element = walk.elements.add(name=f"element-{i}")
+        element.target.navigate_to.destination_waypoint_id = waypoint_id
+    return walk
+
+
+def save_mission(autowalk_path, name, walk):
+    mission_path = pathlib.Path(autowalk_path, 'missions', f"{name}.walk")
+    mission_path.parent.mkdir(parents=True, exist_ok=True)
+    mission_path.write_bytes(walk.SerializeToString())
+    return mission_path
+
+
+@pytest.fixture
+def fake_robot():
+    with FakeRobot() as fake_robot:
+        yield fake_robot
+
+
+@pytest.fixture
+def spot(fake_robot):
+    spot = fake_robot.connect()
+    spot.lease.take()
+    yield spot
+    spot.lease.release()
@@ -0,0 +1,90 @@
+import asyncio
+import pytest
+from bosdyn.api.mission import util_pb2
+from conftest import make_map
+from spot_world.spot.aio import AsyncSpot
+from spot_world.spot.graph_nav import NavigationStatus
+from spot_world.spot.mission import MissionStatus
+
+
+@pytest.fixture
+def mapped_spot(spot, fake_robot):
+    fake_robot.graph_nav.speed = 20.0
+    spot.graph_nav.upload_map(make_map(6))
+    spot.graph_nav.localize_to_fiducial()
+    return spot
+
+
+@pytest.fixture
+def mission_spot(spot, fake_robot):
+    fake_robot.mission.element_seconds = 0.1
+    fake_robot.mission.load(['first', 'second'])
+    return spot
+
+
+def _navigate(spot, waypoint_id):
+    async def _run():
+        return await AsyncSpot(spot).graph_nav.navigate_to_waypoint(waypoint_id, timeout=10,
+            min_poll_interval=0.05, expected_speed=20.0)
+    return asyncio.run(_run())
+
+
+def _run_mission(spot, restart=False):
+    changes = []
+
+    async def _run():
+        return await AsyncSpot(spot).mission.run(on_node_status=changes.append, restart=restart)
+    return asyncio.run(_run()), changes
+
+
+def test_async_navigate_reaches_waypoint(mapped_spot, fake_robot):
+    feedback = []
+    mapped_spot.graph_nav.subscribe_feedback(feedback.append)
+    result = _navigate(mapped_spot, 'waypoint-5')
+    assert result.status == NavigationStatus.REACHED
+    assert result.commands_sent == 1
+    assert result.feedback_polls == len(feedback)
+    assert fake_robot.graph_nav.waypoint_id == 'waypoint-5'
+
+
+def test_async_navigate_matches_blocking(mapped_spot):
+    blocking = mapped_spot.graph_nav.navigate_to_waypoint('waypoint-5', timeout=10,
+        min_poll_interval=0.05, expected_speed=20.0)
+    result = _navigate(mapped_spot, 'waypoint-0')
+    assert result.status == blocking.status == NavigationStatus.REACHED
+
+
+def test_async_navigate_unknown_waypoint_fails(mapped_spot):
+    result = _navigate(mapped_spot, 'waypoint-missing')
+    assert result.status == NavigationStatus.FAILED
+    assert result.feedback_polls == 0
+
+
+def test_async_mission_reports_node_changes(mission_spot):
+    status, changes = _run_mission(mission_spot)
+    assert status == MissionStatus.SUCCESS
+    finished = [change.name for change in changes if change.result == util_pb2.RESULT_SUCCESS]
+    assert finished[:2] == ['first', 'second']
+
+
+def test_async_mission_restart(mission_spot):
+    blocking = mission_spot.mission.run()
+    status, changes = _run_mission(mission_spot, restart=True)
+    assert status == blocking == MissionStatus.SUCCESS
+    assert any(change.name == 'second' and change.finished for change in changes)
+
+
+def test_async_robot_state_never_queries_blocking(spot, monkeypatch):
+    cached = spot.robot_state.refresh()
+
+    def _blocking_query():
+        raise AssertionError('blocking robot state rpc on the event loop')
+    monkeypatch.setattr(spot.robot_state, 'refresh', _blocking_query)
+
+    async def _run():
+        robot_state = AsyncSpot(spot).robot_state
+        return await robot_state.get(max_age=60), await robot_state.get(max_age=1e-9)
+    shared, fresh = asyncio.run(_run())
+    assert shared is cached
+    assert fresh is not cached
+    assert spot.robot_state.cached(60) is fresh
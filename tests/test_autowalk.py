@@ -0,0 +1,116 @@
+import os
+import math
+import pytest
+from conftest import make_map, make_walk, save_map, save_mission
+from spot_world.spot.autowalk import MissionCatalog, AutowalkFacade, AutowalkError
+from spot_world.spot.mission import MissionStatus
+
+
+@pytest.fixture
+def autowalk_path(tmp_path):
+    autowalk_path = save_map(make_map(5), tmp_path / 'office.walk')
+    save_mission(autowalk_path, 'tour', make_walk(['waypoint-1', 'waypoint-4', 'waypoint-2']))
+    save_mission(autowalk_path, 'short', make_walk(['waypoint-0']))
+    return autowalk_path
+
+
+def _touch(path):
+    # a new mtime even on file systems w/ a coarse clock
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+
+def test_catalog_lists_missions(autowalk_path):
+    catalog = MissionCatalog(autowalk_path)
+    assert catalog.names == ['short', 'tour']
+    (autowalk_path / 'missions' / 'notes.txt').write_text('not a mission')
+    _touch(autowalk_path / 'missions')
+    assert catalog.names == ['short', 'tour']
+    with pytest.raises(AutowalkError):
+        catalog.get('missing')
+
+
+def test_catalog_parses_missions_once(autowalk_path):
+    catalog = MissionCatalog(autowalk_path)
+    first = catalog.get('tour')
+    # a copy is handed out, so changes before upload don't reach the cached mission
+    first.skip_docking()
+    second = catalog.get('tour')
+    assert second.walk.elements == first.walk.elements
+    assert not second.walk.playback_mode.once.skip_docking_after_completion
+    assert catalog._load('tour') is catalog._load('tour')
+
+
+def test_catalog_reparses_changed_mission(autowalk_path):
+    catalog = MissionCatalog(autowalk_path)
+    assert catalog.get('short').target_waypoint_ids == ['waypoint-0']
+    mission_path = save_mission(autowalk_path, 'short', make_walk(['waypoint-3', 'waypoint-4']))
+    _touch(mission_path)
+    assert catalog.get('short').target_waypoint_ids == ['waypoint-3', 'waypoint-4']
+    mission_path.unlink()
+    _touch(autowalk_path / 'missions')
+    assert catalog.names == ['tour']
+    with pytest.raises(AutowalkError):
+        catalog.get('short')
+
+
+def test_catalog_info(autowalk_path):
+    catalog = MissionCatalog(autowalk_path)
+    map = make_map(5)
+    info = catalog.info('tour')
+    assert info['elements'] == 3
+    assert info['target_waypoints'] == ['waypoint-1', 'waypoint-4', 'waypoint-2']
+    assert info['path_length'] is None
+    assert catalog.info('tour', map)['path_length'] == 5.0
+    # the estimate is redone when the mission changes, even on the same map
+    _touch(save_mission(autowalk_path, 'tour', make_walk(['waypoint-0', 'waypoint-4'])))
+    assert catalog.info('tour', map)['path_length'] == 4.0
+    # and is inf when a target can't be reached on the map
+    assert catalog.info('tour', make_map(5, skip_edges=[2]))['path_length'] == math.inf
+
+
+def _loads(fake_robot):
+    return sum(count for method, count in fake_robot.rpc_counts.items() if method.endswith('/LoadAutowalk'))
+
+
+@pytest.fixture
+def loop_spot(spot, fake_robot, autowalk_path):
+    fake_robot.mission.element_seconds = 0.2
+    spot.graph_nav.upload_map(make_map(5))
+    return spot
+
+
+def test_fingerprint_covers_mission_and_map(autowalk_path):
+    catalog = MissionCatalog(autowalk_path)
+    fingerprint = AutowalkFacade.fingerprint
+    tour = catalog.get('tour')
+    assert fingerprint(tour, make_map(5)) == fingerprint(catalog.get('tour'), make_map(5))
+    assert fingerprint(tour, make_map(5)) != fingerprint(catalog.get('short'), make_map(5))
+    assert fingerprint(tour, make_map(5)) != fingerprint(tour, make_map(6))
+    tour.skip_docking()
+    assert fingerprint(tour, make_map(5)) != fingerprint(catalog.get('tour'), make_map(5))
+
+
+def test_loaded_mission_restarted_not_uploaded(loop_spot, fake_robot, autowalk_path):
+    mission = loop_spot.autowalk.catalog(autowalk_path).get('tour')
+    assert loop_spot.autowalk.upload_mission(mission, reuse=True)
+    assert loop_spot.mission.run() == MissionStatus.SUCCESS
+    assert not loop_spot.autowalk.upload_mission(mission, reuse=True)
+    assert _loads(fake_robot) == 1
+    changes = []
+    assert loop_spot.mission.run(restart=True, on_node_status=changes.append) == MissionStatus.SUCCESS
+    assert any(change.name == 'element-2' and change.finished for change in changes)
+
+
+def test_mission_uploaded_again_once_stale(loop_spot, fake_robot, autowalk_path):
+    catalog = loop_spot.autowalk.catalog(autowalk_path)
+    assert loop_spot.autowalk.upload_mission(catalog.get('tour'), reuse=True)
+    # another mission loaded on the robot since
+    fake_robot.mission.load(['other'])
+    assert loop_spot.autowalk.upload_mission(catalog.get('tour'), reuse=True)
+    # the map changed
+    loop_spot.graph_nav.upload_map(make_map(6))
+    assert loop_spot.autowalk.upload_mission(catalog.get('tour'), reuse=True)
+    # w/o reuse the mission is always uploaded
+    assert loop_spot.autowalk.upload_mission(catalog.get('tour'))
+    assert _loads(fake_robot) == 4
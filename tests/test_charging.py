@@ -0,0 +1,82 @@
+import pytest
+from bosdyn.api import robot_state_pb2
+from conftest import make_map
+from spot_world.spot import charging
+from spot_world.spot.charging import ChargeManager, ChargeError
+
+# the dock is seen from the first waypoint, the far end of the map is 4m away
+MAP_FIDUCIALS = {0: {520: 1.5}}
+
+
+def _battery_state(percentage, runtime_seconds=0):
+    robot_state = robot_state_pb2.RobotState()
+    battery_state = robot_state.battery_states.add()
+    battery_state.charge_percentage.value = percentage
+    battery_state.estimated_runtime.seconds = runtime_seconds
+    return robot_state
+
+
+@pytest.fixture
+def charger(spot):
+    charger = ChargeManager(spot, make_map(5, fiducials=MAP_FIDUCIALS), 520)
+    yield charger
+    charger.close()
+
+
+def test_distance_to_dock(charger, spot):
+    assert charger.dock_waypoint_id == 'waypoint-0'
+    assert charger.distance_to_dock('waypoint-3') == 3.0
+    # the farthest distance is assumed from an unknown waypoint
+    assert charger.distance_to_dock('waypoint-missing') == 4.0
+    with pytest.raises(ChargeError):
+        ChargeManager(spot, charger.map, 521).distance_to_dock('waypoint-1')
+
+
+def test_drain_rate(charger, monkeypatch):
+    assert charger.drain_rate == ChargeManager.default_drain_rate
+    charger._on_battery(_battery_state(50, runtime_seconds=5000), ['battery_states'])
+    assert charger.drain_rate == pytest.approx(0.01)
+    # the measured drain is used once there is a minute of samples
+    now = [1000.0]
+    monkeypatch.setattr(charging.time, 'monotonic', lambda: now[0])
+    for percentage in (80, 79, 78):
+        charger._on_battery(_battery_state(percentage), ['battery_states'])
+        now[0] += 50
+    assert charger.drain_rate == pytest.approx(2 / 100)
+    # charging starts the measurement over
+    charger._on_battery(_battery_state(90), ['battery_states'])
+    assert charger.drain_rate == pytest.approx(0.01)
+
+
+def test_needs_charge(charger, spot, fake_robot):
+    # read the battery from the robot each time, rather than from the shared state
+    spot.robot_state.shared_max_age = 0
+    # 0.01% per second, so w/ the 1.5 safety factor 8s back from the far end costs 0.12%
+    charger._on_battery(_battery_state(50, runtime_seconds=5000), ['battery_states'])
+    assert charger.return_cost('waypoint-4') == pytest.approx(0.12)
+    assert charger.required_charge(100, 'waypoint-4') == pytest.approx(10 + 1.5 + 0.12)
+    fake_robot.battery = 20
+    assert not charger.needs_charge(100, 'waypoint-4')
+    assert charger.needs_charge(1000, 'waypoint-4')
+    fake_robot.battery = 11
+    assert charger.needs_charge(100, 'waypoint-4')
+
+
+def test_charge_returns_to_dock(charger, spot, fake_robot):
+    fake_robot.graph_nav.speed = 20.0
+    spot.graph_nav.upload_map(charger.map)
+    spot.graph_nav.localize_to_fiducial()
+    spot.docking.undock()
+    fake_robot.battery = 50
+    fake_robot.charge_rate = 200.0
+    charger.poll_interval = 0.05
+    charger.charge(90)
+    assert fake_robot.docking.dock_id == 520
+    assert spot.power.battery >= 90
+
+
+def test_close_stops_sampling(spot):
+    charger = ChargeManager(spot, make_map(5, fiducials=MAP_FIDUCIALS), 520)
+    charger.close()
+    spot.robot_state.update(_battery_state(50, runtime_seconds=5000))
+    assert charger.drain_rate == ChargeManager.default_drain_rate
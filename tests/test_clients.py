@@ -0,0 +1,57 @@
+import threading
+from spot_world.spot import Spot
+from spot_world.spot.clients import ClientRegistry, sdk_type
+
+
+def _directory_rpcs(fake_robot):
+    return sum(count for method, count in fake_robot.rpc_counts.items() if 'DirectoryService' in method)
+
+
+def test_clients_warmed_on_connect(spot):
+    # the fake robot has no robot command service, so that client fails to warm
+    service_names = set(Spot.client_service_names()) - {'robot-command'}
+    assert set(spot.clients.seconds) == service_names | {'directory'}
+    assert list(spot.clients.errors) == ['robot-command']
+    assert 'robot-command' not in spot.clients._clients
+    report = spot.clients.report().splitlines()
+    assert len(report) == len(service_names) + 2
+    assert report[-1].startswith('robot-command') and 'failed' in report[-1]
+
+
+def test_clients_created_once(spot, fake_robot):
+    fake_robot.reset_rpc_counts()
+    power_client = spot.clients.ensure_type('bosdyn.client.power', 'PowerClient')
+    assert spot.clients.ensure(power_client.default_service_name) is power_client
+    # a warmed client needs no directory lookup
+    assert _directory_rpcs(fake_robot) == 0
+
+
+def test_concurrent_ensure_creates_one_client(spot):
+    clients = ClientRegistry(spot._robot)
+    created = []
+
+    def _ensure():
+        created.append(clients.ensure_type('bosdyn.client.power', 'PowerClient'))
+    threads = [threading.Thread(target=_ensure) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(set(map(id, created))) == 1
+    assert list(clients.seconds) == ['power']
+
+
+def test_warm_only_given_clients(spot):
+    clients = ClientRegistry(spot._robot)
+    assert clients.warm([]) == {}
+    assert clients.seconds == {}
+    seconds = clients.warm(['power', 'missing'], timeout=1.0)
+    assert list(seconds) == ['power']
+    assert list(clients.errors) == ['missing']
+
+
+def test_sdk_type_cached():
+    sdk_type.cache_clear()
+    power_client = sdk_type('bosdyn.client.power', 'PowerClient')
+    assert sdk_type('bosdyn.client.power', 'PowerClient') is power_client
+    assert sdk_type.cache_info().hits == 1
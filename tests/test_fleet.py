@@ -0,0 +1,77 @@
+import pytest
+from spot_world.fake import FakeRobot
+from spot_world.spot.fleet import Fleet, FleetError
+
+
+def _auth_rpcs(fake_robot):
+    return sum(count for method, count in fake_robot.rpc_counts.items() if method.endswith('/GetAuthToken'))
+
+
+@pytest.fixture
+def fake_robots():
+    with FakeRobot() as first, FakeRobot() as second:
+        first.battery, second.battery = 80.0, 60.0
+        yield [first, second]
+
+
+@pytest.fixture
+def fleet(fake_robots):
+    fleet = Fleet()
+    for fake_robot in fake_robots:
+        fake_robot.create_robot(fleet.sdk)
+        fleet.add(fake_robot.hostname, 'user', 'password')
+    yield fleet
+    fleet.close()
+
+
+def test_connect_pools_connections(fleet, fake_robots):
+    results = fleet.connect()
+    assert all(results.values())
+    spots = fleet.spots
+    assert sorted(spots) == sorted(fake_robot.hostname for fake_robot in fake_robots)
+    # a connected robot isn't authenticated again
+    assert all(fleet.connect().values())
+    assert fleet.spots == spots
+    assert [_auth_rpcs(fake_robot) for fake_robot in fake_robots] == [1, 1]
+    fleet.disconnect(fake_robots[0].hostname)
+    assert all(fleet.connect().values())
+    assert [_auth_rpcs(fake_robot) for fake_robot in fake_robots] == [2, 1]
+    with pytest.raises(FleetError):
+        fleet.connect(['missing'])
+
+
+def test_unreachable_robot_fails_alone(fleet, fake_robots):
+    with FakeRobot() as unreachable:
+        unreachable.create_robot(fleet.sdk)
+        fleet.add(unreachable.hostname, 'user', 'password')
+    results = fleet.connect()
+    assert not results[unreachable.hostname]
+    assert all(results[fake_robot.hostname] for fake_robot in fake_robots)
+    # robots which aren't connected get a failed result
+    results = fleet.run(lambda spot: spot.power.battery)
+    assert not results[unreachable.hostname]
+    assert isinstance(results[unreachable.hostname].error, FleetError)
+
+
+def test_run_on_every_robot(fleet, fake_robots):
+    fleet.connect()
+    results = fleet.run(lambda spot: spot.power.battery)
+    assert {hostname: result.value for hostname, result in results.items()} == \
+        {fake_robots[0].hostname: 80, fake_robots[1].hostname: 60}
+
+    def _fail_second(spot):
+        if spot.hostname == fake_robots[1].hostname:
+            raise RuntimeError('robot is busy')
+        return spot.hostname
+    results = fleet.run(_fail_second)
+    assert results[fake_robots[0].hostname].value == fake_robots[0].hostname
+    assert str(results[fake_robots[1].hostname].error) == 'robot is busy'
+
+
+def test_robot_states_shared_with_facades(fleet, fake_robots):
+    fleet.connect()
+    results = fleet.robot_states()
+    for fake_robot in fake_robots:
+        robot_state = results[fake_robot.hostname].value
+        assert robot_state.battery_states[0].charge_percentage.value == fake_robot.battery
+        assert fleet.get(fake_robot.hostname).robot_state.cached(60) is robot_state
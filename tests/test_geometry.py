@@ -0,0 +1,109 @@
+import math
+import pytest
+from bosdyn.api.graph_nav import map_pb2
+from conftest import make_map
+from spot_world.spot.graph_nav import Map, SnapshotStore
+from spot_world.spot.geometry import MapGeometry, FiducialSightings
+
+
+def _lazy(map):
+    # the map w/ its snapshots serialized, as loaded w/ lazy=True
+    raw_snapshots = {i: s.SerializeToString() for i, s in map.waypoint_snapshots.items()}
+    return Map(map.graph, SnapshotStore(map_pb2.WaypointSnapshot, raw_snapshots), map.edge_snapshots)
+
+
+def test_waypoints_placed_along_edges():
+    geometry = make_map(4, edge_x=2.0).geometry
+    assert len(geometry) == 4
+    assert [geometry.position(i) for i in range(4)] == [(x, 0.0, 0.0) for x in (0.0, 2.0, 4.0, 6.0)]
+    assert list(geometry.edges()) == [(0, 1, 2.0), (1, 2, 2.0), (2, 3, 2.0)]
+    from_index, to_index, from_tform_to = geometry.edge(1)
+    assert (from_index, to_index, from_tform_to.x) == (1, 2, 2.0)
+    assert geometry.pose(3).x == 6.0
+
+
+def test_disconnected_waypoints_placed_from_their_own_origin():
+    geometry = make_map(4, skip_edges=[1]).geometry
+    assert geometry.position(1) == (1.0, 0.0, 0.0)
+    assert geometry.position(2) == (0.0, 0.0, 0.0)
+    assert geometry.position(3) == (1.0, 0.0, 0.0)
+
+
+def test_anchoring_preferred_over_edges():
+    map = make_map(3)
+    for i, x in enumerate((5.0, 7.0)):
+        anchor = map.graph.anchoring.anchors.add(id=f"waypoint-{i}")
+        anchor.seed_tform_waypoint.position.x = x
+        anchor.seed_tform_waypoint.rotation.w = 1.0
+    geometry = MapGeometry.from_graph(map.graph)
+    assert geometry.position(0) == (5.0, 0.0, 0.0)
+    assert geometry.position(1) == (7.0, 0.0, 0.0)
+    # waypoints w/o an anchor can't be placed
+    assert geometry.position(2) is None
+    assert geometry.pose(2) is None
+
+
+def test_edge_to_missing_waypoint_is_skipped():
+    map = make_map(2)
+    edge = map.graph.edges.add()
+    edge.id.from_waypoint, edge.id.to_waypoint = 'waypoint-1', 'waypoint-missing'
+    edge.from_tform_to.rotation.w = 1.0
+    geometry = MapGeometry.from_graph(map.graph)
+    assert geometry.edge_count == 2
+    assert list(geometry.edges()) == [(0, 1, 1.0)]
+
+
+def test_fiducial_sightings_extracted_from_snapshots():
+    map = make_map(fiducials={0: {3: 2.0}, 2: {3: 1.0, 7: None}})
+    sightings = FiducialSightings.from_snapshots(map.graph, map.waypoint_snapshots)
+    assert len(sightings) == 3
+    assert [(s.fiducial, s.waypoint_id, s.x) for s in sightings][:2] == [(3, 'waypoint-0', 2.0), (3, 'waypoint-2', 1.0)]
+    assert sightings[0].distance == pytest.approx(2.0)
+    # a sighting w/o a transform keeps the fiducial known
+    assert sightings[2].fiducial == 7 and math.isnan(sightings[2].x)
+
+
+def test_fiducial_lookups_leave_snapshots_unparsed():
+    map = _lazy(make_map(fiducials={1: {3: 2.0}}))
+    assert map.get_waypoint_id_by_fiducial(3) == 'waypoint-1'
+    map.prepare()
+    assert map.waypoint_snapshots.parsed_count == 0
+    assert map.resident_size >= map.geometry.nbytes + map.fiducial_sightings.nbytes
+
+
+def _brute_force_nearest(geometry, position, k):
+    distances = [
+        (math.dist(geometry.position(i), position), waypoint_id)
+        for i, waypoint_id in enumerate(geometry.waypoint_ids) if geometry.position(i) is not None
+    ]
+    return sorted(distances)[:k]
+
+
+def test_nearest_waypoints():
+    map = make_map(5)
+    assert map.get_waypoint_id_by_position((2.2, 0.5, 0.0)) == 'waypoint-2'
+    nearest = map.nearest_waypoints((2.2, 0.0, 0.0), k=3)
+    assert [waypoint_id for _, waypoint_id in nearest] == ['waypoint-2', 'waypoint-3', 'waypoint-1']
+    assert nearest[0][0] == pytest.approx(0.2)
+    # a pose is queried by its position
+    assert map.get_waypoint_id_by_position(map.geometry.pose(4)) == 'waypoint-4'
+    assert len(map.nearest_waypoints((0.0, 0.0, 0.0), k=10)) == 5
+
+
+def test_nearest_waypoints_batch_matches_brute_force():
+    geometry = make_map(12, edge_x=0.7).geometry
+    positions = [(x * 0.37, (x % 3) * 0.2, 0.0) for x in range(25)]
+    results = geometry.nearest_waypoints_batch(positions, k=4, chunk_size=7)
+    assert len(results) == len(positions)
+    for position, nearest in zip(positions, results):
+        expected = _brute_force_nearest(geometry, position, 4)
+        assert [d for d, _ in nearest] == pytest.approx([d for d, _ in expected])
+    assert geometry.nearest_waypoints((0.0, 0.0, 0.0), k=0) == []
+
+
+def test_nearest_waypoints_skips_unplaced():
+    map = make_map(3)
+    anchor = map.graph.anchoring.anchors.add(id='waypoint-1')
+    anchor.seed_tform_waypoint.rotation.w = 1.0
+    assert map.nearest_waypoints((5.0, 0.0, 0.0), k=3) == [(5.0, 'waypoint-1')]
+    assert Map(map_pb2.Graph(), {}, {}).get_waypoint_id_by_position((0.0, 0.0, 0.0)) is None
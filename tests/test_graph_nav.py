@@ -0,0 +1,102 @@
+import pytest
+from bosdyn.client.exceptions import RpcError
+from conftest import make_map, save_map
+from spot_world.spot.graph_nav import Map, FiducialIndex
+from spot_world.spot.transfer import TransferError
+
+
+def _edge_ids(graph):
+    return sorted((e.id.from_waypoint, e.id.to_waypoint) for e in graph.edges)
+
+
+def test_upload_unchanged_map_sends_nothing(spot):
+    spot.graph_nav.upload_map(make_map())
+    report = spot.graph_nav.upload_map(make_map(), incremental=True)
+    assert report.unchanged
+
+
+def test_upload_added_waypoints_keeps_robot_graph(spot, fake_robot):
+    spot.graph_nav.upload_map(make_map(3))
+    report = spot.graph_nav.upload_map(make_map(5), incremental=True)
+    assert not report.cleared
+    assert report.waypoint_snapshots_sent == 2
+    assert len(fake_robot.graph_nav.graph.waypoints) == 5
+
+
+def test_upload_removed_edge_clears_robot_graph(spot, fake_robot):
+    spot.graph_nav.upload_map(make_map())
+    new_map = make_map(skip_edges=[1])
+    report = spot.graph_nav.upload_map(new_map, incremental=True)
+    assert report.cleared
+    assert _edge_ids(fake_robot.graph_nav.graph) == _edge_ids(new_map.graph)
+
+
+def test_upload_changed_edge_clears_robot_graph(spot, fake_robot):
+    spot.graph_nav.upload_map(make_map())
+    report = spot.graph_nav.upload_map(make_map(edge_x=2.0), incremental=True)
+    assert report.cleared
+    assert all(e.from_tform_to.position.x == 2.0 for e in fake_robot.graph_nav.graph.edges)
+
+
+def test_fake_robot_appends_uploaded_graph(spot, fake_robot):
+    # the fake robot must not hide a graph left on the robot, as the real one appends uploads
+    spot.graph_nav.upload_map(make_map())
+    spot.graph_nav.client.upload_graph(graph=make_map(skip_edges=[1]).graph)
+    assert _edge_ids(fake_robot.graph_nav.graph) == _edge_ids(make_map().graph)
+
+
+def test_upload_after_failed_transfer_sends_snapshots(spot, fake_robot, monkeypatch):
+    # the graph goes up before the snapshots, so a failed transfer leaves a matching graph behind
+    client = spot.graph_nav.client
+    spot.graph_nav.transfer.backoff_seconds = 0
+
+    def _fail(snapshot):
+        raise RpcError(None, 'transfer failed')
+    with monkeypatch.context() as patch:
+        patch.setattr(client, 'upload_waypoint_snapshot', _fail)
+        with pytest.raises(TransferError):
+            spot.graph_nav.upload_map(make_map())
+    assert len(fake_robot.graph_nav.waypoint_snapshots) == 0
+    report = spot.graph_nav.upload_map(make_map(), incremental=True)
+    assert not report.unchanged
+    assert report.waypoint_snapshots_sent == 4
+    assert len(fake_robot.graph_nav.waypoint_snapshots) == 4
+
+
+# fiducial 3 is seen from every waypoint, closest from waypoint-2. dock 520 is closest from
+# waypoint-1 but too close to stand at, and 7 is seen w/o a transform
+FIDUCIALS = {0: {3: 4.0}, 1: {3: 2.5, 520: 0.5}, 2: {3: 1.5, 520: 1.5, 7: None}, 3: {3: 3.0}}
+
+
+def test_fiducial_index_closest_waypoint():
+    map = make_map(fiducials=FIDUCIALS)
+    assert sorted(map.get_fiducials()) == [3, 7, 520]
+    assert map.get_waypoint_id_by_fiducial(3) == 'waypoint-2'
+    assert [waypoint_id for _, waypoint_id in map.fiducial_index.sightings(3)] == \
+        ['waypoint-2', 'waypoint-1', 'waypoint-3', 'waypoint-0']
+    assert map.get_waypoint_id_by_fiducial(520) == 'waypoint-2'
+    assert map.get_waypoint_ids_by_fiducials([3, 7, 99]) == {3: 'waypoint-2', 7: None, 99: None}
+
+
+def test_fiducial_index_saved_beside_autowalk(tmp_path):
+    autowalk_path = save_map(make_map(fiducials=FIDUCIALS), tmp_path / 'office.walk')
+    map = Map.from_filesystem(autowalk_path)
+    index_path = FiducialIndex.path_for(autowalk_path)
+    assert index_path == tmp_path / 'office.walk.fiducials.json'
+    loaded = FiducialIndex.load(index_path, map.graph_hash)
+    assert loaded is not None
+    assert loaded.closest_waypoints(loaded.fiducials) == map.fiducial_index.closest_waypoints(loaded.fiducials)
+    # an index built for another graph is not used
+    assert FiducialIndex.load(index_path, make_map(5).graph_hash) is None
+
+
+def test_fiducial_index_reused_until_graph_changes(tmp_path):
+    autowalk_path = save_map(make_map(fiducials=FIDUCIALS), tmp_path / 'office.walk')
+    Map.from_filesystem(autowalk_path)
+    index_path = FiducialIndex.path_for(autowalk_path)
+    # a saved index is trusted while the graph is unchanged
+    saved = FiducialIndex({3: [(1.0, 'waypoint-0')]}, Map.from_filesystem(autowalk_path).graph_hash)
+    saved.save(index_path)
+    assert Map.from_filesystem(autowalk_path).get_waypoint_id_by_fiducial(3) == 'waypoint-0'
+    save_map(make_map(5, fiducials=FIDUCIALS), autowalk_path)
+    assert Map.from_filesystem(autowalk_path).get_waypoint_id_by_fiducial(3) == 'waypoint-2'
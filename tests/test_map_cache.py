@@ -0,0 +1,69 @@
+import os
+import pathlib
+from conftest import make_map, save_map
+from spot_world.spot.graph_nav import Map, SnapshotStore
+from spot_world.spot.map_cache import MapCache
+
+
+def _autowalk(tmp_path):
+    return save_map(make_map(fiducials={1: {3: 2.0}}), tmp_path / 'office.walk')
+
+
+def _snapshot_bytes(snapshots):
+    return {snapshot_id: snapshots[snapshot_id].SerializeToString() for snapshot_id in snapshots}
+
+
+def test_cached_load_matches_files(tmp_path):
+    autowalk_path = _autowalk(tmp_path)
+    from_files = Map.from_filesystem(autowalk_path)
+    for lazy in (False, True):
+        cached = Map.from_filesystem(autowalk_path, lazy=lazy, cache=True)
+        assert cached.graph == from_files.graph
+        assert _snapshot_bytes(cached.waypoint_snapshots) == _snapshot_bytes(from_files.waypoint_snapshots)
+        assert _snapshot_bytes(cached.edge_snapshots) == _snapshot_bytes(from_files.edge_snapshots)
+        assert isinstance(cached.waypoint_snapshots, SnapshotStore) == lazy
+        assert cached.get_waypoint_id_by_fiducial(3) == 'waypoint-1'
+    assert MapCache.path_for(autowalk_path).exists()
+
+
+def test_cache_round_trip(tmp_path):
+    cache_path = tmp_path / 'map.mapcache'
+    sources = {'graph': [1, 2]}
+    built = MapCache.build(cache_path, b'graph', {'w0': b'waypoint 0', 'w1': b''}, {'e0': b'edge 0'}, sources)
+    assert bytes(built.graph) == b'graph'
+    built.close()
+    cache = MapCache.open(cache_path, sources)
+    assert {i: bytes(s) for i, s in cache.waypoint_snapshots.items()} == {'w0': b'waypoint 0', 'w1': b''}
+    assert {i: bytes(s) for i, s in cache.edge_snapshots.items()} == {'e0': b'edge 0'}
+    assert cache.sources == sources
+    cache.close()
+    # a cache built from other source files is stale
+    assert MapCache.open(cache_path, {'graph': [1, 3]}) is None
+    assert not list(tmp_path.glob('*.tmp'))
+
+
+def test_invalid_cache_is_ignored(tmp_path):
+    cache_path = tmp_path / 'map.mapcache'
+    assert MapCache.open(cache_path) is None
+    cache_path.write_bytes(b'not a map cache')
+    assert MapCache.open(cache_path) is None
+    MapCache.build(cache_path, b'graph', {}, {}, {}).close()
+    data = cache_path.read_bytes()
+    cache_path.write_bytes(data[:-4])
+    assert MapCache.open(cache_path) is None
+
+
+def test_cache_rebuilt_when_snapshot_changes(tmp_path):
+    autowalk_path = _autowalk(tmp_path)
+    Map.from_filesystem(autowalk_path, cache=True)
+    cache_path = MapCache.path_for(autowalk_path)
+    assert MapCache.open(cache_path, MapCache.source_stats(autowalk_path)) is not None
+    # a snapshot re-recorded on the tablet, w/ a new fiducial sighting
+    snapshot_path = pathlib.Path(autowalk_path, 'waypoint_snapshots', 'waypoint-snapshot-0')
+    snapshot = make_map(fiducials={0: {9: 1.5}}).waypoint_snapshots['waypoint-snapshot-0']
+    snapshot_path.write_bytes(snapshot.SerializeToString())
+    stat = snapshot_path.stat()
+    os.utime(snapshot_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    assert MapCache.open(cache_path, MapCache.source_stats(autowalk_path)) is None
+    map = Map.from_filesystem(autowalk_path, lazy=True, cache=True)
+    assert map.waypoint_snapshots['waypoint-snapshot-0'] == snapshot
@@ -0,0 +1,99 @@
+import pytest
+from bosdyn.api.graph_nav import graph_nav_pb2
+from bosdyn.api.mission import mission_pb2
+from bosdyn.api import robot_state_pb2
+from spot_world.fake.replay import Replay, ReplayRunner, ReplayError
+from spot_world.spot.graph_nav import NavigationStatus
+from spot_world.spot.mission import MissionStatus
+from spot_world.spot.telemetry import TelemetryWriter, TelemetryLog, TelemetryChannel
+
+Feedback = graph_nav_pb2.NavigationFeedbackResponse
+
+
+def _mission_state(status, ticks=()):
+    state = mission_pb2.State(mission_id=1, status=status)
+    for tick in ticks:
+        state.history.add(tick_counter=tick)
+    return state
+
+
+@pytest.fixture
+def log_path(tmp_path):
+    ''' a session navigating from 0s to the goal at 5s, then running a mission from 10s to success at 15s '''
+    log_path = tmp_path / 'session.tlog'
+    records = []
+    for i in range(10):
+        timestamp = i * 0.5
+        state = robot_state_pb2.RobotState()
+        state.power_state.locomotion_charge_percentage.value = 100 - i
+        records.append((timestamp, TelemetryChannel.ROBOT_STATE, state))
+        records.append((timestamp, TelemetryChannel.NAVIGATION_FEEDBACK,
+            Feedback(status=Feedback.STATUS_FOLLOWING_ROUTE, remaining_route_length=5 - timestamp)))
+    records.append((5.0, TelemetryChannel.NAVIGATION_FEEDBACK, Feedback(status=Feedback.STATUS_REACHED_GOAL)))
+    records.append((9.0, TelemetryChannel.MISSION_STATE, _mission_state(mission_pb2.State.STATUS_NONE)))
+    for i in range(5):
+        # each recorded state only has the ticks since the last
+        records.append((10.0 + i, TelemetryChannel.MISSION_STATE,
+            _mission_state(mission_pb2.State.STATUS_RUNNING, [2 * i + 1, 2 * i])))
+    records.append((15.0, TelemetryChannel.MISSION_STATE, _mission_state(mission_pb2.State.STATUS_SUCCESS, [10])))
+    with TelemetryWriter(log_path) as writer:
+        for timestamp, channel, message in records:
+            writer.append(timestamp, channel, message.SerializeToString())
+    return log_path
+
+
+def _charge(robot_state):
+    return robot_state.power_state.locomotion_charge_percentage.value
+
+
+def test_latest_message_at_recording_time(log_path):
+    with TelemetryLog(log_path) as log:
+        replay = Replay(log, start=2.0)
+    assert not replay.started and replay.now() == 2.0
+    assert _charge(replay.message(TelemetryChannel.ROBOT_STATE)) == 96
+    assert _charge(replay.message(TelemetryChannel.ROBOT_STATE, 2.2)) == 96
+    # the first message is served before there was one
+    assert replay.message(TelemetryChannel.MISSION_STATE).status == mission_pb2.State.STATUS_NONE
+    assert not replay.has(TelemetryChannel.LOCALIZATION)
+    with pytest.raises(ReplayError):
+        replay.message(TelemetryChannel.LOCALIZATION)
+
+
+def test_first_time(log_path):
+    with TelemetryLog(log_path) as log:
+        replay = Replay(log)
+    assert replay.first_time(TelemetryChannel.NAVIGATION_FEEDBACK,
+        lambda feedback: feedback.status == Feedback.STATUS_REACHED_GOAL) == 5.0
+    assert replay.first_time(TelemetryChannel.ROBOT_STATE, after=2.2) == 2.5
+    assert replay.first_time(TelemetryChannel.ROBOT_STATE, lambda state: False) is None
+    assert replay.first_time(TelemetryChannel.LOCALIZATION) is None
+
+
+def test_mission_history_within_tick_bounds(log_path):
+    with TelemetryLog(log_path) as log:
+        replay = Replay(log, start=12.5)
+    ticks = [h.tick_counter for h in replay.mission_state().history]
+    # newest first, as the robot returns it
+    assert ticks == [5, 4, 3, 2, 1, 0]
+    assert [h.tick_counter for h in replay.mission_state(lower_tick_bound=3).history] == [5, 4, 3]
+    assert [h.tick_counter for h in replay.mission_state(2, 4).history] == [4, 3, 2]
+    assert replay.mission_state().status == mission_pb2.State.STATUS_RUNNING
+
+
+def test_replay_needs_records(tmp_path):
+    log_path = tmp_path / 'empty.tlog'
+    TelemetryWriter(log_path).close()
+    with TelemetryLog(log_path) as log:
+        with pytest.raises(ReplayError):
+            Replay(log)
+
+
+def test_runner_replays_control_loops(log_path):
+    navigate, mission = ReplayRunner(log_path).run(speeds=(20.0,))
+    assert navigate.outcome == str(NavigationStatus.REACHED)
+    assert navigate.detected_after is not None and navigate.detected_after >= 0
+    assert navigate.recording_seconds >= 5.0
+    assert mission.outcome == str(MissionStatus.SUCCESS)
+    assert mission.recording_seconds >= 5.0
+    assert any(method.endswith('/GetState') for method in mission.rpc_counts)
+    assert navigate.rpc_total > 0 and 'navigate' in str(navigate)
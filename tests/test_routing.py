@@ -0,0 +1,65 @@
+import random
+import pytest
+from bosdyn.api.graph_nav import map_pb2
+from spot_world.spot.routing import Router
+
+
+def _graph(positions, edges):
+    ''' a graph anchored at positions (id -> (x, y)), w/ edges of (from id, to id, length) along x '''
+    graph = map_pb2.Graph()
+    for waypoint_id, (x, y) in positions.items():
+        graph.waypoints.add(id=waypoint_id)
+        anchor = graph.anchoring.anchors.add(id=waypoint_id)
+        anchor.seed_tform_waypoint.position.x, anchor.seed_tform_waypoint.position.y = x, y
+        anchor.seed_tform_waypoint.rotation.w = 1.0
+    for from_id, to_id, length in edges:
+        edge = graph.edges.add()
+        edge.id.from_waypoint, edge.id.to_waypoint = from_id, to_id
+        edge.from_tform_to.position.x = length
+        edge.from_tform_to.rotation.w = 1.0
+    return graph
+
+
+def _assert_shortest(router, waypoint_ids):
+    for start in waypoint_ids:
+        distances = router.distances_from(start)
+        for goal in waypoint_ids:
+            path = router.shortest_path(start, goal)
+            if goal not in distances:
+                assert path == []
+                continue
+            assert path[0] == start and path[-1] == goal
+            assert router.path_length(path) == pytest.approx(distances[goal])
+
+
+def test_loop_closure_shorter_than_positions():
+    # x sits far off the straight line, but the edges through it are the short way round
+    router = Router.from_graph(_graph(
+        {'s': (0, 0), 'g': (10, 0), 'y': (5, 0), 'x': (0, 10)},
+        [('s', 'y', 4), ('y', 'g', 4), ('s', 'x', 1), ('x', 'g', 1)],
+    ))
+    assert router.shortest_path('s', 'g') == ['s', 'x', 'g']
+    assert router.distances_from('s')['g'] == 2
+
+
+def test_shortest_path_matches_distances_from():
+    rng = random.Random(3)
+    positions = {f"waypoint-{i}": (rng.uniform(0, 50), rng.uniform(0, 50)) for i in range(30)}
+    waypoint_ids = list(positions)
+    edges = [(rng.choice(waypoint_ids), rng.choice(waypoint_ids), rng.uniform(0.5, 20)) for _ in range(60)]
+    router = Router.from_graph(_graph(positions, [e for e in edges if e[0] != e[1]]))
+    _assert_shortest(router, waypoint_ids)
+
+
+def test_unplaced_waypoints_fall_back_to_dijkstra():
+    graph = _graph({'a': (0, 0), 'b': (10, 0)}, [('a', 'b', 5), ('b', 'c', 1), ('a', 'c', 7)])
+    graph.waypoints.add(id='c')
+    router = Router.from_graph(graph)
+    assert router.shortest_path('a', 'c') == ['a', 'b', 'c']
+    _assert_shortest(router, ['a', 'b', 'c'])
+
+
+def test_unknown_waypoint_has_no_path():
+    router = Router.from_graph(_graph({'a': (0, 0), 'b': (1, 0)}, [('a', 'b', 1)]))
+    assert router.shortest_path('a', 'missing') == []
+    assert router.distances_from('missing') == {}
@@ -0,0 +1,75 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from spot_world.spot import rpc_stats
+from spot_world.spot.rpc_stats import IDLE_COMMAND, BACKGROUND_COMMAND
+from spot_world.fake import FakeRobot
+from spot_world.spot.fleet import Fleet
+
+GET_ROBOT_STATE = '/bosdyn.api.RobotStateService/GetRobotState'
+
+
+def _robot_state_rpcs(stats, command):
+    command_stats = stats.commands.get(command)
+    if command_stats is None or GET_ROBOT_STATE not in command_stats.methods:
+        return 0
+    return command_stats.methods[GET_ROBOT_STATE].count
+
+
+def test_background_thread_not_charged_to_command(spot):
+    stats = spot.rpc_stats
+    stats.reset()
+    started, release = threading.Event(), threading.Event()
+
+    def _background():
+        started.wait()
+        spot.robot_state.refresh()
+        with rpc_stats.background('poller'):
+            spot.robot_state.refresh()
+        release.set()
+
+    thread = threading.Thread(target=_background)
+    thread.start()
+    with stats.command('status'):
+        started.set()
+        release.wait()
+        spot.robot_state.refresh()
+    thread.join()
+    spot.robot_state.refresh()
+    assert _robot_state_rpcs(stats, 'status') == 1
+    assert _robot_state_rpcs(stats, BACKGROUND_COMMAND) == 1
+    assert _robot_state_rpcs(stats, '(poller)') == 1
+    assert _robot_state_rpcs(stats, IDLE_COMMAND) == 1
+
+
+def test_submitted_work_keeps_command(spot):
+    stats = spot.rpc_stats
+    stats.reset()
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        with stats.command('maps upload'):
+            futures = [rpc_stats.submit(executor, spot.robot_state.refresh) for _ in range(3)]
+            for future in futures:
+                future.result()
+    assert _robot_state_rpcs(stats, 'maps upload') == 3
+
+
+def test_async_rpc_charged_to_caller(spot):
+    stats = spot.rpc_stats
+    stats.reset()
+    with stats.command('status'):
+        spot.robot_state.client.get_robot_state_async().result()
+    assert _robot_state_rpcs(stats, 'status') == 1
+
+
+def test_fleet_robots_share_command_stats():
+    with FakeRobot() as first, FakeRobot() as second:
+        fleet = Fleet()
+        for fake_robot in (first, second):
+            fake_robot.create_robot(fleet.sdk)
+            fleet.add(fake_robot.hostname, 'user', 'password')
+        assert all(fleet.connect().values())
+        stats = fleet.rpc_stats
+        stats.reset()
+        with stats.command('fleet status'):
+            results = fleet.run(lambda spot: spot.robot_state.refresh())
+        assert all(results.values())
+        assert _robot_state_rpcs(stats, 'fleet status') == 2
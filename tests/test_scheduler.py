@@ -0,0 +1,125 @@
+import datetime
+import time
+import pytest
+from conftest import make_map, make_walk, save_map, save_mission
+from spot_world.spot.autowalk import MissionCatalog
+from spot_world.spot.scheduler import MissionScheduler, SchedulerError, Job, JobStatus
+
+# the dock is seen from the first waypoint
+MAP_FIDUCIALS = {0: {520: 1.5}}
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    autowalk_path = save_map(make_map(5, fiducials=MAP_FIDUCIALS), tmp_path / 'office.walk')
+    save_mission(autowalk_path, 'tour', make_walk(['waypoint-1', 'waypoint-4', 'waypoint-2']))
+    save_mission(autowalk_path, 'patrol', make_walk(['waypoint-3']))
+    save_mission(autowalk_path, 'lost', make_walk(['waypoint-1', 'waypoint-missing']))
+    return MissionCatalog(autowalk_path)
+
+
+@pytest.fixture
+def scheduler(spot, fake_robot, catalog):
+    fake_robot.mission.element_seconds = 0.2
+    map = make_map(5, fiducials=MAP_FIDUCIALS)
+    spot.graph_nav.upload_map(map)
+    scheduler = MissionScheduler(spot, catalog, map, poll_interval=0.05)
+    yield scheduler
+    scheduler.close()
+
+
+def _wait_done(jobs, timeout=30):
+    deadline = time.monotonic() + timeout
+    while not all(job.done for job in jobs):
+        assert time.monotonic() < deadline, [str(job) for job in jobs]
+        time.sleep(0.05)
+
+
+def _loads(fake_robot):
+    return sum(count for method, count in fake_robot.rpc_counts.items() if method.endswith('/LoadAutowalk'))
+
+
+def _at(hour, minute=0):
+    return datetime.datetime(2024, 1, 1, hour, minute)
+
+
+def test_job_window():
+    job = Job(1, 'tour')
+    assert job.in_window(_at(3))
+    job.window = (datetime.time(9), datetime.time(17))
+    assert job.in_window(_at(9)) and job.in_window(_at(16, 59))
+    assert not job.in_window(_at(17)) and not job.in_window(_at(8))
+    # a window past midnight
+    job.window = (datetime.time(22), datetime.time(6))
+    assert job.in_window(_at(23)) and job.in_window(_at(5))
+    assert not job.in_window(_at(12))
+
+
+def test_pending_by_priority_then_submission(scheduler):
+    low = scheduler.submit('tour')
+    high = scheduler.submit('patrol', priority=5)
+    also_low = scheduler.submit('patrol')
+    assert scheduler.pending == [high, low, also_low]
+    scheduler.cancel(low.id)
+    assert low.status == JobStatus.CANCELLED
+    assert scheduler.pending == [high, also_low]
+    with pytest.raises(SchedulerError):
+        scheduler.cancel(low.id)
+    with pytest.raises(SchedulerError):
+        scheduler.cancel(99)
+    with pytest.raises(SchedulerError):
+        scheduler.submit('missing')
+
+
+def test_job_needing_charge_skipped_without_dock(scheduler):
+    job = scheduler.submit('tour', min_battery=80)
+    # w/o a charger the robot can't charge up to the job's threshold
+    assert scheduler._next_job(50) is None
+    assert scheduler._next_job(90) is job
+
+
+def test_scheduler_runs_jobs_in_priority_order(scheduler, fake_robot, spot):
+    started = []
+
+    def _on_progress(job, message):
+        if job is not None and message.startswith('started'):
+            started.append(job.mission_name)
+    scheduler.subscribe(_on_progress)
+    jobs = [scheduler.submit('tour'), scheduler.submit('tour'), scheduler.submit('patrol', priority=1)]
+    scheduler.start()
+    _wait_done(jobs)
+    assert [job.status for job in jobs] == [JobStatus.SUCCESS] * 3
+    assert started == ['patrol', 'tour', 'tour']
+    # the second run of the tour restarts the mission loaded for the first
+    assert _loads(fake_robot) == 2
+    assert scheduler.stats()['jobs'][JobStatus.SUCCESS] == 3
+    scheduler.stop()
+    assert not scheduler.running
+    # the charger made for the dock the robot started on was closed w/ the worker
+    assert scheduler.charger is None
+    assert spot.robot_state._subscribers == []
+
+
+def test_job_off_the_map_fails(scheduler):
+    lost = scheduler.submit('lost', priority=1)
+    tour = scheduler.submit('tour')
+    scheduler.start()
+    _wait_done([lost, tour])
+    assert lost.status == JobStatus.FAILURE
+    assert 'waypoint-missing' in lost.error
+    assert tour.status == JobStatus.SUCCESS
+
+
+def test_stop_without_waiting(scheduler):
+    job = scheduler.submit('tour')
+    scheduler.start()
+    while job.status == JobStatus.QUEUED:
+        time.sleep(0.01)
+    scheduler.stop(wait=False)
+    # the running mission is left to finish, and the scheduler can't be started meanwhile
+    with pytest.raises(SchedulerError):
+        scheduler.start()
+    _wait_done([job])
+    assert job.status == JobStatus.SUCCESS
+    scheduler.stop()
+    assert not scheduler.running
@@ -0,0 +1,127 @@
+import time
+import pytest
+from bosdyn.api import robot_state_pb2
+from spot_world.spot.telemetry import TelemetryWriter, TelemetryLog, TelemetryChannel, TelemetryError, \
+    TelemetryRecorder, index_path_for
+
+
+def _state(i):
+    state = robot_state_pb2.RobotState()
+    state.power_state.locomotion_charge_percentage.value = float(i)
+    return state
+
+
+def _write(path, timestamps, chunk_seconds=1.0):
+    with TelemetryWriter(path, chunk_seconds=chunk_seconds) as writer:
+        for timestamp in timestamps:
+            writer.append(timestamp, TelemetryChannel.ROBOT_STATE, _state(timestamp).SerializeToString())
+    return writer
+
+
+def _charges(records):
+    return [record.parse().power_state.locomotion_charge_percentage.value for record in records]
+
+
+def test_round_trip(tmp_path):
+    path = tmp_path / 'session.tlog'
+    writer = _write(path, range(10))
+    assert writer.records_written == 10
+    with TelemetryLog(path) as log:
+        assert len(log) == 10
+        assert len(log.chunks) > 1
+        assert (log.start_time, log.end_time) == (0, 9)
+        assert _charges(log) == list(range(10))
+        assert all(record.channel == TelemetryChannel.ROBOT_STATE for record in log)
+
+
+def test_records_sorted_within_chunk(tmp_path):
+    path = tmp_path / 'session.tlog'
+    _write(path, [0.2, 0.1, 0.3], chunk_seconds=10.0)
+    with TelemetryLog(path) as log:
+        assert [record.timestamp for record in log] == [0.1, 0.2, 0.3]
+
+
+def test_read_time_range(tmp_path):
+    path = tmp_path / 'session.tlog'
+    _write(path, range(20))
+    with TelemetryLog(path) as log:
+        assert _charges(log.read(start=5, end=12)) == list(range(5, 13))
+        assert _charges(log.read(start=18)) == [18, 19]
+        assert _charges(log.read(end=1)) == [0, 1]
+        assert list(log.read(start=30)) == []
+        assert list(log.read(channels=[TelemetryChannel.MISSION_STATE])) == []
+        assert log.channel_counts(start=10) == {TelemetryChannel.ROBOT_STATE: 10}
+
+
+def test_append_to_existing_log(tmp_path):
+    path = tmp_path / 'session.tlog'
+    _write(path, range(5))
+    _write(path, range(5, 10))
+    with TelemetryLog(path) as log:
+        assert _charges(log) == list(range(10))
+
+
+def test_truncated_last_chunk_is_dropped(tmp_path):
+    path = tmp_path / 'session.tlog'
+    _write(path, range(10))
+    with TelemetryLog(path) as log:
+        chunks = log.chunks
+    # as if the recorder stopped part way through writing the last chunk
+    with open(path, 'r+b') as log_file:
+        log_file.truncate(chunks[-1].end - 3)
+    with TelemetryLog(path) as log:
+        assert len(log.chunks) == len(chunks) - 1
+        assert _charges(log) == list(range(int(chunks[-1].first)))
+    # appending drops the partial chunk, and the index no longer refers to it
+    _write(path, [100])
+    with TelemetryLog(path) as log:
+        assert _charges(log) == list(range(int(chunks[-1].first))) + [100]
+
+
+def test_stale_index_is_reconciled(tmp_path):
+    path = tmp_path / 'session.tlog'
+    _write(path, range(5))
+    stale_index = index_path_for(path).read_bytes()
+    _write(path, range(5, 10))
+    # an index left from before the last chunks were written
+    index_path_for(path).write_bytes(stale_index)
+    with TelemetryLog(path) as log:
+        assert _charges(log) == list(range(10))
+    _write(path, [10])
+    assert len(index_path_for(path).read_bytes()) > len(stale_index)
+    with TelemetryLog(path) as log:
+        assert _charges(log) == list(range(11))
+
+
+def test_missing_index_is_rebuilt(tmp_path):
+    path = tmp_path / 'session.tlog'
+    _write(path, range(5))
+    index_path_for(path).unlink()
+    with TelemetryLog(path) as log:
+        assert _charges(log) == list(range(5))
+    _write(path, [5])
+    assert index_path_for(path).exists()
+    with TelemetryLog(path) as log:
+        assert _charges(log) == list(range(6))
+
+
+def test_not_a_telemetry_log(tmp_path):
+    path = tmp_path / 'session.tlog'
+    path.write_bytes(b'not a telemetry log')
+    with pytest.raises(TelemetryError):
+        TelemetryLog(path)
+
+
+def test_recorder_samples_fake_robot(spot, tmp_path):
+    path = tmp_path / 'session.tlog'
+    recorder = TelemetryRecorder(spot, path, rate_hz=50.0)
+    recorder.start()
+    time.sleep(0.3)
+    recorder.stop()
+    stats = recorder.stats()
+    assert stats['samples'][TelemetryChannel.ROBOT_STATE] > 0
+    assert not any(stats['errors'].values())
+    with TelemetryLog(path) as log:
+        counts = log.channel_counts()
+    assert counts[TelemetryChannel.ROBOT_STATE] == stats['samples'][TelemetryChannel.ROBOT_STATE]
+    assert TelemetryChannel.LOCALIZATION in counts
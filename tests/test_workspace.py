@@ -0,0 +1,72 @@
+import pytest
+from conftest import make_map, save_map
+from spot_world.spot.workspace import MapWorkspace, MapWorkspaceError
+
+
+@pytest.fixture
+def workspace_path(tmp_path):
+    for name, waypoint_count in (('lab', 3), ('office', 4), ('warehouse', 5)):
+        save_map(make_map(waypoint_count), tmp_path / f"{name}.walk")
+    # not an autowalk folder
+    (tmp_path / 'notes').mkdir()
+    return tmp_path
+
+
+def test_workspace_indexes_autowalk_folders(workspace_path):
+    workspace = MapWorkspace.from_directory(workspace_path)
+    assert workspace.names == ['lab', 'office', 'warehouse']
+    assert workspace.path('lab') == (workspace_path / 'lab.walk').resolve()
+    assert workspace.name_of(workspace_path / 'office.walk') == 'office'
+    assert workspace.name_of(workspace_path / 'notes') is None
+    with pytest.raises(MapWorkspaceError):
+        workspace.path('missing')
+    with pytest.raises(MapWorkspaceError):
+        workspace.add(workspace_path / 'notes')
+
+
+def test_workspace_rejects_duplicate_names(workspace_path, tmp_path_factory):
+    other = save_map(make_map(), tmp_path_factory.mktemp('other') / 'lab.walk')
+    workspace = MapWorkspace.from_directory(workspace_path)
+    with pytest.raises(MapWorkspaceError):
+        workspace.add(other)
+    assert workspace.add(workspace_path / 'lab.walk') == 'lab'
+
+
+def test_maps_loaded_on_demand(workspace_path):
+    workspace = MapWorkspace.from_directory(workspace_path)
+    assert not any(workspace.is_loaded(name) for name in workspace.names)
+    office = workspace.get('office')
+    assert len(office.graph.waypoints) == 4
+    assert workspace.get('office') is office
+    assert workspace.is_loaded('office') and not workspace.is_loaded('lab')
+
+
+def test_least_recently_used_map_evicted(workspace_path):
+    workspace = MapWorkspace.from_directory(workspace_path)
+    sizes = {name: workspace.get(name).resident_size for name in workspace.names}
+    for name in workspace.names:
+        workspace.evict(name)
+    # room for two of the maps
+    workspace.max_bytes = sizes['office'] + sizes['warehouse']
+    workspace.get('lab')
+    workspace.get('office')
+    workspace.get('lab')
+    workspace.get('warehouse')
+    assert workspace.is_loaded('lab') and workspace.is_loaded('warehouse')
+    assert not workspace.is_loaded('office')
+    assert workspace.resident_size <= workspace.max_bytes
+
+
+def test_pinned_map_never_evicted(workspace_path):
+    workspace = MapWorkspace.from_directory(workspace_path, max_bytes=0)
+    workspace.pin('lab')
+    workspace.get('lab')
+    workspace.get('office')
+    workspace.get('warehouse')
+    assert workspace.is_loaded('lab') and workspace.is_loaded('warehouse')
+    assert not workspace.is_loaded('office')
+    with pytest.raises(MapWorkspaceError):
+        workspace.evict('lab')
+    workspace.pin('office')
+    workspace.evict('lab')
+    assert not workspace.is_loaded('lab')